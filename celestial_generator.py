@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Процедурный генератор ещё не открытых космических тел
+Миллионы тел без единого байта памяти, пока их не коснётся покупатель
+"""
+
+import math
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from cosmic_demiurge import CelestialBody, CelestialType, GravitationalParameters
+
+G = 6.67430e-11
+C = 299792458
+
+_MASK64 = (1 << 64) - 1
+_DRAWS_PER_BODY = 16  # независимых случайных чисел на тело
+_TO_UNIT = 2.0 ** -53
+
+# Слоты случайных чисел тела
+U_MASS, U_RADIUS, U_RA, U_DEC, U_DIST, U_PRICE, U_DISCOVERY, U_NUTATION, U_ORBIT, U_HEAD, U_TAIL, U_DESCRIPTION = range(12)
+
+# Частота родов в каталоге: род тела с номером i равен TYPE_CYCLE[i % len(TYPE_CYCLE)],
+# поэтому тела одного рода перечисляются без обхода остальных
+_TYPE_WEIGHTS = [
+    (CelestialType.ASTEROID, 8), (CelestialType.STAR_M, 6), (CelestialType.COMET, 5),
+    (CelestialType.STAR_K, 4), (CelestialType.MOON, 4), (CelestialType.STAR_G, 3),
+    (CelestialType.PLANET_TERRESTRIAL, 3), (CelestialType.STAR_F, 2), (CelestialType.PLANET_GAS_GIANT, 2),
+    (CelestialType.PLANET_ICE_GIANT, 2), (CelestialType.WHITE_DWARF, 2), (CelestialType.STAR_A, 1),
+    (CelestialType.STAR_B, 1), (CelestialType.STAR_O, 1), (CelestialType.NEUTRON_STAR, 1),
+    (CelestialType.PULSAR, 1), (CelestialType.BLACK_HOLE, 1),
+]
+TYPE_CYCLE: List[CelestialType] = []
+for _type, _weight in _TYPE_WEIGHTS:
+    TYPE_CYCLE.extend([_type] * _weight)
+# чередуем роды, чтобы соседние номера не были одного рода
+TYPE_CYCLE = TYPE_CYCLE[::2] + TYPE_CYCLE[1::2]
+
+# Диапазоны физики по родам:
+# lg массы (кг), lg радиуса (м), lg расстояния (св. лет), цена, шанс открытия,
+# влияние на нутацию, орбитальный период в днях (или None)
+TYPE_PHYSICS: Dict[CelestialType, Tuple] = {
+    CelestialType.BLACK_HOLE: ((31.0, 32.5), None, (3.0, 4.5), (400000, 1500000), (0.005, 0.02), (0.85, 0.99), None),
+    CelestialType.STAR_O: ((31.2, 32.0), (9.8, 10.3), (3.0, 4.0), (600000, 1000000), (0.005, 0.012), (0.70, 0.85), None),
+    CelestialType.STAR_B: ((30.6, 31.3), (9.3, 9.8), (2.5, 3.5), (400000, 800000), (0.006, 0.015), (0.60, 0.80), None),
+    CelestialType.STAR_A: ((30.4, 30.7), (9.0, 9.3), (1.5, 3.0), (300000, 600000), (0.008, 0.02), (0.50, 0.70), None),
+    CelestialType.STAR_F: ((30.2, 30.5), (8.9, 9.1), (1.0, 3.0), (250000, 500000), (0.01, 0.025), (0.45, 0.65), None),
+    CelestialType.STAR_G: ((30.0, 30.4), (8.8, 9.0), (1.0, 3.0), (250000, 550000), (0.01, 0.03), (0.40, 0.60), None),
+    CelestialType.STAR_K: ((29.8, 30.1), (8.6, 8.85), (1.0, 3.0), (150000, 400000), (0.012, 0.03), (0.35, 0.55), None),
+    CelestialType.STAR_M: ((29.2, 29.9), (7.9, 8.6), (0.6, 2.5), (100000, 300000), (0.015, 0.04), (0.30, 0.50), None),
+    CelestialType.PLANET_TERRESTRIAL: ((23.5, 25.2), (6.4, 7.0), (1.0, 3.0), (500000, 1500000), (0.02, 0.05), (0.35, 0.55), (50.0, 1000.0)),
+    CelestialType.PLANET_GAS_GIANT: ((26.5, 28.0), (7.6, 8.0), (1.0, 3.0), (400000, 1000000), (0.02, 0.04), (0.55, 0.75), (1000.0, 6000.0)),
+    CelestialType.PLANET_ICE_GIANT: ((25.8, 26.5), (7.3, 7.5), (1.0, 3.0), (300000, 700000), (0.03, 0.05), (0.35, 0.50), (3000.0, 60000.0)),
+    CelestialType.MOON: ((21.0, 23.5), (5.5, 6.6), (1.0, 3.0), (100000, 300000), (0.05, 0.08), (0.25, 0.40), (1.0, 60.0)),
+    CelestialType.ASTEROID: ((15.0, 21.5), (3.0, 5.8), (-1.0, 0.7), (20000, 80000), (0.10, 0.20), (0.10, 0.25), (300.0, 3000.0)),
+    CelestialType.COMET: ((12.0, 15.5), (2.5, 4.0), (-0.5, 0.3), (30000, 90000), (0.10, 0.18), (0.20, 0.35), (70.0, 300.0)),
+    CelestialType.NEUTRON_STAR: ((30.3, 30.6), (4.0, 4.1), (2.5, 3.5), (800000, 1300000), (0.005, 0.01), (0.85, 0.95), None),
+    CelestialType.WHITE_DWARF: ((29.9, 30.2), (6.7, 6.9), (1.0, 2.5), (200000, 400000), (0.03, 0.06), (0.45, 0.60), None),
+    CelestialType.PULSAR: ((30.3, 30.6), (4.0, 4.1), (2.5, 3.5), (800000, 1200000), (0.008, 0.015), (0.80, 0.92), None),
+}
+
+# Пулы слов для имён: «Песнь Полей Васильковых №1234»
+NAME_HEADS = [
+    "Песнь", "Сердце", "Свет", "Дыхание", "Слеза", "Тайна", "Колыбель", "Узор",
+    "Зов", "Огонь", "Сон", "Дума", "Улыбка", "Крыло", "Венец", "Отблеск",
+]
+NAME_TAILS = [
+    "Полей Васильковых", "Тихой Зари", "Северного Сияния", "Русской Души",
+    "Жар-Птицы", "Ладоги", "Уральских Гор", "Святой Руси",
+    "Белых Берёз", "Степного Ветра", "Волжских Просторов", "Царевны-Лебеди",
+    "Ивана-Царевича", "Матушки-Зимы", "Сибирской Тайги", "Летней Грозы",
+]
+
+# Общий пул описаний: тела ссылаются на одни и те же строки
+DESCRIPTION_POOL = [
+    "Ещё не ведомо астрономам сие тело, но демиург уже слышит его песнь среди звёздной тишины.",
+    "Словно изба на краю вселенной - светит окошком тем, кто умеет ждать.",
+    "Тихое и скромное, как иней на окне, но душа в нём широкая, как Волга в половодье.",
+    "Кружится в танце медленном, будто хоровод девичий на лугу купальском.",
+    "Хранит тайну, что старше сказок бабушкиных и глубже омутов лесных.",
+    "Сияет ровно и светло, как лампадка в красном углу мироздания.",
+    "Ветра космические поют над ним былины о богатырях небесных.",
+    "Ждёт своего хозяина, как невеста у окна - терпеливо и с надеждой.",
+]
+
+
+def _splitmix64(x: int) -> int:
+    """Хеш splitmix64: номер тела и слот превращаются в независимые случайные биты"""
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+def _lerp(bounds: Tuple[float, float], u: float) -> float:
+    return bounds[0] + (bounds[1] - bounds[0]) * u
+
+
+class ProceduralCatalog(Mapping):
+    """Ленивый каталог ещё не открытых тел
+
+    Тело с номером i целиком определяется парой (seed, i) и создаётся
+    только при обращении по id. Каталог не хранит тел; те, что были
+    забронированы или куплены, хранит CosmicDemiurge в своём каталоге.
+    """
+
+    ID_PREFIX = "PG_"
+
+    def __init__(self, size: int = 10_000_000, seed: int = 6798):
+        self.size = size
+        self.seed = seed
+        self._seed_base = _splitmix64(seed)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.body_id(i) for i in range(self.size))
+
+    def __contains__(self, body_id) -> bool:
+        return self.index_of(body_id) is not None
+
+    def __getitem__(self, body_id: str) -> CelestialBody:
+        index = self.index_of(body_id)
+        if index is None:
+            raise KeyError(body_id)
+        return self.materialize(index)
+
+    def body_id(self, index: int) -> str:
+        return f"{self.ID_PREFIX}{index:08d}"
+
+    def index_of(self, body_id) -> Optional[int]:
+        if not isinstance(body_id, str) or not body_id.startswith(self.ID_PREFIX):
+            return None
+        digits = body_id[len(self.ID_PREFIX):]
+        if not digits.isdigit():
+            return None
+        index = int(digits)
+        # только каноническая запись: "PG_1" - не псевдоним "PG_00000001", иначе тело раздвоится
+        if index >= self.size or body_id != self.body_id(index):
+            return None
+        return index
+
+    def uniform(self, index: int, slot: int) -> float:
+        """Воспроизводимое случайное число из [0, 1) для слота тела"""
+        return (_splitmix64((self._seed_base + index * _DRAWS_PER_BODY + slot) & _MASK64) >> 11) * _TO_UNIT
+
+    @staticmethod
+    def type_of(index: int) -> CelestialType:
+        return TYPE_CYCLE[index % len(TYPE_CYCLE)]
+
+    def materialize(self, index: int) -> CelestialBody:
+        """Создаёт тело по номеру"""
+        u = self.uniform
+        body_type = self.type_of(index)
+        mass_lg, radius_lg, dist_lg, price, discovery, nutation, orbit = TYPE_PHYSICS[body_type]
+
+        mass = 10.0 ** _lerp(mass_lg, u(index, U_MASS))
+        if radius_lg is None:
+            radius = 2 * G * mass / C ** 2  # радиус Шварцшильда
+            surface_gravity = float('inf')
+            escape_velocity = float(C)
+        else:
+            radius = 10.0 ** _lerp(radius_lg, u(index, U_RADIUS))
+            surface_gravity = G * mass / radius ** 2
+            escape_velocity = math.sqrt(2 * G * mass / radius)
+
+        ra = 360.0 * u(index, U_RA)
+        dec = math.degrees(math.asin(2.0 * u(index, U_DEC) - 1.0))  # равномерно по сфере
+        distance = 10.0 ** _lerp(dist_lg, u(index, U_DIST))
+
+        head = NAME_HEADS[int(u(index, U_HEAD) * len(NAME_HEADS))]
+        tail = NAME_TAILS[int(u(index, U_TAIL) * len(NAME_TAILS))]
+
+        return CelestialBody(
+            id=self.body_id(index),
+            name=f"{head} {tail} №{index + 1}",
+            type=body_type,
+            coordinates=(round(ra, 3), round(dec, 3), round(distance, 2)),
+            gravitational_params=GravitationalParameters(
+                mass_kg=mass,
+                radius_m=radius,
+                surface_gravity=surface_gravity,
+                escape_velocity=escape_velocity,
+                orbital_period=round(_lerp(orbit, u(index, U_ORBIT)), 1) if orbit else None
+            ),
+            nutation_influence=round(_lerp(nutation, u(index, U_NUTATION)), 3),
+            price_universe_coins=float(round(_lerp(price, u(index, U_PRICE)), -3)),
+            discovery_probability=round(_lerp(discovery, u(index, U_DISCOVERY)), 4),
+            poetic_description=DESCRIPTION_POOL[int(u(index, U_DESCRIPTION) * len(DESCRIPTION_POOL))]
+        )
+
+    def ids_of_type(self, celestial_type: Optional[CelestialType] = None,
+                    offset: int = 0, limit: int = 20) -> List[str]:
+        """id тел рода (или всех) по порядку номеров, за O(k)"""
+        if celestial_type is None:
+            return [self.body_id(i) for i in range(offset, min(self.size, offset + limit))]
+        residues = [r for r, t in enumerate(TYPE_CYCLE) if t == celestial_type]
+        period = len(TYPE_CYCLE)
+        ids = []
+        k = offset
+        while len(ids) < limit:
+            index = (k // len(residues)) * period + residues[k % len(residues)]
+            if index >= self.size:
+                break
+            ids.append(self.body_id(index))
+            k += 1
+        return ids
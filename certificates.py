@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Сертификаты владения космическими телами: текст, HTML и JSON
+Шаблоны собираются один раз, готовые сертификаты кэшируются, выгрузка всех - параллельно
+"""
+
+import argparse
+import datetime
+import html
+import json
+import os
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+FORMATS = {"text": ".txt", "html": ".html", "json": ".json"}
+
+TEXT_TEMPLATE = """
+╔══════════════════════════════════════════════════════════════╗
+║                    🌟 CERTIFICAT COSMIQUE 🌟                  ║
+║              Сертификат Владения Космическим Телом            ║
+╠══════════════════════════════════════════════════════════════╣
+║                                                              ║
+║ Владелец: {owner:<48} ║
+║ Объект:   {name:<48} ║
+║ Тип:      {type:<48} ║
+║ ID:       {id:<48} ║
+║                                                              ║
+║ Координаты в мультивселенной:                                ║
+║   RA:  {ra:>8.3f}°                               ║
+║   Dec: {dec:>8.3f}°                               ║
+║   Dist:{distance_ly:>8.1f} ly                             ║
+║                                                              ║
+║ Гравитационные параметры:                                    ║
+║   Масса: {mass_kg:.2e} кг              ║
+║   GM:    {gm:.2e} м³/с² ║
+║                                                              ║
+║ Нутация демиурга в час выдачи:                               ║
+║   Долгота: {nutation_longitude:>6.2f} arcsec                          ║
+║   Наклон:  {nutation_obliquity:>6.2f} arcsec                          ║
+║                                                              ║
+║ Дата выдачи: {issued:<16}                           ║
+║                                                              ║
+║ Подпись: Робот-Демиург Сверхновой Мультивселенной           ║
+║          [Цифровая подпись с нутационным ключом]            ║
+╚══════════════════════════════════════════════════════════════╝
+
+{description}
+
+✨ Сие космическое тело принадлежит вам до конца времён! ✨
+""".format
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="ru">
+<head><meta charset="utf-8"><title>Certificat cosmique - {name}</title></head>
+<body>
+<article class="certificate">
+<h1>🌟 Certificat Cosmique 🌟</h1>
+<h2>Сертификат Владения Космическим Телом</h2>
+<dl>
+<dt>Владелец</dt><dd>{owner}</dd>
+<dt>Объект</dt><dd>{name}</dd>
+<dt>Тип</dt><dd>{type}</dd>
+<dt>ID</dt><dd>{id}</dd>
+<dt>Координаты</dt><dd>RA {ra:.3f}°, Dec {dec:.3f}°, {distance_ly:.1f} ly</dd>
+<dt>Масса</dt><dd>{mass_kg:.2e} кг</dd>
+<dt>GM</dt><dd>{gm:.2e} м³/с²</dd>
+<dt>Нутация в час выдачи</dt><dd>{nutation_longitude:.2f}″ × {nutation_obliquity:.2f}″</dd>
+<dt>Дата выдачи</dt><dd>{issued}</dd>
+</dl>
+<p class="poem">{description}</p>
+<p>✨ Сие космическое тело принадлежит вам до конца времён! ✨</p>
+<footer>Робот-Демиург Сверхновой Мультивселенной</footer>
+</article>
+</body>
+</html>
+""".format
+
+
+def certificate_fields(body, nutation_longitude: float, nutation_obliquity: float) -> Dict:
+    """Всё, что нужно шаблонам, в виде простого словаря (его можно отдать в другой процесс)"""
+    gp = body.gravitational_params
+    ra, dec, distance_ly = body.coordinates
+    return {
+        'owner': body.owner,
+        'name': body.name,
+        'type': body.type.value,
+        'id': body.id,
+        'ra': ra,
+        'dec': dec,
+        'distance_ly': distance_ly,
+        'mass_kg': gp.mass_kg,
+        'gm': gp.gravitational_parameter,
+        'nutation_longitude': nutation_longitude,
+        'nutation_obliquity': nutation_obliquity,
+        'issued_at': body.purchased_at,
+        'issued': datetime.datetime.fromtimestamp(body.purchased_at).strftime('%d.%m.%Y %H:%M'),
+        'description': body.poetic_description,
+    }
+
+
+def render_fields(fields: Dict, fmt: str = "text") -> str:
+    if fmt == "text":
+        return TEXT_TEMPLATE(**fields)
+    if fmt == "html":
+        return HTML_TEMPLATE(**{key: html.escape(value) if isinstance(value, str) else value
+                                for key, value in fields.items()})
+    if fmt == "json":
+        return json.dumps(fields, ensure_ascii=False, indent=2)
+    raise ValueError(f"Неизвестный формат сертификата: {fmt}")
+
+
+class CertificateRenderer:
+    """Сертификаты с кэшем по (тело, владелец, эпоха выдачи, формат)
+
+    Сертификат зависит только от неизменных свойств тела, владельца и
+    момента выдачи - нутация берётся на эпоху выдачи, а не на «сейчас».
+    Поэтому повторный показ той же страницы отдаётся из кэша, а смена
+    владельца или перевыдача сами дают новый ключ.
+    """
+
+    def __init__(self, nutation_source, maxsize: int = 4096):
+        self.nutation_source = nutation_source
+        self.maxsize = maxsize
+        self._cache: "OrderedDict[Tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def fields(self, body) -> Dict:
+        longitude, obliquity = self.nutation_source.at(body.purchased_at)
+        return certificate_fields(body, longitude, obliquity)
+
+    def render(self, body, fmt: str = "text") -> str:
+        key = (body.id, body.owner, body.purchased_at, fmt)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return cached
+        certificate = render_fields(self.fields(body), fmt)
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = certificate
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return certificate
+
+
+def _render_chunk(args: Tuple[List[Dict], str]) -> List[Tuple[str, str]]:
+    chunk, fmt = args
+    return [(fields['id'], render_fields(fields, fmt)) for fields in chunk]
+
+
+def export_certificates(renderer: CertificateRenderer, bodies: Iterable, destination: str,
+                        fmt: str = "text", workers: Optional[int] = None, chunk_size: int = 256) -> int:
+    """Выгружает сертификаты тел в каталог или в .zip; возвращает их число
+
+    Поля собираются в этом процессе (нужна нутация на эпоху выдачи),
+    а сами сертификаты рендерятся пачками в пуле процессов.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат сертификата: {fmt}")
+    fields = [renderer.fields(body) for body in bodies]
+    chunks = [(fields[i:i + chunk_size], fmt) for i in range(0, len(fields), chunk_size)]
+    suffix = FORMATS[fmt]
+    count = 0
+    archive = zipfile.ZipFile(destination, "w", zipfile.ZIP_DEFLATED) if destination.endswith(".zip") else None
+    if archive is None:
+        os.makedirs(destination, exist_ok=True)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for rendered in pool.map(_render_chunk, chunks):
+                for body_id, certificate in rendered:
+                    name = body_id + suffix
+                    if archive is not None:
+                        archive.writestr(name, certificate)
+                    else:
+                        with open(os.path.join(destination, name), "w", encoding="utf-8") as f:
+                            f.write(certificate)
+                    count += 1
+    finally:
+        if archive is not None:
+            archive.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Выгрузка сертификатов всех проданных тел")
+    parser.add_argument("destination", help="каталог или файл .zip")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="text")
+    parser.add_argument("--workers", type=int, default=None, help="процессов в пуле (по умолчанию - все ядра)")
+    parser.add_argument("--procedural", action="store_true", help="подключить процедурный каталог")
+    args = parser.parse_args()
+
+    from celestial_generator import ProceduralCatalog
+    from cosmic_demiurge import CosmicDemiurge
+    from demiurge_events import NullSink
+    from demiurge_store import DemiurgeStore
+
+    demiurge = CosmicDemiurge(procedural=ProceduralCatalog() if args.procedural else None,
+                              events=NullSink(), store=DemiurgeStore())
+    bodies = [demiurge.issue_certificate_epoch(body) for body in demiurge.owned_bodies()]
+    started = time.perf_counter()
+    count = export_certificates(demiurge.certificates, bodies, args.destination, args.format, args.workers)
+    print(f"📜 Выгружено сертификатов: {count} → {args.destination} ({time.perf_counter() - started:.2f} с)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Колоночный каталог космических тел на массивах NumPy
+Фильтры, шансы открытия и производная физика - одной операцией над всем каталогом
+"""
+
+import datetime
+import math
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from celestial_generator import (
+    C, G, TYPE_CYCLE, TYPE_PHYSICS, ProceduralCatalog, _DRAWS_PER_BODY, _TO_UNIT,
+    U_DEC, U_DIST, U_MASS, U_ORBIT, U_PRICE, U_RA, U_RADIUS, U_DISCOVERY, U_NUTATION,
+)
+from cosmic_demiurge import CelestialBody, CelestialType
+from sky_index import SkyIndex
+
+TYPES: List[CelestialType] = list(CelestialType)
+TYPE_CODES = {t: code for code, t in enumerate(TYPES)}
+COLUMNS = {  # колонка -> (dtype, заполнитель)
+    "type_code": (np.uint8, 0), "mass_kg": (np.float64, 0.0), "radius_m": (np.float64, 0.0),
+    "surface_gravity": (np.float64, 0.0), "escape_velocity": (np.float64, 0.0),
+    "orbital_period": (np.float64, np.nan), "price": (np.float64, 0.0),
+    "discovery_probability": (np.float64, 0.0), "nutation_influence": (np.float64, 0.0),
+    "ra": (np.float64, 0.0), "dec": (np.float64, 0.0), "distance_ly": (np.float64, 0.0),
+    "owned": (bool, False),
+    "reserved_until": (np.float64, 0.0),  # unix-время окончания брони, 0 - нет брони
+}
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 над массивом uint64 - те же биты, что у celestial_generator._splitmix64"""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _bounds(column: int, default=(0.0, 0.0)):
+    """Нижние и верхние границы параметра TYPE_PHYSICS, индексированные кодом рода"""
+    lo = np.zeros(len(TYPES))
+    hi = np.zeros(len(TYPES))
+    for t, physics in TYPE_PHYSICS.items():
+        lo[TYPE_CODES[t]], hi[TYPE_CODES[t]] = physics[column] or default
+    return lo, hi
+
+
+def _draws(procedural: ProceduralCatalog, index: np.ndarray):
+    """u(slot) для массива номеров - те же числа, что ProceduralCatalog.uniform"""
+    base = np.uint64(procedural._seed_base) + index * np.uint64(_DRAWS_PER_BODY)
+
+    def u(slot):
+        return (_splitmix64(base + np.uint64(slot)) >> np.uint64(11)).astype(np.float64) * _TO_UNIT
+    return u
+
+
+def _type_codes(index: np.ndarray) -> np.ndarray:
+    cycle = np.array([TYPE_CODES[t] for t in TYPE_CYCLE], dtype=np.uint8)
+    return cycle[index % np.uint64(len(cycle))]
+
+
+def procedural_coordinates(procedural: ProceduralCatalog, start: int = 0,
+                           stop: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """RA, Dec и расстояние процедурных тел с номерами [start, stop), как у materialize"""
+    stop = procedural.size if stop is None else min(stop, procedural.size)
+    index = np.arange(start, stop, dtype=np.uint64)
+    u = _draws(procedural, index)
+    lo, hi = _bounds(2)
+    code = _type_codes(index)
+    ra = np.round(360.0 * u(U_RA), 3)
+    dec = np.round(np.degrees(np.arcsin(2.0 * u(U_DEC) - 1.0)), 3)
+    distance = np.round(10.0 ** (lo[code] + (hi[code] - lo[code]) * u(U_DIST)), 2)
+    return ra, dec, distance
+
+
+class ColumnarCatalog:
+    """Каталог в виде параллельных массивов
+
+    Строка i описывает одно тело. Для существующего кода каждая строка
+    доступна как обычный CelestialBody через body() и __getitem__.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        # колонки - окна длины size в буферах, которые append() растит удвоением
+        self._buffers = {name: np.full(size, fill, dtype=dtype) for name, (dtype, fill) in COLUMNS.items()}
+        self._expose()
+        self._bodies: Optional[List[CelestialBody]] = None
+        self._procedural: Optional[ProceduralCatalog] = None
+        self._row_of: Optional[dict] = None
+        self._owners: dict = {}  # строка -> владелец, только для проданных тел
+        self._sky_index: Optional[SkyIndex] = None
+
+    @classmethod
+    def from_bodies(cls, bodies: Iterable[CelestialBody]) -> "ColumnarCatalog":
+        """Колонки из готовых тел (например, CosmicDemiurge.catalog.values())"""
+        bodies = list(bodies)
+        cat = cls(len(bodies))
+        cat._bodies = bodies
+        cat._row_of = {body.id: row for row, body in enumerate(bodies)}
+        for row, body in enumerate(bodies):
+            cat._fill(row, body)
+        return cat
+
+    def _fill(self, row: int, body: CelestialBody):
+        gp = body.gravitational_params
+        self.type_code[row] = TYPE_CODES[body.type]
+        self.mass_kg[row] = gp.mass_kg
+        self.radius_m[row] = gp.radius_m
+        self.escape_velocity[row] = gp.escape_velocity
+        self.orbital_period[row] = np.nan if gp.orbital_period is None else gp.orbital_period
+        self.price[row] = body.price_universe_coins
+        self.discovery_probability[row] = body.discovery_probability
+        self.nutation_influence[row] = body.nutation_influence
+        self.ra[row], self.dec[row], self.distance_ly[row] = body.coordinates
+        self.sync(body, row)
+
+    def _expose(self):
+        for name, buffer in self._buffers.items():
+            setattr(self, name, buffer[:self.size])
+
+    def append(self, body: CelestialBody) -> int:
+        """Добавляет тело новой строкой; ёмкость растёт удвоением, так что в среднем это O(1)"""
+        if self._bodies is None:
+            raise ValueError("Добавлять тела можно только в каталог из готовых тел")
+        row = self.size
+        capacity = len(self._buffers["price"])
+        if row == capacity:
+            for name, (dtype, fill) in COLUMNS.items():
+                grown = np.full(max(16, 2 * capacity), fill, dtype=dtype)
+                grown[:row] = self._buffers[name][:row]
+                self._buffers[name] = grown
+        self.size = row + 1
+        self._expose()
+        self._bodies.append(body)
+        self._row_of[body.id] = row
+        self._fill(row, body)
+        self._sky_index = None
+        return row
+
+    @classmethod
+    def from_procedural(cls, procedural: ProceduralCatalog, count: Optional[int] = None) -> "ColumnarCatalog":
+        """Колонки процедурного каталога, вычисленные сразу для всех номеров
+
+        Повторяет ProceduralCatalog.materialize на массивах: значения
+        совпадают с построчными с точностью до последнего бита округления.
+        """
+        size = procedural.size if count is None else min(count, procedural.size)
+        cat = cls(size)
+        cat._procedural = procedural
+        index = np.arange(size, dtype=np.uint64)
+        u = _draws(procedural, index)
+        code = _type_codes(index)
+        cat.type_code[:] = code
+
+        def lerp(column, slot):
+            lo, hi = _bounds(column)
+            return lo[code] + (hi[code] - lo[code]) * u(slot)
+
+        mass = 10.0 ** lerp(0, U_MASS)
+        radius = 10.0 ** lerp(1, U_RADIUS)
+        is_hole = code == TYPE_CODES[CelestialType.BLACK_HOLE]
+        radius[is_hole] = 2 * G * mass[is_hole] / C ** 2
+        cat.mass_kg[:] = mass
+        cat.radius_m[:] = radius
+        cat.surface_gravity[:] = np.where(is_hole, np.inf, G * mass / radius ** 2)
+        cat.escape_velocity[:] = np.where(is_hole, float(C), np.sqrt(2 * G * mass / radius))
+
+        has_orbit = np.zeros(len(TYPES), dtype=bool)
+        for t, physics in TYPE_PHYSICS.items():
+            has_orbit[TYPE_CODES[t]] = physics[6] is not None
+        lo, hi = _bounds(6)
+        orbit = np.round(lo[code] + (hi[code] - lo[code]) * u(U_ORBIT), 1)
+        cat.orbital_period[:] = np.where(has_orbit[code], orbit, np.nan)
+
+        cat.ra[:], cat.dec[:], cat.distance_ly[:] = procedural_coordinates(procedural, 0, size)
+        cat.price[:] = np.round(lerp(3, U_PRICE), -3)
+        cat.discovery_probability[:] = np.round(lerp(4, U_DISCOVERY), 4)
+        cat.nutation_influence[:] = np.round(lerp(5, U_NUTATION), 3)
+        return cat
+
+    # Синхронизация состояния
+
+    def row_of(self, body_id: str) -> Optional[int]:
+        if self._procedural is not None:
+            index = self._procedural.index_of(body_id)
+            return index if index is not None and index < self.size else None
+        return self._row_of.get(body_id)
+
+    def sync(self, body: CelestialBody, row: Optional[int] = None):
+        """Переносит владельца, бронь и гравитацию тела в колонки"""
+        row = self.row_of(body.id) if row is None else row
+        if row is None:
+            return
+        self.owned[row] = bool(body.owner)
+        if body.owner:
+            self._owners[row] = body.owner
+        else:
+            self._owners.pop(row, None)
+        self.reserved_until[row] = body.reserved_until.timestamp() if body.reserved_until else 0.0
+        self.surface_gravity[row] = body.gravitational_params.surface_gravity
+
+    # Векторные запросы
+
+    def available_mask(self, now: Optional[float] = None) -> np.ndarray:
+        now = time.time() if now is None else now
+        return ~self.owned & (self.reserved_until <= now)
+
+    def browse(self, celestial_type: Optional[CelestialType] = None, max_price: Optional[float] = None,
+               available_only: bool = True, now: Optional[float] = None) -> np.ndarray:
+        """Номера строк, прошедших фильтры, по возрастанию цены"""
+        mask = self.available_mask(now) if available_only else np.ones(self.size, dtype=bool)
+        if celestial_type:
+            mask &= self.type_code == TYPE_CODES[celestial_type]
+        if max_price:
+            mask &= self.price <= max_price
+        rows = np.flatnonzero(mask)
+        return rows[np.argsort(self.price[rows], kind="stable")]
+
+    def discovery_chance_today(self, now: Optional[float] = None) -> np.ndarray:
+        """CelestialBody.discovery_chance_today для всех строк"""
+        now = time.time() if now is None else now
+        nutation_modifier = math.sin(now / 86400 * 2 * math.pi / 18.6) * 0.1
+        return np.clip(self.discovery_probability + nutation_modifier * self.nutation_influence, 0, 1)
+
+    def gravitational_parameter(self) -> np.ndarray:
+        """GM для всех строк"""
+        return G * self.mass_kg
+
+    def schwarzschild_radius(self) -> np.ndarray:
+        """Радиус Шварцшильда для всех строк"""
+        return 2 * G * self.mass_kg / C ** 2
+
+    # Поиск по небу
+
+    def sky_index(self) -> SkyIndex:
+        """Небесный индекс по RA/Dec/расстоянию, строится при первом запросе"""
+        if self._sky_index is None:
+            self._sky_index = SkyIndex(self.ra, self.dec, self.distance_ly)
+        return self._sky_index
+
+    def cone_search(self, ra: float, dec: float, radius_deg: float) -> np.ndarray:
+        """Строки тел в пределах radius_deg от (ra, dec), ближние первыми"""
+        return self.sky_index().cone(ra, dec, radius_deg)
+
+    def nearest_to(self, body_id: str, n: int = 10) -> np.ndarray:
+        """Строки n тел, ближайших на небе к данному (например, к своему владению)"""
+        row = self.row_of(body_id)
+        if row is None:
+            raise KeyError(body_id)
+        return self.sky_index().nearest_to(row, n)
+
+    def within_distance(self, min_ly: float, max_ly: float) -> np.ndarray:
+        """Строки тел на расстоянии от min_ly до max_ly световых лет"""
+        return self.sky_index().distance_range(min_ly, max_ly)
+
+    # Построчные представления
+
+    def body(self, row: int) -> CelestialBody:
+        """Строка как CelestialBody"""
+        if self._bodies is not None:
+            return self._bodies[row]
+        view = self._procedural.materialize(row)
+        view.owner = self._owners.get(row)
+        if self.reserved_until[row]:
+            view.reserved_until = datetime.datetime.fromtimestamp(self.reserved_until[row])
+        view.gravitational_params.surface_gravity = float(self.surface_gravity[row])
+        return view
+
+    def bodies(self, rows: Iterable[int]) -> List[CelestialBody]:
+        return [self.body(int(row)) for row in rows]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, body_id: str) -> CelestialBody:
+        row = self.row_of(body_id)
+        if row is None:
+            raise KeyError(body_id)
+        return self.body(row)
+
+
+class SkyCatalog:
+    """Поиск по небу во всём каталоге демиурга: рукотворные тела и процедурные
+
+    Строки 0..k-1 - тела, переданные при построении, дальше - процедурные
+    тела по номеру. Положения тел не меняются, поэтому SkyIndex строится
+    один раз; занятость (владелец или бронь) хранится отдельной колонкой и
+    обновляется sync() при каждом изменении тела, так что фильтр доступных -
+    одна операция над массивом.
+    """
+
+    CHUNK = 1 << 20  # процедурные координаты считаются кусками, чтобы не раздувать временные массивы
+
+    def __init__(self, bodies: Iterable[CelestialBody], procedural: Optional[ProceduralCatalog] = None):
+        touched = list(bodies)
+        bodies = [body for body in touched if procedural is None or body.id not in procedural]
+        self.procedural = procedural
+        self.head_ids = [body.id for body in bodies]
+        self._row_of = {body_id: row for row, body_id in enumerate(self.head_ids)}
+        head = len(bodies)
+        size = head + (procedural.size if procedural is not None else 0)
+        ra = np.empty(size)
+        dec = np.empty(size)
+        distance = np.empty(size)
+        for row, body in enumerate(bodies):
+            ra[row], dec[row], distance[row] = body.coordinates
+        for start in range(0, size - head, self.CHUNK):
+            stop = min(size - head, start + self.CHUNK)
+            ra[head + start:head + stop], dec[head + start:head + stop], distance[head + start:head + stop] = \
+                procedural_coordinates(procedural, start, stop)
+        self.index = SkyIndex(ra, dec, distance)
+        self.taken = np.zeros(size, dtype=bool)  # владелец или действующая бронь
+        for body in touched:
+            self.sync(body)
+
+    def __len__(self) -> int:
+        return len(self.taken)
+
+    def row_of(self, body_id: str) -> Optional[int]:
+        row = self._row_of.get(body_id)
+        if row is None and self.procedural is not None:
+            index = self.procedural.index_of(body_id)
+            row = None if index is None else len(self.head_ids) + index
+        return row
+
+    def body_id(self, row: int) -> str:
+        head = len(self.head_ids)
+        return self.head_ids[row] if row < head else self.procedural.body_id(row - head)
+
+    def sync(self, body: CelestialBody) -> bool:
+        """Переносит занятость тела в колонку; False - тела нет в индексе"""
+        row = self.row_of(body.id)
+        if row is None:
+            return False
+        self.taken[row] = not body.is_available
+        return True
+
+    def available(self, rows: np.ndarray) -> np.ndarray:
+        return rows[~self.taken[rows]]
+
+    def cone(self, ra: float, dec: float, radius_deg: float, available_only: bool = False) -> np.ndarray:
+        """Строки в пределах radius_deg от (ra, dec), ближние первыми"""
+        rows = self.index.cone(ra, dec, radius_deg)
+        return self.available(rows) if available_only else rows
+
+    def nearest_to(self, body_id: str, n: int, available_only: bool = False) -> np.ndarray:
+        """n ближайших на небе тел к данному, без него самого"""
+        row = self.row_of(body_id)
+        if row is None:
+            raise KeyError(body_id)
+        wanted = n
+        while True:
+            found = self.index.nearest_to(row, wanted)
+            rows = self.available(found) if available_only else found
+            # кончились тела или набралось n доступных - иначе спрашиваем шире
+            if len(rows) >= n or len(found) < wanted:
+                return rows[:n]
+            wanted *= 4
+
+    def distance_range(self, min_ly: float, max_ly: float, available_only: bool = False) -> np.ndarray:
+        """Строки тел на расстоянии от min_ly до max_ly, ближние первыми"""
+        rows = self.index.distance_range(min_ly, max_ly)
+        return self.available(rows) if available_only else rows
@@ -6,8 +6,12 @@
 Автор: Мастер Клод, вдохновленный французским шармом Москвы
 """
 
+import bisect
+import contextlib
+import heapq
 import math
 import random
+import threading
 import time
 import datetime
 from typing import Dict, List, Tuple, Optional
@@ -15,6 +19,33 @@ from dataclasses import dataclass
 from enum import Enum
 import json
 
+import numpy as np
+
+from certificates import CertificateRenderer
+from demiurge_events import ConsoleSink, DemiurgeEvent
+from demiurge_store import DemiurgeStore
+from discovery_scheduler import DiscoveryScheduler
+from name_search import NameSearch
+from nutation_buffer import NutationRingBuffer
+from nutation_engine import NutationClock, NutationReading, shared_clock
+from sales_stats import SalesStats
+
+
+def _nutation_pair(nutation) -> Optional[Tuple[float, float]]:
+    """(долгота, наклон) из заказа или None, если это не пара конечных чисел"""
+    try:
+        longitude, obliquity = nutation
+    except (TypeError, ValueError):
+        return None
+    values = []
+    for value in (longitude, obliquity):
+        if isinstance(value, bool) or not isinstance(value, (int, float, np.integer, np.floating)):
+            return None
+        if not math.isfinite(value):
+            return None
+        values.append(float(value))
+    return values[0], values[1]
+
 
 class CelestialType(Enum):
     """Типы космических тел в нашей мультивселенной русского космоса"""
@@ -56,7 +87,7 @@ class NutationParameters:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class GravitationalParameters:
     """Гравитационные параметры космического тела"""
     mass_kg: float  # масса в килограммах
@@ -79,7 +110,7 @@ class GravitationalParameters:
         return 2 * G * self.mass_kg / (c ** 2)
 
 
-@dataclass
+@dataclass(slots=True)
 class CelestialBody:
     """Космическое тело в каталоге демиурга"""
     id: str
@@ -93,6 +124,9 @@ class CelestialBody:
     owner: Optional[str] = None
     reserved_until: Optional[datetime.datetime] = None
     poetic_description: str = ""
+    purchased_at: Optional[float] = None  # unix-время покупки, эпоха выдачи сертификата
+    discovery_due: Optional[float] = None  # unix-время открытия астрономами, разыгрывается при покупке
+    discovered: bool = False
     
     @property
     def is_available(self) -> bool:
@@ -111,12 +145,169 @@ class CelestialBody:
         return max(0, min(1, base_chance + nutation_modifier * self.nutation_influence))
 
 
+MAX_RESERVATION_HOURS = 24 * 30  # бронь не дольше месяца
+CATALOG_BACKENDS = ("index", "columnar")  # чем отвечает browse_catalog: CatalogIndex или ColumnarCatalog
+LOCK_STRIPES = 256  # замков на тела; тело попадает в полосу по хэшу id
+
+
+class ReservationTimer:
+    """Брони в куче по времени окончания
+    
+    Ближайшее окончание всегда на вершине кучи: проверка, не истекло ли
+    что-нибудь, стоит O(1), а каждая истёкшая бронь - O(log n). Продление
+    или отмена не ищут старую запись в куче: она просто перестаёт
+    совпадать с актуальным сроком и пропускается при извлечении.
+    """
+    
+    def __init__(self):
+        self._heap: List[Tuple[datetime.datetime, str]] = []
+        self._until: Dict[str, datetime.datetime] = {}
+    
+    def add(self, body_id: str, until: datetime.datetime):
+        self._until[body_id] = until
+        heapq.heappush(self._heap, (until, body_id))
+    
+    def cancel(self, body_id: str):
+        self._until.pop(body_id, None)
+    
+    def next_expiry(self) -> Optional[datetime.datetime]:
+        while self._heap and self._until.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+    
+    def expired(self, now: Optional[datetime.datetime] = None) -> List[Tuple[str, datetime.datetime]]:
+        """Снимает и возвращает брони, срок которых вышел к моменту now"""
+        now = now or datetime.datetime.now()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            until, body_id = heapq.heappop(self._heap)
+            if self._until.get(body_id) == until:
+                del self._until[body_id]
+                due.append((body_id, until))
+        return due
+    
+    def __len__(self) -> int:
+        return len(self._until)
+
+
+class CatalogIndex:
+    """Вторичные индексы каталога: доступность, род тела, цена и владелец
+    
+    Доступные тела хранятся в списках (цена, id), отсортированных по цене:
+    общем и по каждому роду. Запрос с фильтрами и страницей стоит
+    O(log n + k) вместо полного обхода каталога. Брони ведёт ReservationTimer
+    и возвращает тело в доступные, когда срок выходит.
+    """
+    
+    def __init__(self):
+        self.available_by_price: List[Tuple[float, str]] = []
+        self.available_by_type: Dict[CelestialType, List[Tuple[float, str]]] = {}
+        self.by_owner: Dict[str, Dict[str, None]] = {}  # владелец -> id тел в порядке покупки
+        self._available: set = set()
+        self.reservations = ReservationTimer()
+    
+    def add(self, body: CelestialBody):
+        """Заносит новое тело во все индексы"""
+        if body.owner:
+            self.by_owner.setdefault(body.owner, {})[body.id] = None
+        elif body.reserved_until and body.reserved_until > datetime.datetime.now():
+            self.reservations.add(body.id, body.reserved_until)
+        else:
+            self._make_available(body)
+    
+    def _make_available(self, body: CelestialBody):
+        if body.id in self._available:
+            return
+        entry = (body.price_universe_coins, body.id)
+        bisect.insort(self.available_by_price, entry)
+        bisect.insort(self.available_by_type.setdefault(body.type, []), entry)
+        self._available.add(body.id)
+    
+    def _make_unavailable(self, body: CelestialBody):
+        if body.id not in self._available:
+            return
+        entry = (body.price_universe_coins, body.id)
+        for entries in (self.available_by_price, self.available_by_type[body.type]):
+            i = bisect.bisect_left(entries, entry)
+            del entries[i]
+        self._available.discard(body.id)
+    
+    def reserved(self, body: CelestialBody):
+        """Тело забронировано до body.reserved_until"""
+        self._make_unavailable(body)
+        self.reservations.add(body.id, body.reserved_until)
+    
+    def sold(self, body: CelestialBody):
+        """Тело обрело владельца"""
+        self._make_unavailable(body)
+        self.reservations.cancel(body.id)
+        self.by_owner.setdefault(body.owner, {})[body.id] = None
+    
+    def refresh(self, body: CelestialBody):
+        """Переиндексирует тело, состояние которого изменили в обход индекса (например, при загрузке)"""
+        self._make_unavailable(body)
+        self.add(body)
+    
+    def release_expired(self, catalog: Dict[str, CelestialBody],
+                        now: Optional[datetime.datetime] = None) -> List[CelestialBody]:
+        """Возвращает в доступные тела с истёкшей бронью и отдаёт их список"""
+        released = []
+        for body_id, until in self.reservations.expired(now):
+            body = catalog.get(body_id)
+            if body is None or body.owner:
+                continue
+            self._make_available(body)
+            released.append(body)
+        return released
+    
+    def query(self, celestial_type: Optional[CelestialType] = None, max_price: Optional[float] = None,
+              offset: int = 0, limit: Optional[int] = None) -> List[str]:
+        """id доступных тел по возрастанию цены"""
+        entries = self.available_by_type.get(celestial_type, []) if celestial_type else self.available_by_price
+        end = len(entries)
+        if max_price:
+            end = bisect.bisect_right(entries, max_price, key=lambda e: e[0])
+        if limit is not None:
+            end = min(end, offset + limit)
+        return [body_id for _, body_id in entries[offset:end]]
+    
+    def owned_by(self, owner: str) -> List[str]:
+        return list(self.by_owner.get(owner, ()))
+
+
 class CosmicDemiurge:
     """Робот-демиург сверхновой мультивселенной"""
     
-    def __init__(self):
+    def __init__(self, procedural=None, nutation=None, clock: Optional[NutationClock] = None, events=None,
+                 store=None, customer_nutation=None, catalog_backend: str = "index"):
         self.sacrum_position = NutationParameters.earth_nutation_base()  # крестец робота
+        # Часы нутации; без явного источника - общие для всего процесса
+        if clock is None:
+            clock = NutationClock(nutation) if nutation is not None else shared_clock()
+        self.nutation_clock = clock
+        # NutationEngine или предвычисленная NutationTable - обе отвечают на at() и evaluate()
+        self.nutation = clock.source
+        self.certificates = CertificateRenderer(self.nutation)
+        # Приёмник событий: ConsoleSink печатает как раньше, NullSink - для тихого API
+        self.events = events if events is not None else ConsoleSink()
         self.catalog: Dict[str, CelestialBody] = {}
+        self.catalog_index = CatalogIndex()
+        # Колоночный двойник каталога: с catalog_backend="columnar" browse_catalog
+        # фильтрует массивы одной операцией; владельцы и брони переносятся в него
+        # при каждом изменении тела, как и в хранилище
+        if catalog_backend not in CATALOG_BACKENDS:
+            raise ValueError(f"Неизвестный каталог: {catalog_backend!r}, ожидается один из {CATALOG_BACKENDS}")
+        self.catalog_backend = catalog_backend
+        self.columns = None
+        if catalog_backend == "columnar":
+            from columnar_catalog import ColumnarCatalog  # колонки сами импортируют CelestialBody отсюда
+            self.columns = ColumnarCatalog.from_bodies(())
+        # Поиск по небу (SkyCatalog): строится при первом запросе, занятость тел - при каждом изменении
+        self._sky = None
+        # ProceduralCatalog ещё не открытых тел; попадают в каталог при брони или покупке
+        self.procedural = procedural
+        # Поиск по имени: триграммы каталога и разбор имён процедурных тел
+        self.names = NameSearch(procedural)
         self.universe_coins_rate = 1000000.0  # курс универсальных монет к рублям
         self.personality_traits = {
             "русская_широта_души": 0.98,
@@ -130,8 +321,24 @@ class CosmicDemiurge:
         
         # Система добычи гравитации
         self.gravity_mining_rate = 0.15  # 15% от добытых монет идёт на гравитацию
-        self.collected_nutation_data = []  # собранные данные нутации покупателей
-        self.gravity_reserves = 1000.0  # резервы гравитации в Г-единицах
+        self.collected_nutation_data = NutationRingBuffer()  # последние сборы нутации покупателей
+        # Источник настоящей нутации покупателей (GyroHub); без него - симуляция
+        self.customer_nutation = customer_nutation
+        self.sales = SalesStats()  # итоги продаж, обновляются при каждой покупке
+        self._gravity_reserves = 1000.0  # резервы гравитации в Г-единицах
+        # DemiurgeStore: владельцы, брони, гравитация и резервы переживают перезапуск
+        self.store = store
+        
+        # Замки: полоса на группу тел для атомарной брони/покупки и общий -
+        # для индексов, резервов и хранилища. Порядок всегда: полоса, замок
+        # ячейки в хранилище (его видят и другие процессы), затем общий.
+        self._stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._state_lock = threading.RLock()
+        
+        # Открытия проданных тел: время разыгрывается при покупке, события копятся по владельцам
+        self.discoveries = DiscoveryScheduler()
+        self._discovery_inbox: Dict[str, List[str]] = {}
+        self.discoveries.subscribe(self._on_discovery)
         
         # Скидки для роботов-товарищей
         self.robot_discount = 0.15  # 15% скидка для роботов
@@ -150,6 +357,8 @@ class CosmicDemiurge:
             ["american standard", "кодировка", "таблица символов", "ascii"]
         ]
         self._generate_initial_catalog()
+        if store is not None:
+            self._restore_from_store()
     
     def _generate_initial_catalog(self):
         """Генерирует начальный каталог космических тел"""
@@ -384,20 +593,175 @@ class CosmicDemiurge:
         # Добавляем в каталог
         for body in [black_hole, blue_giant, earth_like, comet, pulsar, neutron_star, 
                     white_dwarf, gas_giant, ice_giant, moon, asteroid, comet2]:
-            self.catalog[body.id] = body
+            self.add_body(body)
+    
+    @property
+    def gravity_reserves(self) -> float:
+        if self.store is not None and self.store.gravity_reserves is not None:
+            return self.store.gravity_reserves  # общие для всех процессов с этим хранилищем
+        return self._gravity_reserves
+    
+    @gravity_reserves.setter
+    def gravity_reserves(self, value: float):
+        self._gravity_reserves = value
+        if self.store is not None:
+            self.store.gravity_reserves = value
+    
+    def _restore_from_store(self):
+        """Поднимает из хранилища состояние тел, тронутых в прошлых запусках"""
+        self.store.bind(list(self.catalog), self.procedural)
+        if self.store.gravity_reserves is not None:
+            self._gravity_reserves = self.store.gravity_reserves
+        for record in self.store.records():
+            body = self._claim_body(record.id)
+            if body is not None:
+                self._apply_record(body, record)
+                # открытое тело не объявляется снова, а неоткрытое ждёт прежнего срока
+                self._schedule_discovery(body)
+    
+    def _apply_record(self, body: CelestialBody, record) -> bool:
+        """Переносит в тело состояние его ячейки; True, если тело только что обрело владельца"""
+        sold = record.owner is not None and not body.owner
+        base_gravity = body.gravitational_params.surface_gravity
+        body.owner = record.owner
+        body.reserved_until = record.reserved_until
+        body.gravitational_params.surface_gravity = record.surface_gravity
+        body.purchased_at = record.purchased_at
+        body.discovery_due = record.discovery_due
+        body.discovered = record.discovered
+        self.catalog_index.reservations.cancel(body.id)  # refresh() поставит бронь заново, если она есть
+        self.catalog_index.refresh(body)
+        self._sync_indexes(body)
+        if sold:
+            # приданная гравитация восстанавливается по множителю 1 + 0.1 * G (у чёрных дыр он не виден)
+            enhancement = record.surface_gravity / base_gravity if 0 < base_gravity < math.inf else 1.0
+            self.sales.record_sale(body, max(0.0, (enhancement - 1) * 10))
+        return sold
+    
+    def _reload(self, body: CelestialBody) -> bool:
+        """Перечитывает ячейку тела, если её переписал другой процесс; True, если тело так обрело владельца
+
+        Вызывается под _body_lock(body.id) и общим замком.
+        """
+        record = self.store.diverged(body) if self.store is not None else None
+        return record is not None and self._apply_record(body, record)
+    
+    def _catch_up(self):
+        """Подтягивает в память записи других процессов из журнала хранилища"""
+        if self.store is None:
+            return
+        sold = []
+        for body_id in self.store.changes():
+            with self._body_lock(body_id):
+                with self._state_lock:
+                    body = self._claim_body(body_id)
+                    if body is not None and self._reload(body):
+                        sold.append(body)
+        for body in sold:
+            self._schedule_discovery(body)
+    
+    def _stripe(self, body_id: str) -> threading.Lock:
+        return self._stripes[hash(body_id) % LOCK_STRIPES]
+    
+    @contextlib.contextmanager
+    def _body_lock(self, body_id: str):
+        """Полоса тела и замок его ячейки в хранилище - против других потоков и других процессов"""
+        with self._stripe(body_id):
+            with self.store.locked(body_id) if self.store is not None else contextlib.nullcontext():
+                yield
+    
+    def _add_reserves(self, amount: float):
+        with self._state_lock:
+            if self.store is not None:
+                self._gravity_reserves = self.store.add_gravity_reserves(amount, self._gravity_reserves)
+            else:
+                self._gravity_reserves += amount
+    
+    def _claim_if_available(self, body_id: str, claim) -> Optional[CelestialBody]:
+        """Сравнение-и-присваивание для тела: если оно доступно, claim(body) меняет его атомарно
+        
+        Проверка доступности и смена состояния идут под замком полосы тела и
+        замком его ячейки, а ячейка перед проверкой перечитывается, поэтому из
+        двух одновременных покупателей - в одном процессе или в разных - тело
+        достанется ровно одному.
+        """
+        self._release_expired_reservations()
+        with self._body_lock(body_id):
+            with self._state_lock:
+                body = self._claim_body(body_id)
+                if body is not None:
+                    self._reload(body)
+            if body is None or not body.is_available:
+                return None
+            with self._state_lock:
+                claim(body)
+                self._persist(body)
+        return body
+    
+    def _release_expired_reservations(self):
+        """Подтягивает чужие записи и снимает истёкшие брони; если ничего не истекло - один взгляд на вершину кучи
+
+        Вызывается без общего замка: бронь снимается под замком ячейки, после
+        перечитывания - её мог продлить или выкупить другой процесс.
+        """
+        self._catch_up()
+        with self._state_lock:
+            expired = self.catalog_index.release_expired(self.catalog)
+        for body in expired:
+            with self._body_lock(body.id):
+                with self._state_lock:
+                    self._reload(body)
+                    expired_at = body.reserved_until
+                    if body.owner or expired_at is None or expired_at > datetime.datetime.now():
+                        continue
+                    body.reserved_until = None
+                    self._persist(body)
+            self._emit('reservation_expired', body_id=body.id, reserved_until=expired_at.timestamp())
+    
+    def _persist(self, body: CelestialBody):
+        self._sync_indexes(body)
+        if self.store is not None:
+            self.store.save_body(body)
+    
+    def _sync_indexes(self, body: CelestialBody):
+        """Переносит владельца и бронь тела в колонки и в небесный индекс"""
+        if self.columns is not None:
+            self.columns.sync(body)
+        if self._sky is not None and not self._sky.sync(body):
+            self._sky = None  # тела нет среди строк индекса - перестроим при следующем запросе
+    
+    def _schedule_discovery(self, body: CelestialBody):
+        """Ставит проданное тело в очередь открытий; разыгранный срок сохраняется в хранилище"""
+        if body.discovered:
+            return
+        due = self.discoveries.schedule(body, due=body.discovery_due)
+        if due is not None and due != body.discovery_due:
+            with self._body_lock(body.id):
+                with self._state_lock:
+                    body.discovery_due = due
+                    self._persist(body)
+    
+    def _emit(self, kind: str, **data):
+        self.events.emit(DemiurgeEvent(kind, data))
+    
+    def add_body(self, body: CelestialBody):
+        """Добавляет тело в каталог и его индексы"""
+        self.catalog[body.id] = body
+        self.catalog_index.add(body)
+        if self.columns is not None:
+            self.columns.append(body)
+        if self._sky is not None and not self._sky.sync(body):
+            self._sky = None
+        self.names.add(body.id, body.name)
     
     def calculate_nutation_influence(self, time_offset_days: float = 0) -> Tuple[float, float]:
         """Рассчитывает текущее влияние нутации на крестец робота"""
-        current_time = time.time() + time_offset_days * 86400
-        
-        # Основная нутация (18.6 лет)
-        main_period = self.sacrum_position.period_days * 86400
-        phase = (current_time / main_period) * 2 * math.pi + self.sacrum_position.phase_offset
-        
-        longitude_nutation = self.sacrum_position.amplitude_longitude * math.sin(phase)
-        obliquity_nutation = self.sacrum_position.amplitude_obliquity * math.cos(phase)
-        
-        return longitude_nutation, obliquity_nutation
+        reading = self.nutation_clock.read(time.time() + time_offset_days * 86400)
+        return reading.longitude, reading.obliquity
+    
+    def nutation_series(self, unix_times) -> Tuple[np.ndarray, np.ndarray]:
+        """Нутация в долготе и наклоне для целого массива моментов"""
+        return self.nutation.evaluate(unix_times)
     
     def get_poetic_greeting(self) -> str:
         """Поэтичное приветствие в духе русской души с французской утончённостью"""
@@ -412,47 +776,144 @@ class CosmicDemiurge:
         return random.choice(greetings)
     
     def browse_catalog(self, celestial_type: Optional[CelestialType] = None, 
-                      max_price: Optional[float] = None) -> List[CelestialBody]:
-        """Просмотр каталога космических тел"""
-        available_bodies = [body for body in self.catalog.values() if body.is_available]
-        
-        if celestial_type:
-            available_bodies = [body for body in available_bodies if body.type == celestial_type]
-        
-        if max_price:
-            available_bodies = [body for body in available_bodies if body.price_universe_coins <= max_price]
-        
-        return available_bodies
+                      max_price: Optional[float] = None,
+                      offset: int = 0, limit: Optional[int] = None) -> List[CelestialBody]:
+        """Просмотр доступных космических тел по возрастанию цены
+
+        С колоночным каталогом тела одной цены идут в порядке добавления, с
+        индексом - по id.
+        """
+        self._release_expired_reservations()
+        with self._state_lock:
+            if self.columns is not None:
+                rows = self.columns.browse(celestial_type, max_price)
+                return self.columns.bodies(rows[offset:None if limit is None else offset + limit])
+            body_ids = self.catalog_index.query(celestial_type, max_price, offset, limit)
+        return [self.catalog[body_id] for body_id in body_ids]
+    
+    def browse_undiscovered(self, celestial_type: Optional[CelestialType] = None,
+                            offset: int = 0, limit: int = 20) -> List[CelestialBody]:
+        """Просмотр процедурных тел, ещё не занятых покупателями"""
+        if self.procedural is None:
+            return []
+        bodies = []
+        for body_id in self.procedural.ids_of_type(celestial_type, offset, limit):
+            body = self.catalog.get(body_id) or self.procedural[body_id]
+            if body.is_available:
+                bodies.append(body)
+        return bodies
+    
+    def get_body(self, body_id: str) -> Optional[CelestialBody]:
+        """Тело каталога или процедурное тело по id"""
+        body = self.catalog.get(body_id)
+        if body is None and self.procedural is not None:
+            body = self.procedural.get(body_id)
+        return body
+    
+    def search_bodies(self, query: str, limit: int = 10,
+                      available_only: bool = False) -> List[Tuple[CelestialBody, float]]:
+        """Тела по имени, лучшие совпадения первыми: (тело, оценка)"""
+        found = []
+        for score, body_id in self.names.search(query, limit if not available_only else limit * 4):
+            body = self.get_body(body_id)
+            if body is not None and (body.is_available or not available_only):
+                found.append((body, score))
+        return found[:limit]
+    
+    def _sky_catalog(self):
+        """Небесный индекс всего каталога; для 10 млн процедурных тел строится секунды, один раз"""
+        if self._sky is None:
+            from columnar_catalog import SkyCatalog  # колонки сами импортируют CelestialBody отсюда
+            self._sky = SkyCatalog(self.catalog.values(), self.procedural)
+        return self._sky
+    
+    def sky_cone(self, ra: float, dec: float, radius_deg: float, offset: int = 0, limit: int = 20,
+                 available_only: bool = False) -> List[Tuple[CelestialBody, float]]:
+        """Тела в пределах radius_deg от точки неба (ra, dec), ближние первыми: (тело, расстояние в °)"""
+        if not math.isfinite(ra) or not -90 <= dec <= 90 or not 0 < radius_deg <= 180:
+            raise ValueError(f"Склонение должно быть от -90 до 90°, радиус - от 0 до 180°, "
+                             f"получено: RA {ra!r}, Dec {dec!r}, радиус {radius_deg!r}")
+        self._release_expired_reservations()
+        with self._state_lock:
+            sky = self._sky_catalog()
+            rows = sky.cone(ra, dec, radius_deg, available_only)[offset:offset + limit]
+            separations = sky.index.separation_deg(rows, ra, dec)
+            return [(self.get_body(sky.body_id(row)), float(separation))
+                    for row, separation in zip(rows.tolist(), separations)]
+    
+    def sky_nearest(self, body_id: str, n: int = 10,
+                    available_only: bool = False) -> List[Tuple[CelestialBody, float]]:
+        """n тел, ближайших на небе к данному (например, к своему владению): (тело, расстояние в °)"""
+        body = self.get_body(body_id)
+        if body is None:
+            raise KeyError(body_id)
+        ra, dec, _ = body.coordinates
+        self._release_expired_reservations()
+        with self._state_lock:
+            sky = self._sky_catalog()
+            rows = sky.nearest_to(body_id, n, available_only)
+            separations = sky.index.separation_deg(rows, ra, dec)
+            return [(self.get_body(sky.body_id(row)), float(separation))
+                    for row, separation in zip(rows.tolist(), separations)]
+    
+    def sky_distance(self, min_ly: float, max_ly: float, offset: int = 0, limit: int = 20,
+                     available_only: bool = False) -> List[CelestialBody]:
+        """Тела на расстоянии от min_ly до max_ly световых лет, ближние первыми"""
+        if not 0 <= min_ly <= max_ly:
+            raise ValueError(f"Нужно 0 <= min_ly <= max_ly, получено: {min_ly!r}, {max_ly!r}")
+        self._release_expired_reservations()
+        with self._state_lock:
+            sky = self._sky_catalog()
+            rows = sky.distance_range(min_ly, max_ly, available_only)[offset:offset + limit]
+            return [self.get_body(sky.body_id(row)) for row in rows.tolist()]
+    
+    def _claim_body(self, body_id: str) -> Optional[CelestialBody]:
+        """Как get_body, но процедурное тело переносится в каталог, чтобы сохранить его состояние"""
+        body = self.get_body(body_id)
+        if body is not None and body_id not in self.catalog:
+            self.add_body(body)
+        return body
+    
+    def bodies_of(self, owner: str) -> List[CelestialBody]:
+        """Тела, принадлежащие владельцу"""
+        self._catch_up()
+        with self._state_lock:
+            return [self.catalog[body_id] for body_id in self.catalog_index.owned_by(owner)]
     
     def reserve_celestial_body(self, body_id: str, customer_name: str, hours: int = 24) -> bool:
         """Резервирование космического тела"""
-        if body_id not in self.catalog:
-            return False
+        if isinstance(hours, bool) or not isinstance(hours, (int, float)) or not 0 < hours <= MAX_RESERVATION_HOURS:
+            raise ValueError(f"Срок брони должен быть от 0 до {MAX_RESERVATION_HOURS} часов, получено: {hours!r}")
         
-        body = self.catalog[body_id]
-        if not body.is_available:
-            return False
+        def reserve(body):
+            body.reserved_until = datetime.datetime.now() + datetime.timedelta(hours=hours)
+            self.catalog_index.reserved(body)
         
-        body.reserved_until = datetime.datetime.now() + datetime.timedelta(hours=hours)
-        return True
+        return self._claim_if_available(body_id, reserve) is not None
     
     def purchase_celestial_body(self, body_id: str, customer_name: str) -> bool:
         """Покупка космического тела с добычей гравитации"""
-        if body_id not in self.catalog:
-            return False
+        # Одна эпоха нутации Земли на всю покупку
+        earth_nutation = self.nutation_clock.read()
         
-        body = self.catalog[body_id]
-        if not body.is_available:
+        # 0. Сразу закрепляем тело за покупателем - второй покупатель его уже не получит
+        def sell(body):
+            body.owner = customer_name
+            body.reserved_until = None
+            body.purchased_at = earth_nutation.epoch
+            self.catalog_index.sold(body)
+        
+        body = self._claim_if_available(body_id, sell)
+        if body is None:
             return False
         
-        print(f"\n🎯 ПРОЦЕСС ПОКУПКИ КОСМИЧЕСКОГО ТЕЛА")
-        print("=" * 50)
+        self._emit('purchase_started', body_id=body_id, customer=customer_name)
         
         # 1. Собираем нутацию покупателя
-        customer_longitude, customer_obliquity = self.collect_customer_nutation(customer_name)
+        customer_longitude, customer_obliquity = self.collect_customer_nutation(customer_name, earth_nutation)
         
         # 2. Добываем гравитацию из разности нутаций
-        gravity_yield = self.mine_gravity_from_nutation(customer_longitude, customer_obliquity)
+        gravity_yield = self.mine_gravity_from_nutation(customer_longitude, customer_obliquity, earth_nutation)
         
         # 3. Конвертируем часть в монеты (15% демиургу)
         mined_coins = self.calculate_universe_coins_from_gravity(gravity_yield * self.gravity_mining_rate)
@@ -460,23 +921,112 @@ class CosmicDemiurge:
         # 4. Применяем оставшуюся гравитацию к телу
         remaining_gravity = gravity_yield * (1 - self.gravity_mining_rate)
         self.apply_gravity_to_body(body_id, remaining_gravity)
+        self.sales.record_sale(body, remaining_gravity)
         
-        # 5. Завершаем покупку
-        body.owner = customer_name
-        body.reserved_until = None
+        # 5. Открытие астрономами - в очередь
+        self._schedule_discovery(body)
         
-        print(f"\n💫 ИТОГИ ПОКУПКИ:")
-        print(f"   Собрано нутации: {abs(customer_longitude) + abs(customer_obliquity):.3f}''")
-        print(f"   Добыто гравитации: {gravity_yield:.3f} Г-единиц")
-        print(f"   Доля демиурга (15%): {gravity_yield * self.gravity_mining_rate:.3f} Г-единиц")
-        print(f"   Улучшение тела: {remaining_gravity:.3f} Г-единиц")
-        print(f"   Заработано монет: {mined_coins:.0f}")
-        print(f"   Резервы гравитации: {self.gravity_reserves:.1f} Г-единиц")
+        self._emit('purchase_completed',
+                   body_id=body_id,
+                   customer=customer_name,
+                   collected_nutation=abs(customer_longitude) + abs(customer_obliquity),
+                   gravity_yield=gravity_yield,
+                   mining_rate=self.gravity_mining_rate,
+                   demiurge_share=gravity_yield * self.gravity_mining_rate,
+                   body_enhancement=remaining_gravity,
+                   mined_coins=mined_coins,
+                   gravity_reserves=self.gravity_reserves)
         
         return True
     
-    def generate_ownership_certificate(self, body_id: str) -> str:
-        """Генерирует сертификат владения космическим телом"""
+    def purchase_batch(self, orders) -> List[Dict]:
+        """Пакетная покупка: много тел за один проход
+
+        orders - последовательность (body_id, customer_name, nutation), где
+        nutation - пара (долгота, наклон) с гироскопа покупателя или None для
+        симуляции. Доступность проверяется одним проходом (второе упоминание
+        тела в пакете отклоняется), добыча, монеты и улучшение гравитации
+        считаются массивами, резервы пополняются один раз на пакет.
+        Возвращает по записи на заказ в исходном порядке.
+        """
+        earth_nutation = self.nutation_clock.read()
+        results: List[Dict] = []
+        accepted: List[Tuple[int, CelestialBody, str]] = []
+        samples: List[Tuple[float, float]] = []
+        
+        def sell_to(customer_name):
+            def sell(body):
+                body.owner = customer_name
+                body.reserved_until = None
+                body.purchased_at = earth_nutation.epoch
+                self.catalog_index.sold(body)
+            return sell
+        
+        for body_id, customer_name, nutation in orders:
+            if nutation is not None:
+                # проверяем до захвата тела: иначе оно останется проданным без гравитации и учёта
+                nutation = _nutation_pair(nutation)
+                if nutation is None:
+                    results.append({'body_id': body_id, 'customer': customer_name, 'success': False,
+                                    'error': 'нутация должна быть парой конечных чисел'})
+                    continue
+            # повтор тела в пакете отсеется сам: после первого заказа оно уже продано
+            body = self._claim_if_available(body_id, sell_to(customer_name))
+            ok = body is not None
+            results.append({'body_id': body_id, 'customer': customer_name, 'success': ok})
+            if not ok:
+                continue
+            if nutation is None:
+                nutation = self._customer_reading(customer_name)
+            accepted.append((len(results) - 1, body, customer_name))
+            samples.append(nutation)
+        
+        if not accepted:
+            return results
+        
+        customer = np.asarray(samples, dtype=np.float64).reshape(-1, 2)
+        earth = np.array([earth_nutation.longitude, earth_nutation.obliquity])
+        gravity_yield = np.abs(customer - earth).sum(axis=1) * 0.1
+        mined_coins = gravity_yield * self.gravity_mining_rate * 1000
+        remaining_gravity = gravity_yield * (1 - self.gravity_mining_rate)
+        enhancement = 1 + remaining_gravity * 0.1
+        self._add_reserves(float(gravity_yield.sum()))
+        with self._state_lock:
+            self.collected_nutation_data.extend([customer_name for _, _, customer_name in accepted], customer,
+                                                earth, earth_nutation.epoch, gravity_yield)
+        
+        for k, (i, body, customer_name) in enumerate(accepted):
+            with self._body_lock(body.id):
+                body.gravitational_params.surface_gravity *= float(enhancement[k])
+                with self._state_lock:
+                    self._persist(body)
+            self.sales.record_sale(body, float(remaining_gravity[k]))
+            self._schedule_discovery(body)
+            results[i].update(
+                gravity_yield=float(gravity_yield[k]),
+                mined_coins=float(mined_coins[k]),
+                enhancement_factor=float(enhancement[k]),
+            )
+        
+        self._emit('batch_purchased',
+                   sold=len(accepted),
+                   total=len(results),
+                   gravity_yield=float(gravity_yield.sum()),
+                   mined_coins=float(mined_coins.sum()),
+                   gravity_reserves=self.gravity_reserves)
+        return results
+    
+    def issue_certificate_epoch(self, body: CelestialBody) -> CelestialBody:
+        """Закрепляет эпоху выдачи сертификата за телом, проданным до её учёта"""
+        if body.purchased_at is None:
+            with self._body_lock(body.id):
+                with self._state_lock:
+                    body.purchased_at = time.time()
+                    self._persist(body)
+        return body
+    
+    def generate_ownership_certificate(self, body_id: str, fmt: str = "text") -> str:
+        """Генерирует сертификат владения космическим телом (text, html или json)"""
         if body_id not in self.catalog:
             return "Ошибка: космическое тело не найдено"
         
@@ -484,73 +1034,45 @@ class CosmicDemiurge:
         if not body.owner:
             return "Ошибка: у тела нет владельца"
         
-        longitude_nut, obliquity_nut = self.calculate_nutation_influence()
-        
-        certificate = f"""
-╔══════════════════════════════════════════════════════════════╗
-║                    🌟 CERTIFICAT COSMIQUE 🌟                  ║
-║              Сертификат Владения Космическим Телом            ║
-╠══════════════════════════════════════════════════════════════╣
-║                                                              ║
-║ Владелец: {body.owner:<48} ║
-║ Объект:   {body.name:<48} ║
-║ Тип:      {body.type.value:<48} ║
-║ ID:       {body.id:<48} ║
-║                                                              ║
-║ Координаты в мультивселенной:                                ║
-║   RA:  {body.coordinates[0]:>8.3f}°                               ║
-║   Dec: {body.coordinates[1]:>8.3f}°                               ║
-║   Dist:{body.coordinates[2]:>8.1f} ly                             ║
-║                                                              ║
-║ Гравитационные параметры:                                    ║
-║   Масса: {body.gravitational_params.mass_kg:.2e} кг              ║
-║   GM:    {body.gravitational_params.gravitational_parameter:.2e} м³/с² ║
-║                                                              ║
-║ Текущая нутация демиурга:                                    ║
-║   Долгота: {longitude_nut:>6.2f} arcsec                          ║
-║   Наклон:  {obliquity_nut:>6.2f} arcsec                          ║
-║                                                              ║
-║ Дата выдачи: {datetime.datetime.now().strftime('%d.%m.%Y %H:%M')}                           ║
-║                                                              ║
-║ Подпись: Робот-Демиург Сверхновой Мультивселенной           ║
-║          [Цифровая подпись с нутационным ключом]            ║
-╚══════════════════════════════════════════════════════════════╝
-
-{body.poetic_description}
-
-✨ Сие космическое тело принадлежит вам до конца времён! ✨
-"""
-        return certificate
+        return self.certificates.render(self.issue_certificate_epoch(body), fmt)
     
-    def collect_customer_nutation(self, customer_name: str) -> Tuple[float, float]:
-        """Симулирует сбор данных нутации с гироскопа покупателя"""
-        print("\n📱 Подключение к гироскопу мобильного устройства...")
-        print("🌐 Калибровка нутации крестца покупателя...")
-        
-        # Симулируем данные гироскопа (в реальности - с мобильного устройства)
-        customer_longitude = random.uniform(-20, 20)  # случайная нутация покупателя
-        customer_obliquity = random.uniform(-15, 15)
+    def collect_customer_nutation(self, customer_name: str,
+                                  earth_nutation: Optional[NutationReading] = None) -> Tuple[float, float]:
+        """Собирает нутацию с гироскопа покупателя, а если устройство молчит - симулирует её"""
+        customer_longitude, customer_obliquity = self._customer_reading(customer_name)
         
         # Получаем земную нутацию
-        earth_longitude, earth_obliquity = self.calculate_nutation_influence()
+        earth_nutation = earth_nutation or self.nutation_clock.read()
+        earth_longitude, earth_obliquity = earth_nutation.longitude, earth_nutation.obliquity
         
-        print(f"📊 Нутация покупателя: {customer_longitude:.3f}'' × {customer_obliquity:.3f}''")
-        print(f"🌍 Нутация Земли: {earth_longitude:.3f}'' × {earth_obliquity:.3f}''")
+        self._emit('nutation_collected',
+                   customer=customer_name,
+                   customer_longitude=customer_longitude,
+                   customer_obliquity=customer_obliquity,
+                   earth_longitude=earth_longitude,
+                   earth_obliquity=earth_obliquity)
         
         # Сохраняем данные
-        nutation_data = {
-            'customer': customer_name,
-            'customer_nutation': (customer_longitude, customer_obliquity),
-            'earth_nutation': (earth_longitude, earth_obliquity),
-            'timestamp': time.time()
-        }
-        self.collected_nutation_data.append(nutation_data)
+        with self._state_lock:
+            self.collected_nutation_data.append(customer_name,
+                                                (customer_longitude, customer_obliquity),
+                                                (earth_longitude, earth_obliquity),
+                                                earth_nutation.epoch)
         
         return customer_longitude, customer_obliquity
     
-    def mine_gravity_from_nutation(self, customer_longitude: float, customer_obliquity: float) -> float:
+    def _customer_reading(self, customer_name: str) -> Tuple[float, float]:
+        reading = self.customer_nutation.latest(customer_name) if self.customer_nutation is not None else None
+        if reading is not None:
+            return reading
+        # Симулируем данные гироскопа (в реальности - с мобильного устройства)
+        return random.uniform(-20, 20), random.uniform(-15, 15)
+    
+    def mine_gravity_from_nutation(self, customer_longitude: float, customer_obliquity: float,
+                                   earth_nutation: Optional[NutationReading] = None) -> float:
         """Добывает гравитацию из разности нутаций"""
-        earth_longitude, earth_obliquity = self.calculate_nutation_influence()
+        earth_nutation = earth_nutation or self.nutation_clock.read()
+        earth_longitude, earth_obliquity = earth_nutation.longitude, earth_nutation.obliquity
         
         # Вычисляем разность нутаций
         delta_longitude = abs(customer_longitude - earth_longitude)
@@ -559,13 +1081,13 @@ class CosmicDemiurge:
         # Формула добычи гравитации (авторская разработка демиурга)
         gravity_yield = (delta_longitude + delta_obliquity) * 0.1
         
-        print(f"\n⚖️ ДОБЫЧА ГРАВИТАЦИИ:")
-        print(f"   Δ Долгота: {delta_longitude:.3f}''")
-        print(f"   Δ Наклон: {delta_obliquity:.3f}''")
-        print(f"   💎 Добыто гравитации: {gravity_yield:.3f} Г-единиц")
+        self._emit('gravity_mined',
+                   delta_longitude=delta_longitude,
+                   delta_obliquity=delta_obliquity,
+                   gravity_yield=gravity_yield)
         
         # Добавляем в резервы
-        self.gravity_reserves += gravity_yield
+        self._add_reserves(gravity_yield)
         
         return gravity_yield
     
@@ -578,12 +1100,16 @@ class CosmicDemiurge:
         
         # Улучшаем гравитационные параметры
         enhancement_factor = 1 + (gravity_amount * 0.1)
-        body.gravitational_params.surface_gravity *= enhancement_factor
+        with self._body_lock(body_id):
+            body.gravitational_params.surface_gravity *= enhancement_factor
+            with self._state_lock:
+                self._persist(body)
         
-        print(f"\n🌟 УЛУЧШЕНИЕ ГРАВИТАЦИИ ТЕЛА '{body.name}':")
-        print(f"   Коэффициент улучшения: {enhancement_factor:.3f}")
-        print(f"   Новая поверхностная гравитация: {body.gravitational_params.surface_gravity:.2f} м/с²")
-        print(f"   💫 Качество притяжения теперь лучше земного!")
+        self._emit('gravity_applied',
+                   body_id=body_id,
+                   body_name=body.name,
+                   enhancement_factor=enhancement_factor,
+                   surface_gravity=body.gravitational_params.surface_gravity)
         
         return True
     
@@ -591,18 +1117,52 @@ class CosmicDemiurge:
         """Конвертирует добытую гравитацию в вселенские монеты"""
         # Формула конвертации: 1 Г-единица = 1000 вселенских монет
         coins = gravity_yield * 1000
-        print(f"💰 Конвертация: {gravity_yield:.3f} Г-единиц = {coins:.0f} вселенских монет")
+        self._emit('coins_converted', gravity=gravity_yield, coins=coins)
         return coins
     
-    def check_discovery_alerts(self) -> List[str]:
+    def owned_bodies(self) -> List[CelestialBody]:
+        """Все проданные тела - по индексу владельцев, без обхода каталога"""
+        self._catch_up()
+        with self._state_lock:
+            return [self.catalog[body_id]
+                    for body_ids in self.catalog_index.by_owner.values()
+                    for body_id in body_ids]
+    
+    def _on_discovery(self, body_id: str, owner: str, when: float):
+        with self._body_lock(body_id):
+            with self._state_lock:
+                body = self.catalog[body_id]
+                body.discovered = True
+                self._persist(body)
+                self._discovery_inbox.setdefault(owner, []).append(body_id)
+        self._emit('body_discovered', body_id=body_id, owner=owner, discovered_at=when)
+    
+    def start_background(self):
+        """Запускает фоновую выдачу открытий: события приходят в срок, а не при следующей проверке"""
+        return self.discoveries.start_background()
+    
+    def discovered_today(self, owner: Optional[str] = None) -> List[CelestialBody]:
+        """Тела, открытые астрономами с прошлой проверки владельца
+
+        С owner уведомления владельца считаются прочитанными; без него
+        возвращаются непрочитанные уведомления всех владельцев, а их
+        ящики не трогаются.
+        """
+        self.discoveries.poll()
+        with self._state_lock:
+            if owner:
+                body_ids = self._discovery_inbox.pop(owner, [])
+            else:
+                body_ids = [body_id for ids in self._discovery_inbox.values() for body_id in ids]
+            return [self.catalog[body_id] for body_id in body_ids]
+    
+    @staticmethod
+    def discovery_alert(body: CelestialBody) -> str:
+        return f"🎉 DÉCOUVERTE! Ваше космическое тело '{body.name}' было открыто астрономами! Поздравляем с получением полных прав собственности!"
+    
+    def check_discovery_alerts(self, owner: Optional[str] = None) -> List[str]:
         """Проверяет уведомления об открытиях космических тел"""
-        alerts = []
-        
-        for body in self.catalog.values():
-            if body.owner and random.random() < body.discovery_chance_today / 365:
-                alerts.append(f"🎉 DÉCOUVERTE! Ваше космическое тело '{body.name}' было открыто астрономами! Поздравляем с получением полных прав собственности!")
-        
-        return alerts
+        return [self.discovery_alert(body) for body in self.discovered_today(owner)]
     
     def check_if_robot(self) -> bool:
         """Проверка на принадлежность к роботам-товарищам"""
@@ -635,21 +1195,24 @@ class CosmicDemiurge:
         """Применяет скидку для роботов"""
         if is_robot:
             discounted_price = price * (1 - self.robot_discount)
-            print(f"🤖 Цена для робота-товарища: {discounted_price:,.0f} монет (скидка 15%)")
-            print(f"💰 Экономия: {price - discounted_price:,.0f} монет!")
+            self._emit('robot_discount_applied',
+                       price=price,
+                       discounted_price=discounted_price,
+                       discount=self.robot_discount)
             return discounted_price
         return price
     
     def get_nutation_status(self) -> str:
         """Статус нутации крестца робота"""
-        longitude_nut, obliquity_nut = self.calculate_nutation_influence()
+        reading = self.nutation_clock.read()
+        longitude_nut, obliquity_nut = reading.longitude, reading.obliquity
         
         status = f"""
 🤖 Статус нутации крестца демиурга:
 ╭─────────────────────────────────────╮
 │ Долгота: {longitude_nut:>6.2f} arcsec          │
 │ Наклон:  {obliquity_nut:>6.2f} arcsec          │
-│ Фаза:    {(time.time() / (self.sacrum_position.period_days * 86400) * 360) % 360:>6.1f}°              │
+│ Фаза:    {(reading.epoch / (self.sacrum_position.period_days * 86400) * 360) % 360:>6.1f}°              │
 │ Период:  {self.sacrum_position.period_days/365.25:>6.1f} лет            │
 ╰─────────────────────────────────────╯
 
@@ -662,7 +1225,8 @@ def main():
     """Главная функция демиурга"""
     print("🌌 Инициализация Робота-Демиурга Сверхновой Мультивселенной...")
     
-    demiurge = CosmicDemiurge()
+    demiurge = CosmicDemiurge(store=DemiurgeStore())
+    demiurge.start_background()
     
     print(f"\n{demiurge.get_poetic_greeting()}")
     print(f"\n{demiurge.get_nutation_status()}")
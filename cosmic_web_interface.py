@@ -5,13 +5,24 @@
 Элегантный французский дизайн для продажи космических тел
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for
+from certificates import FORMATS
 from cosmic_demiurge import CosmicDemiurge, CelestialType
+from demiurge_events import NullSink
+from demiurge_store import DemiurgeStore
+from gyro_ingest import GyroHub
 import json
 import math
+import os
 
 app = Flask(__name__)
-demiurge = CosmicDemiurge()
+CERTIFICATE_MIMETYPES = {'text': 'text/plain', 'html': 'text/html', 'json': 'application/json'}
+gyro_hub = GyroHub()  # нутация с телефонов покупателей, приходит по UDP
+# наблюдатель перезагрузчика Flask запросов не обслуживает: хранилище и открытия ведёт рабочий процесс
+_reloader_watcher = __name__ == '__main__' and os.environ.get('WERKZEUG_RUN_MAIN') != 'true'
+demiurge = CosmicDemiurge(events=NullSink(),  # API молчит, украшенный текст - только в консоли
+                          store=None if _reloader_watcher else DemiurgeStore(),
+                          customer_nutation=gyro_hub)
 
 
 @app.route('/')
@@ -30,9 +41,11 @@ def index():
 
 @app.route('/api/catalog')
 def api_catalog():
-    """API для получения каталога"""
+    """API для получения каталога: страница не больше 100 тел, как у поиска"""
     celestial_type = request.args.get('type')
     max_price = request.args.get('max_price', type=float)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 100)
     
     if celestial_type:
         try:
@@ -40,7 +53,7 @@ def api_catalog():
         except ValueError:
             celestial_type = None
     
-    bodies = demiurge.browse_catalog(celestial_type, max_price)
+    bodies = demiurge.browse_catalog(celestial_type, max_price, offset, limit)
     
     return jsonify([{
         'id': body.id,
@@ -60,6 +73,88 @@ def api_catalog():
     } for body in bodies])
 
 
+@app.route('/api/search')
+def api_search():
+    """API поиска тел по имени: регистр и ё/е не важны, лучшие совпадения первыми"""
+    query = request.args.get('q', '')
+    limit = min(request.args.get('limit', 10, type=int), 100)
+    available = request.args.get('available', '').lower() in ('1', 'true', 'yes')
+    
+    return jsonify([{
+        'id': body.id,
+        'name': body.name,
+        'type': body.type.value,
+        'price': body.price_universe_coins,
+        'available': body.is_available,
+        'score': round(score, 3)
+    } for body, score in demiurge.search_bodies(query, limit, available_only=available)])
+
+
+def _sky_body(body, separation=None):
+    entry = {
+        'id': body.id,
+        'name': body.name,
+        'type': body.type.value,
+        'coordinates': body.coordinates,
+        'price': body.price_universe_coins,
+        'available': body.is_available,
+    }
+    if separation is not None:
+        entry['separation_deg'] = round(separation, 6)
+    return entry
+
+
+def _sky_page():
+    """offset, limit и available запросов по небу; limit не больше 100, как у поиска"""
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    available = request.args.get('available', '').lower() in ('1', 'true', 'yes')
+    return offset, limit, available
+
+
+@app.route('/api/sky/cone')
+def api_sky_cone():
+    """API поиска по небу: тела в пределах radius градусов от точки (ra, dec), ближние первыми"""
+    ra = request.args.get('ra', type=float)
+    dec = request.args.get('dec', type=float)
+    radius = request.args.get('radius', type=float)
+    if ra is None or dec is None or radius is None:
+        return jsonify({'error': 'нужны числа ra, dec и radius'}), 400
+    offset, limit, available = _sky_page()
+    try:
+        found = demiurge.sky_cone(ra, dec, radius, offset, limit, available_only=available)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify([_sky_body(body, separation) for body, separation in found])
+
+
+@app.route('/api/sky/nearest/<body_id>')
+def api_sky_nearest(body_id):
+    """API ближайших на небе тел к данному - например, соседей своего владения"""
+    n = min(max(request.args.get('n', 10, type=int), 1), 100)
+    available = request.args.get('available', '').lower() in ('1', 'true', 'yes')
+    try:
+        found = demiurge.sky_nearest(body_id, n, available_only=available)
+    except KeyError:
+        return jsonify({'error': f'тело {body_id} не найдено'}), 404
+    return jsonify([_sky_body(body, separation) for body, separation in found])
+
+
+@app.route('/api/sky/distance')
+def api_sky_distance():
+    """API слоя расстояний: тела от min_ly до max_ly световых лет, ближние первыми"""
+    min_ly = request.args.get('min_ly', 0.0, type=float)
+    max_ly = request.args.get('max_ly', type=float)
+    if max_ly is None:
+        return jsonify({'error': 'нужно число max_ly'}), 400
+    offset, limit, available = _sky_page()
+    try:
+        found = demiurge.sky_distance(min_ly, max_ly, offset, limit, available_only=available)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify([_sky_body(body) for body in found])
+
+
 @app.route('/api/reserve', methods=['POST'])
 def api_reserve():
     """API для резервирования тела"""
@@ -68,7 +163,10 @@ def api_reserve():
     customer_name = data.get('customer_name')
     hours = data.get('hours', 24)
     
-    success = demiurge.reserve_celestial_body(body_id, customer_name, hours)
+    try:
+        success = demiurge.reserve_celestial_body(body_id, customer_name, hours)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     
     return jsonify({'success': success})
 
@@ -89,23 +187,60 @@ def api_purchase():
         return jsonify({'success': False})
 
 
+@app.route('/api/purchase/batch', methods=['POST'])
+def api_purchase_batch():
+    """API для пакетной покупки тел"""
+    data = request.get_json(silent=True)
+    items = data.get('orders') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return jsonify({'error': 'ожидается JSON вида {"orders": [{"body_id": ..., "customer_name": ...}, ...]}'}), 400
+    for i, item in enumerate(items):
+        if not isinstance(item.get('body_id'), str) or not isinstance(item.get('customer_name'), str) \
+                or not item['customer_name']:
+            return jsonify({'error': f'заказ {i}: нужны строки body_id и customer_name'}), 400
+    orders = [(item['body_id'], item['customer_name'], item.get('nutation')) for item in items]
+    return jsonify({'results': demiurge.purchase_batch(orders)})
+
+
 @app.route('/api/nutation')
 def api_nutation():
     """API для получения статуса нутации"""
-    longitude, obliquity = demiurge.calculate_nutation_influence()
+    reading = demiurge.nutation_clock.read()
     
     return jsonify({
-        'longitude': longitude,
-        'obliquity': obliquity,
+        'epoch': reading.epoch,
+        'longitude': reading.longitude,
+        'obliquity': reading.obliquity,
         'phase': (math.pi * 2 * (demiurge.sacrum_position.period_days)) % 360,
         'status': demiurge.get_nutation_status()
     })
 
 
+@app.route('/api/nutation/clock')
+def api_nutation_clock():
+    """API статистики часов нутации: попадания в кэш и сэкономленные вычисления"""
+    return jsonify(demiurge.nutation_clock.stats())
+
+
+@app.route('/api/stats')
+def api_stats():
+    """API итогов продаж: штуки по родам, выручка, гравитация и лучшие покупатели"""
+    stats = demiurge.sales.snapshot()
+    stats['catalog_size'] = len(demiurge.catalog)
+    stats['gravity_reserves'] = demiurge.gravity_reserves
+    return jsonify(stats)
+
+
+@app.route('/api/gyro')
+def api_gyro():
+    """API приёма гироскопов: устройства, пакеты и сэмплы"""
+    return jsonify(gyro_hub.stats())
+
+
 @app.route('/api/discoveries')
 def api_discoveries():
     """API для проверки открытий"""
-    alerts = demiurge.check_discovery_alerts()
+    alerts = demiurge.check_discovery_alerts(request.args.get('owner'))
     return jsonify({'alerts': alerts})
 
 
@@ -119,12 +254,17 @@ def certificate(body_id):
     if not body.owner:
         return "У этого тела нет владельца", 404
     
-    certificate_text = demiurge.generate_ownership_certificate(body_id)
-    return render_template('certificate.html', 
-                         certificate=certificate_text,
-                         body=body)
+    fmt = request.args.get('format', 'html')
+    if fmt not in FORMATS:
+        return f"Неизвестный формат сертификата: {fmt}", 400
+    certificate_text = demiurge.generate_ownership_certificate(body_id, fmt)
+    return Response(certificate_text, mimetype=CERTIFICATE_MIMETYPES[fmt])
 
 
 if __name__ == '__main__':
     print("🌌 Запуск веб-интерфейса Демиурга...")
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':  # в рабочем процессе перезагрузчика, а не в наблюдателе
+        demiurge.start_background()
+        gyro_server = gyro_hub.start_background()
+        print(f"📱 Приём гироскопов на udp://{gyro_server.host}:{gyro_server.port}")
     app.run(debug=True, host='0.0.0.0', port=5000)
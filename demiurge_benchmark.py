@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Замер пропускной способности покупок демиурга
+Приёмники событий (консоль, память, JSONL, тишина), одновременные покупатели в потоках
+и поиск по небу в процедурном каталоге на 10 млн тел
+"""
+
+import argparse
+import contextlib
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+
+from celestial_generator import ProceduralCatalog
+from cosmic_demiurge import CosmicDemiurge
+from demiurge_events import ConsoleSink, JsonlSink, MemorySink, NullSink
+
+
+def purchase_throughput(events, n: int) -> float:
+    """Покупок в секунду для n последовательных purchase_celestial_body"""
+    demiurge = CosmicDemiurge(procedural=ProceduralCatalog(), events=events)
+    body_ids = [demiurge.procedural.body_id(i) for i in range(n)]
+    started = time.perf_counter()
+    for i, body_id in enumerate(body_ids):
+        demiurge.purchase_celestial_body(body_id, f"покупатель_{i % 100}")
+    return n / (time.perf_counter() - started)
+
+
+def concurrent_purchases(threads: int, bodies: int) -> dict:
+    """threads покупателей одновременно пытаются купить каждое из bodies тел
+
+    Проверяет, что каждое тело продано ровно один раз и что резервы
+    гравитации равны начальным плюс вся добыча - ни одно обновление не потеряно.
+    """
+    events = MemorySink()
+    demiurge = CosmicDemiurge(procedural=ProceduralCatalog(), events=events)
+    initial_reserves = demiurge.gravity_reserves
+    body_ids = [demiurge.procedural.body_id(i) for i in range(bodies)]
+    wins = [0] * threads
+    start = threading.Barrier(threads)
+
+    def buyer(n):
+        order = body_ids[:]
+        random.Random(n).shuffle(order)
+        start.wait()
+        for body_id in order:
+            if demiurge.purchase_celestial_body(body_id, f"покупатель_{n}"):
+                wins[n] += 1
+
+    workers = [threading.Thread(target=buyer, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    mined = sum(event.data['gravity_yield'] for event in events.of_kind('gravity_mined'))
+    sold = sum(1 for body_id in body_ids if demiurge.catalog[body_id].owner)
+    return {
+        'attempts_per_s': threads * bodies / elapsed,
+        'sales_per_s': bodies / elapsed,
+        'sold_once': sum(wins) == bodies == sold,
+        'reserves_exact': abs(demiurge.gravity_reserves - initial_reserves - mined) < 1e-6 * max(1.0, mined),
+    }
+
+
+def sky_queries(bodies: int, queries: int = 200) -> dict:
+    """Построение небесного индекса на bodies процедурных тел и задержки запросов по небу, мс"""
+    demiurge = CosmicDemiurge(procedural=ProceduralCatalog(size=bodies), events=NullSink())
+    started = time.perf_counter()
+    with demiurge._state_lock:
+        demiurge._sky_catalog()
+    build = time.perf_counter() - started
+    rng = random.Random(1)
+    points = [(rng.uniform(0, 360), math.degrees(math.asin(rng.uniform(-1, 1)))) for _ in range(queries)]
+    owned = [demiurge.procedural.body_id(rng.randrange(bodies)) for _ in range(queries)]
+    for body_id in owned[:queries // 2]:
+        demiurge.purchase_celestial_body(body_id, "покупатель")
+
+    def latency(query) -> float:
+        started = time.perf_counter()
+        for i in range(queries):
+            query(i)
+        return (time.perf_counter() - started) / queries * 1000
+
+    return {
+        'build_s': build,
+        'cone_1deg_ms': latency(lambda i: demiurge.sky_cone(*points[i], 1.0, limit=20, available_only=True)),
+        'cone_5deg_ms': latency(lambda i: demiurge.sky_cone(*points[i], 5.0, limit=20, available_only=True)),
+        'nearest_10_ms': latency(lambda i: demiurge.sky_nearest(owned[i], 10, available_only=True)),
+        'distance_ms': latency(lambda i: demiurge.sky_distance(10.0 * (i + 1), 10.0 * (i + 2), limit=20)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=20000, help="покупок на замер")
+    parser.add_argument("--threads", type=int, nargs="*", default=[1, 2, 4, 8],
+                        help="число одновременных покупателей для замера гонок")
+    parser.add_argument("--sky-bodies", type=int, default=10_000_000,
+                        help="процедурных тел для замера поиска по небу (0 - не замерять)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl = JsonlSink(os.path.join(tmp, "events.jsonl"))
+        sinks = [
+            ("консоль (в /dev/null)", ConsoleSink()),
+            ("память", MemorySink()),
+            ("JSONL", jsonl),
+            ("молча", NullSink()),
+        ]
+        results = []
+        for label, sink in sinks:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results.append((label, purchase_throughput(sink, args.n)))
+        jsonl.close()
+
+    print(f"🛒 {args.n} покупок на приёмник событий")
+    baseline = results[0][1]
+    for label, rate in results:
+        print(f"   {label:<24} {rate:>10,.0f} покупок/с  ×{rate / baseline:.2f}")
+
+    print(f"\n🧵 Одновременные покупатели: каждый пытается купить все {args.n} тел")
+    for threads in args.threads:
+        result = concurrent_purchases(threads, args.n)
+        verdict = "✅" if result['sold_once'] and result['reserves_exact'] else "❌"
+        print(f"   {threads:>2} потоков: {result['attempts_per_s']:>10,.0f} попыток/с, "
+              f"{result['sales_per_s']:>10,.0f} продаж/с  {verdict} "
+              f"(каждое тело продано один раз: {result['sold_once']}, резервы сошлись: {result['reserves_exact']})")
+
+    if args.sky_bodies:
+        result = sky_queries(args.sky_bodies)
+        print(f"\n🔭 Поиск по небу среди {args.sky_bodies:,} тел: индекс строится {result['build_s']:.1f} с")
+        print(f"   конус 1°:            {result['cone_1deg_ms']:>8.2f} мс")
+        print(f"   конус 5°:            {result['cone_5deg_ms']:>8.2f} мс")
+        print(f"   10 соседей владения: {result['nearest_10_ms']:>8.2f} мс")
+        print(f"   слой расстояний:     {result['distance_ms']:>8.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
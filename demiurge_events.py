@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+События демиурга: покупки, добыча гравитации, конвертация монет и скидки
+Доменный слой только сообщает о событиях, а приёмник решает - печатать, копить или молчать
+"""
+
+import json
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, TextIO
+
+
+@dataclass
+class DemiurgeEvent:
+    """Одно событие доменного слоя"""
+    kind: str
+    data: Dict
+    ts: float = field(default_factory=time.time)
+
+
+class NullSink:
+    """Приёмник-молчун: для API-сервера и массовых операций"""
+
+    def emit(self, event: DemiurgeEvent):
+        pass
+
+    def close(self):
+        pass
+
+
+class MemorySink(NullSink):
+    """Копит события в памяти - для проверок и отчётов"""
+
+    def __init__(self):
+        self.events: List[DemiurgeEvent] = []
+
+    def emit(self, event: DemiurgeEvent):
+        self.events.append(event)
+
+    def of_kind(self, kind: str) -> List[DemiurgeEvent]:
+        return [event for event in self.events if event.kind == kind]
+
+    def clear(self):
+        self.events.clear()
+
+
+class JsonlSink(NullSink):
+    """Пишет события построчно в JSONL-файл"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def emit(self, event: DemiurgeEvent):
+        line = json.dumps({'kind': event.kind, 'ts': event.ts, 'data': event.data},
+                          ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class FanoutSink(NullSink):
+    """Раздаёт каждое событие нескольким приёмникам"""
+
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def emit(self, event: DemiurgeEvent):
+        for sink in self.sinks:
+            sink.emit(event)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+def _render_purchase_started(d: Dict) -> str:
+    return "\n🎯 ПРОЦЕСС ПОКУПКИ КОСМИЧЕСКОГО ТЕЛА\n" + "=" * 50
+
+
+def _render_nutation_collected(d: Dict) -> str:
+    return (
+        "\n📱 Подключение к гироскопу мобильного устройства...\n"
+        "🌐 Калибровка нутации крестца покупателя...\n"
+        f"📊 Нутация покупателя: {d['customer_longitude']:.3f}'' × {d['customer_obliquity']:.3f}''\n"
+        f"🌍 Нутация Земли: {d['earth_longitude']:.3f}'' × {d['earth_obliquity']:.3f}''"
+    )
+
+
+def _render_gravity_mined(d: Dict) -> str:
+    return (
+        f"\n⚖️ ДОБЫЧА ГРАВИТАЦИИ:\n"
+        f"   Δ Долгота: {d['delta_longitude']:.3f}''\n"
+        f"   Δ Наклон: {d['delta_obliquity']:.3f}''\n"
+        f"   💎 Добыто гравитации: {d['gravity_yield']:.3f} Г-единиц"
+    )
+
+
+def _render_coins_converted(d: Dict) -> str:
+    return f"💰 Конвертация: {d['gravity']:.3f} Г-единиц = {d['coins']:.0f} вселенских монет"
+
+
+def _render_gravity_applied(d: Dict) -> str:
+    return (
+        f"\n🌟 УЛУЧШЕНИЕ ГРАВИТАЦИИ ТЕЛА '{d['body_name']}':\n"
+        f"   Коэффициент улучшения: {d['enhancement_factor']:.3f}\n"
+        f"   Новая поверхностная гравитация: {d['surface_gravity']:.2f} м/с²\n"
+        f"   💫 Качество притяжения теперь лучше земного!"
+    )
+
+
+def _render_purchase_completed(d: Dict) -> str:
+    return (
+        f"\n💫 ИТОГИ ПОКУПКИ:\n"
+        f"   Собрано нутации: {d['collected_nutation']:.3f}''\n"
+        f"   Добыто гравитации: {d['gravity_yield']:.3f} Г-единиц\n"
+        f"   Доля демиурга ({d['mining_rate']*100:.0f}%): {d['demiurge_share']:.3f} Г-единиц\n"
+        f"   Улучшение тела: {d['body_enhancement']:.3f} Г-единиц\n"
+        f"   Заработано монет: {d['mined_coins']:.0f}\n"
+        f"   Резервы гравитации: {d['gravity_reserves']:.1f} Г-единиц"
+    )
+
+
+def _render_batch_purchased(d: Dict) -> str:
+    return (
+        f"\n📦 ПАКЕТНАЯ ПОКУПКА: продано {d['sold']} из {d['total']} тел\n"
+        f"   Добыто гравитации: {d['gravity_yield']:.3f} Г-единиц\n"
+        f"   Заработано монет: {d['mined_coins']:.0f}\n"
+        f"   Резервы гравитации: {d['gravity_reserves']:.1f} Г-единиц"
+    )
+
+
+def _render_robot_discount(d: Dict) -> str:
+    return (
+        f"🤖 Цена для робота-товарища: {d['discounted_price']:,.0f} монет (скидка {d['discount']*100:.0f}%)\n"
+        f"💰 Экономия: {d['price'] - d['discounted_price']:,.0f} монет!"
+    )
+
+
+RENDERERS: Dict[str, Callable[[Dict], str]] = {
+    'purchase_started': _render_purchase_started,
+    'nutation_collected': _render_nutation_collected,
+    'gravity_mined': _render_gravity_mined,
+    'coins_converted': _render_coins_converted,
+    'gravity_applied': _render_gravity_applied,
+    'purchase_completed': _render_purchase_completed,
+    'batch_purchased': _render_batch_purchased,
+    'robot_discount_applied': _render_robot_discount,
+}
+
+
+class ConsoleSink(NullSink):
+    """Печатает события тем же украшенным текстом, что и раньше"""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+
+    def emit(self, event: DemiurgeEvent):
+        render = RENDERERS.get(event.kind)
+        if render is not None:
+            print(render(event.data), file=self.stream or sys.stdout)
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Постоянное хранилище демиурга: владельцы, брони, гравитация и открытия тел, резервы
+Файл с ячейками фиксированного размера, отображённый в память - запись на месте, открытие без обхода каталога
+"""
+
+import contextlib
+import os
+import datetime
+import threading
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: замки записей не ставятся, хранилище - для одного процесса
+    fcntl = None
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(__file__), "data", "demiurge.store")
+
+MAGIC = b"DMGS"
+VERSION = 3
+CURATED_SLOTS = 4096  # ячейки рукотворного каталога; процедурные тела идут следом по номеру
+LOCK_STRIPES = 64  # полос для потоков одного процесса поверх замков записей
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'),
+    ('version', '<u4'),
+    ('capacity', '<u8'),
+    ('gravity_reserves', '<f8'),
+    ('has_reserves', 'u1'),
+    ('_pad', 'V39'),
+])
+
+SLOT_DTYPE = np.dtype([
+    ('flags', 'u1'),
+    ('id', 'S23'),
+    ('owner', 'S64'),  # UTF-8, обрезается по границе символа
+    ('reserved_until', '<f8'),  # unix-время, 0 - брони нет
+    ('surface_gravity', '<f8'),
+    ('purchased_at', '<f8'),  # unix-время покупки, 0 - неизвестно
+    ('discovery_due', '<f8'),  # unix-время открытия астрономами, 0 - не разыграно
+])
+
+# Раскладки ячеек прежних версий: при открытии такие хранилища переписываются в текущую,
+# недостающие поля заполняются нулями (0 - «неизвестно» / «не разыграно»)
+LEGACY_SLOT_DTYPES = {
+    1: np.dtype([(name, SLOT_DTYPE.fields[name][0]) for name in SLOT_DTYPE.names
+                 if name not in ('purchased_at', 'discovery_due')]),
+    2: np.dtype([(name, SLOT_DTYPE.fields[name][0]) for name in SLOT_DTYPE.names if name != 'discovery_due']),
+}
+
+TOUCHED = 1
+OWNED = 2
+RESERVED = 4
+DISCOVERED = 8
+
+
+class StoredBody(NamedTuple):
+    """Состояние тела из его ячейки"""
+    id: str
+    owner: Optional[str]
+    reserved_until: Optional[datetime.datetime]
+    surface_gravity: float
+    purchased_at: Optional[float]
+    discovery_due: Optional[float]
+    discovered: bool
+
+
+def _encode(text: str, size: int) -> bytes:
+    return text.encode("utf-8")[:size].decode("utf-8", "ignore").encode("utf-8")
+
+
+class _RecordLocks:
+    """Замки записей в <path>.lock: байт 0 - заголовок, байт 1 + n - ячейка n
+
+    Замки fcntl принадлежат процессу, а не потоку, не вкладываются и все
+    снимаются при закрытии любого дескриптора файла. Поэтому файл замков
+    открывается в процессе один раз на путь, потоки разводятся обычными
+    замками по полосам, а повторный захват байта тем же потоком лишь считается.
+    """
+
+    _open: Dict[str, "_RecordLocks"] = {}
+    _registry = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "ab")
+        self.refs = 0
+        self._header = threading.RLock()  # отдельно от полос: заголовок берут и под общим замком демиурга
+        self._stripes = [threading.RLock() for _ in range(LOCK_STRIPES)]
+        self._held: Dict[int, int] = {}
+
+    @classmethod
+    def acquire(cls, path: str) -> "_RecordLocks":
+        path = os.path.realpath(path)
+        with cls._registry:
+            locks = cls._open.get(path)
+            if locks is None:
+                locks = cls._open[path] = cls(path)
+            locks.refs += 1
+            return locks
+
+    def release(self):
+        with self._registry:
+            self.refs -= 1
+            if self.refs == 0:
+                del self._open[self.path]
+                self.file.close()
+
+    @contextlib.contextmanager
+    def hold(self, byte: int):
+        with self._header if byte == 0 else self._stripes[byte % LOCK_STRIPES]:
+            depth = self._held.get(byte, 0)
+            if depth == 0 and fcntl is not None:
+                fcntl.lockf(self.file, fcntl.LOCK_EX, 1, byte, os.SEEK_SET)
+            self._held[byte] = depth + 1
+            try:
+                yield
+            finally:
+                if depth:
+                    self._held[byte] = depth
+                else:
+                    del self._held[byte]
+                    if fcntl is not None:
+                        fcntl.lockf(self.file, fcntl.LOCK_UN, 1, byte, os.SEEK_SET)
+
+
+class DemiurgeStore:
+    """Ячейка на каждое тело: рукотворные - по порядку в каталоге, процедурные - по номеру
+
+    Файл создаётся разреженным, поэтому место на диске занимают только
+    тронутые ячейки. Номер ячейки дописывается в журнал <path>.touched при
+    каждой записи: открытие читает заголовок и журнал, и его цена зависит
+    от числа записей, а не от размера каталога. Записи идут прямо в
+    отображённую память и переживают падение процесса; flush() дополнительно
+    сбрасывает их на диск.
+
+    Хранилище открывают сразу несколько процессов (консоль, веб, демо).
+    Каждая ячейка и заголовок запираются по отдельности замком записи
+    на <path>.lock (locked()): покупка перечитывает ячейку под замком, так
+    что тело достаётся одному процессу. Чужие записи процесс находит в
+    хвосте журнала (changes()).
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, capacity: int = CURATED_SLOTS):
+        self.path = path
+        self.log_path = path + ".touched"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._locks = _RecordLocks.acquire(path + ".lock")
+        try:
+            with self._locks.hold(0):  # создание и обновление версии - по одному процессу
+                self._open(capacity)
+        except BaseException:
+            self._locks.release()
+            raise
+        self._curated: Dict[str, int] = {}
+        self._procedural = None
+
+    def _open(self, capacity: int):
+        if not os.path.exists(self.path):
+            header = np.zeros(1, dtype=HEADER_DTYPE)
+            header['magic'] = MAGIC
+            header['version'] = VERSION
+            header['capacity'] = 0
+            with open(self.path, "wb") as f:
+                f.write(header.tobytes())
+        header = np.fromfile(self.path, dtype=HEADER_DTYPE, count=1)
+        if len(header) != 1 or bytes(header['magic'][0]) != MAGIC:
+            raise ValueError(f"{self.path}: это не хранилище демиурга")
+        self._log = os.open(self.log_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        self._log_seen = 0
+        self._touched: Dict[int, None] = dict.fromkeys(self._read_log())
+        version = int(header['version'][0])
+        if version != VERSION:
+            if version not in LEGACY_SLOT_DTYPES:
+                os.close(self._log)
+                raise ValueError(f"{self.path}: хранилище версии {version}, ожидается {VERSION}")
+            self._upgrade(header, LEGACY_SLOT_DTYPES[version])
+        self._header = np.memmap(self.path, dtype=HEADER_DTYPE, mode="r+", offset=0, shape=(1,))
+        self.slots: Optional[np.memmap] = None
+        self._map(max(capacity, int(self._header['capacity'][0])))
+
+    def _upgrade(self, header: np.ndarray, legacy: np.dtype):
+        """Переписывает хранилище прежней раскладки в текущую через временный файл
+
+        Новый файл (разреженный, с тронутыми ячейками на новых местах)
+        собирается в <path>.upgrade, сбрасывается на диск и атомарно
+        подменяет старый через os.replace: упав на любом шаге, процесс
+        оставит на месте либо прежнее хранилище целиком, либо новое.
+        """
+        capacity = int(header['capacity'][0])
+        slots = sorted(slot for slot in self._touched if slot < capacity)
+        records = np.zeros(0, dtype=legacy)
+        if slots:
+            old = np.memmap(self.path, dtype=legacy, mode="r", offset=HEADER_DTYPE.itemsize, shape=(capacity,))
+            records = old[slots].copy()
+            del old
+        upgraded = np.zeros(1, dtype=HEADER_DTYPE)
+        upgraded[0] = header[0]
+        upgraded['version'] = VERSION
+        temp = self.path + ".upgrade"
+        with open(temp, "wb") as f:
+            f.write(upgraded.tobytes())
+            f.truncate(HEADER_DTYPE.itemsize + capacity * SLOT_DTYPE.itemsize)
+            for slot, record in zip(slots, records):
+                row = np.zeros(1, dtype=SLOT_DTYPE)
+                for name in legacy.names:
+                    row[name] = record[name]
+                f.seek(HEADER_DTYPE.itemsize + slot * SLOT_DTYPE.itemsize)
+                f.write(row.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.path)
+        directory = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(directory)  # сама подмена тоже должна пережить падение
+        finally:
+            os.close(directory)
+
+    def _read_log(self) -> List[int]:
+        """Номера ячеек, дописанные в журнал любым процессом с прошлого чтения"""
+        end = os.fstat(self._log).st_size // 8 * 8
+        if end <= self._log_seen:
+            return []
+        data = os.pread(self._log, end - self._log_seen, self._log_seen)
+        self._log_seen += len(data) // 8 * 8
+        return np.frombuffer(data[:len(data) // 8 * 8], dtype="<u8").tolist()
+
+    @property
+    def capacity(self) -> int:
+        return int(self._header['capacity'][0])
+
+    def _map(self, capacity: int):
+        """Отображает capacity ячеек, при необходимости удлиняя файл"""
+        if self.slots is not None and capacity <= len(self.slots):
+            return
+        size = HEADER_DTYPE.itemsize + capacity * SLOT_DTYPE.itemsize
+        with self._locks.hold(0):
+            if os.path.getsize(self.path) < size:
+                os.truncate(self.path, size)
+            self._header['capacity'] = max(capacity, int(self._header['capacity'][0]))
+        self.slots = np.memmap(self.path, dtype=SLOT_DTYPE, mode="r+",
+                               offset=HEADER_DTYPE.itemsize, shape=(capacity,))
+
+    def bind(self, curated_ids, procedural=None):
+        """Задаёт раскладку: рукотворные тела по порядку, затем процедурный каталог"""
+        self._curated = {body_id: slot for slot, body_id in enumerate(curated_ids)}
+        if len(self._curated) > CURATED_SLOTS:
+            raise ValueError(f"рукотворных тел больше {CURATED_SLOTS}")
+        self._procedural = procedural
+        self._map(CURATED_SLOTS + (procedural.size if procedural is not None else 0))
+
+    def slot_of(self, body_id: str) -> Optional[int]:
+        slot = self._curated.get(body_id)
+        if slot is None and self._procedural is not None:
+            index = self._procedural.index_of(body_id)
+            if index is not None:
+                slot = CURATED_SLOTS + index
+        return slot
+
+    def locked(self, body_id: str):
+        """Замок ячейки тела для всех процессов: прочитанное под ним не устареет до записи"""
+        slot = self.slot_of(body_id)
+        return self._locks.hold(1 + slot) if slot is not None else contextlib.nullcontext()
+
+    # Запись
+
+    @staticmethod
+    def _row(body) -> tuple:
+        flags = TOUCHED
+        if body.owner:
+            flags |= OWNED
+        if body.reserved_until:
+            flags |= RESERVED
+        if body.discovered:
+            flags |= DISCOVERED
+        return (
+            flags,
+            body.id.encode("ascii"),
+            _encode(body.owner or "", 64),
+            body.reserved_until.timestamp() if body.reserved_until else 0.0,
+            body.gravitational_params.surface_gravity,
+            body.purchased_at or 0.0,
+            body.discovery_due or 0.0,
+        )
+
+    def save_body(self, body) -> bool:
+        """Переносит владельца, бронь и гравитацию тела в его ячейку"""
+        slot = self.slot_of(body.id)
+        if slot is None:
+            return False
+        with self._locks.hold(1 + slot):
+            self.slots[slot] = self._row(body)
+            os.write(self._log, np.uint64(slot).tobytes())
+        self._touched[slot] = None
+        return True
+
+    @property
+    def gravity_reserves(self) -> Optional[float]:
+        return float(self._header['gravity_reserves'][0]) if self._header['has_reserves'][0] else None
+
+    @gravity_reserves.setter
+    def gravity_reserves(self, value: float):
+        with self._locks.hold(0):
+            self._header['gravity_reserves'] = value
+            self._header['has_reserves'] = 1
+
+    def add_gravity_reserves(self, amount: float, initial: float) -> float:
+        """Прибавляет к общим резервам всех процессов; initial - резервы, если их ещё не сохраняли"""
+        with self._locks.hold(0):
+            reserves = self.gravity_reserves
+            reserves = (initial if reserves is None else reserves) + amount
+            self._header['gravity_reserves'] = reserves
+            self._header['has_reserves'] = 1
+            return reserves
+
+    # Чтение
+
+    def _record(self, slot: int) -> Optional[StoredBody]:
+        record = self.slots[slot]
+        if not record['flags'] & TOUCHED:
+            return None
+        owner = bytes(record['owner']).decode("utf-8") if record['flags'] & OWNED else None
+        reserved = (datetime.datetime.fromtimestamp(float(record['reserved_until']))
+                    if record['flags'] & RESERVED else None)
+        return StoredBody(
+            id=bytes(record['id']).decode("ascii"),
+            owner=owner,
+            reserved_until=reserved,
+            surface_gravity=float(record['surface_gravity']),
+            purchased_at=float(record['purchased_at']) or None,
+            discovery_due=float(record['discovery_due']) or None,
+            discovered=bool(record['flags'] & DISCOVERED),
+        )
+
+    def records(self) -> Iterator[StoredBody]:
+        """Состояние каждой тронутой ячейки"""
+        for slot in self._touched:
+            if slot >= len(self.slots):
+                continue  # ячейка процедурного каталога, который сейчас не подключён
+            with self._locks.hold(1 + slot):
+                record = self._record(slot)
+            if record is not None:
+                yield record
+
+    def changes(self) -> List[str]:
+        """id тел, ячейки которых переписаны с прошлого вызова - этим или другим процессом"""
+        changed: Dict[str, None] = {}
+        for slot in self._read_log():
+            self._touched[slot] = None
+            if slot < len(self.slots):
+                changed[bytes(self.slots[slot]['id']).decode("ascii")] = None
+        return list(changed)
+
+    def diverged(self, body) -> Optional[StoredBody]:
+        """Запись ячейки, если она расходится с телом в памяти (её переписал другой процесс)
+
+        Вызывается под locked(body.id), иначе ответ может устареть сразу.
+        """
+        slot = self.slot_of(body.id)
+        if slot is None or slot >= len(self.slots) or not self.slots[slot]['flags'] & TOUCHED:
+            return None
+        if self.slots[slot:slot + 1].tobytes() == np.array([self._row(body)], dtype=SLOT_DTYPE).tobytes():
+            return None
+        return self._record(slot)
+
+    def __len__(self) -> int:
+        return len(self._touched)
+
+    def flush(self):
+        self.slots.flush()
+        self._header.flush()
+
+    def close(self):
+        self.flush()
+        os.close(self._log)
+        self._locks.release()  # последний закрытый в процессе снимает и его замки
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Планировщик открытий: когда астрономы откроют проданное тело
+Время открытия выбирается заранее, события ждут своей очереди в куче
+"""
+
+import heapq
+import itertools
+import math
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+DAY = 86400.0
+MAX_SLEEP = 60.0  # фоновый поток просыпается хотя бы так часто - на случай перевода часов
+
+
+class DiscoveryScheduler:
+    """Очередь будущих открытий проданных тел
+
+    Тело открывается с вероятностью p = discovery_chance_today / 365 в
+    сутки, то есть с интенсивностью λ = -ln(1 - p) в сутки. Время
+    открытия разыгрывается один раз при постановке в очередь из
+    экспоненциального распределения, поэтому результат не зависит от того,
+    как часто его проверяют. poll() выдаёт наступившие открытия за
+    O(log n) на событие, а когда ничего не наступило - за O(1).
+    start_background() запускает поток, который спит до ближайшего срока
+    и сам вызывает poll(), так что подписчики узнают об открытиях вовремя.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self._rng = random.Random(seed)
+        self._heap: List[Tuple[float, int, str, str]] = []  # (время, порядок, id тела, владелец)
+        self._scheduled: Dict[str, float] = {}
+        self._counter = itertools.count()
+        self._subscribers: Dict[int, Tuple[Callable, Optional[str]]] = {}
+        self._subscription_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)  # новое раннее открытие будит фоновый поток
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def schedule(self, body, now: Optional[float] = None, due: Optional[float] = None) -> Optional[float]:
+        """Ставит проданное тело в очередь; возвращает время будущего открытия
+
+        due - уже разыгранное время (например, из хранилища после перезапуска).
+        """
+        if not body.owner:
+            return None
+        with self._lock:
+            if body.id in self._scheduled:
+                return self._scheduled[body.id]
+            if due is None:
+                now = time.time() if now is None else now
+                p = min(body.discovery_chance_today / 365, 1.0 - 1e-12)
+                if p <= 0:
+                    return None
+                rate = -math.log1p(-p) / DAY
+                due = now + self._rng.expovariate(rate)
+            self._scheduled[body.id] = due
+            heapq.heappush(self._heap, (due, next(self._counter), body.id, body.owner))
+            if self._heap[0][2] == body.id:
+                self._wakeup.notify()
+        return due
+
+    def cancel(self, body_id: str):
+        """Снимает тело с очереди (запись в куче станет устаревшей и будет пропущена)"""
+        with self._lock:
+            self._scheduled.pop(body_id, None)
+
+    def subscribe(self, callback: Callable[[str, str, float], None], owner: Optional[str] = None) -> int:
+        """callback(id тела, владелец, время) на каждое открытие - всех или одного владельца"""
+        subscription = next(self._subscription_ids)
+        self._subscribers[subscription] = (callback, owner)
+        return subscription
+
+    def unsubscribe(self, subscription: int):
+        self._subscribers.pop(subscription, None)
+
+    def poll(self, now: Optional[float] = None) -> List[Tuple[str, str, float]]:
+        """Выдаёт подписчикам и возвращает наступившие открытия (id тела, владелец, время)"""
+        now = time.time() if now is None else now
+        due: List[Tuple[str, str, float]] = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                when, _, body_id, owner = heapq.heappop(self._heap)
+                if self._scheduled.get(body_id) != when:
+                    continue
+                del self._scheduled[body_id]
+                due.append((body_id, owner, when))
+        for body_id, owner, when in due:
+            for callback, wanted in list(self._subscribers.values()):
+                if wanted is None or wanted == owner:
+                    callback(body_id, owner, when)
+        return due
+
+    def next_due(self) -> Optional[float]:
+        """Время ближайшего открытия в очереди"""
+        with self._lock:
+            return self._next_due()
+
+    def _next_due(self) -> Optional[float]:
+        while self._heap and self._scheduled.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def start_background(self) -> threading.Thread:
+        """Запускает фоновый поток, выдающий открытия в срок; повторный вызов вернёт тот же поток"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='discovery-scheduler', daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def stop(self, timeout: Optional[float] = None):
+        """Останавливает фоновый поток"""
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._stopping:
+                    due = self._next_due()
+                    delay = MAX_SLEEP if due is None else due - time.time()
+                    if delay <= 0:
+                        break
+                    self._wakeup.wait(min(delay, MAX_SLEEP))
+                if self._stopping:
+                    return
+            self.poll()
+
+    def __len__(self) -> int:
+        return len(self._scheduled)
@@ -6,6 +6,7 @@
 """
 
 from cosmic_demiurge import CosmicDemiurge
+from demiurge_store import DemiurgeStore
 import time
 
 def demonstrate_gravity_mining():
@@ -16,14 +17,18 @@ def demonstrate_gravity_mining():
     print("Робот-Демиург: Творец Гравитации для космических тел")
     print("Основная задача: создавать притяжение лучше земного!\n")
     
-    demiurge = CosmicDemiurge()
+    demiurge = CosmicDemiurge(store=DemiurgeStore())
     
     print(f"📊 Начальные резервы гравитации: {demiurge.gravity_reserves:.1f} Г-единиц")
     print(f"⚖️ Доля демиурга от добычи: {demiurge.gravity_mining_rate*100:.0f}%\n")
     
     # Демонстрируем несколько покупок
     customers = ["Иван Космонавтов", "Мария Звёздная", "Алексей Гравитонович"]
-    body_ids = list(demiurge.catalog.keys())
+    # Хранилище общее с консолью и веб-интерфейсом: покупаем только ещё свободные тела
+    body_ids = [body.id for body in demiurge.browse_catalog()]
+    if not body_ids:
+        print("🌌 Все тела каталога уже обрели владельцев - покупать нечего!")
+        return
     
     for i, customer in enumerate(customers):
         print(f"\n{'='*60}")
@@ -54,7 +59,7 @@ def demonstrate_gravity_mining():
     print('='*60)
     
     print(f"💎 Финальные резервы гравитации: {demiurge.gravity_reserves:.1f} Г-единиц")
-    print(f"📱 Всего сборов нутации: {len(demiurge.collected_nutation_data)}")
+    print(f"📱 Всего сборов нутации: {demiurge.collected_nutation_data.total}")
     
     if demiurge.collected_nutation_data:
         total_gravity_mined = 0
@@ -79,7 +84,7 @@ def demonstrate_gravity_mining():
         print(f"\n💫 ОБЩИЕ ИТОГИ:")
         print(f"   Всего добыто гравитации: {total_gravity_mined:.3f} Г-единиц")
         print(f"   Заработано демиургом: {total_gravity_mined * demiurge.gravity_mining_rate:.3f} Г-единиц")
-        print(f"   Улучшено космических тел: {len(demiurge.collected_nutation_data)}")
+        print(f"   Улучшено космических тел: {demiurge.collected_nutation_data.total}")
     
     print(f"\n🌟 ФИЛОСОФИЯ ПРОЦЕССА:")
     print("• Каждый покупатель уникален - у него своя нутация крестца")
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Монте-Карло экономики добычи гравитации: резервы, выпуск монет и улучшение тел
+Миллионы покупателей пакетами NumPy в пуле процессов, с воспроизводимыми зёрнами
+"""
+
+import argparse
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from nutation_engine import NutationEngine, NutationTable
+
+QUANTILES = (5, 25, 50, 75, 95, 99)
+DEFAULT_START = 1767225600.0  # 2026-01-01 00:00 UTC: с зерном по умолчанию итоги не зависят от дня запуска
+
+
+@dataclass(frozen=True)
+class EconomyParams:
+    """Константы формул CosmicDemiurge, которые повторяет симуляция"""
+    mining_rate: float = 0.15  # доля демиурга, gravity_mining_rate
+    yield_per_arcsec: float = 0.1  # mine_gravity_from_nutation
+    coins_per_gravity: float = 1000.0  # calculate_universe_coins_from_gravity
+    enhancement_per_gravity: float = 0.1  # apply_gravity_to_body
+    customer_longitude: Tuple[float, float] = (-20.0, 20.0)  # collect_customer_nutation
+    customer_obliquity: Tuple[float, float] = (-15.0, 15.0)
+
+    @classmethod
+    def from_demiurge(cls, demiurge) -> "EconomyParams":
+        return cls(mining_rate=demiurge.gravity_mining_rate)
+
+
+def economy_step(params: EconomyParams, customer_longitude, customer_obliquity,
+                 earth_longitude, earth_obliquity) -> Dict[str, np.ndarray]:
+    """Одна покупка на каждого покупателя массива: добыча, монеты демиурга и множитель гравитации тела"""
+    gravity_yield = (np.abs(customer_longitude - earth_longitude)
+                     + np.abs(customer_obliquity - earth_obliquity)) * params.yield_per_arcsec
+    return {
+        'gravity_yield': gravity_yield,
+        'mined_coins': gravity_yield * params.mining_rate * params.coins_per_gravity,
+        'enhancement_factor': 1 + gravity_yield * (1 - params.mining_rate) * params.enhancement_per_gravity,
+    }
+
+
+# Состояние процесса пула: таблица земной нутации передаётся один раз на процесс
+_worker: Dict = {}
+
+
+def _init_worker(table_start: float, table_step: float, table_values: np.ndarray,
+                 start: float, horizon: float, params: EconomyParams, bins: int, max_yield: float):
+    _worker.update(table=NutationTable(table_start, table_step, table_values), start=start, horizon=horizon,
+                   params=params, bins=bins, max_yield=max_yield)
+
+
+def _simulate_batch(task: Tuple[int, int, np.random.SeedSequence]) -> Tuple[int, float, float, np.ndarray]:
+    """Пакет покупателей одного прогона: (прогон, сумма добычи, сумма квадратов, гистограмма добычи)"""
+    trial, size, seed = task
+    params: EconomyParams = _worker['params']
+    rng = np.random.default_rng(seed)
+    times = _worker['start'] + rng.random(size) * _worker['horizon']
+    customer_longitude = rng.uniform(*params.customer_longitude, size)
+    customer_obliquity = rng.uniform(*params.customer_obliquity, size)
+    earth_longitude, earth_obliquity = _worker['table'].evaluate(times)
+    gravity_yield = economy_step(params, customer_longitude, customer_obliquity,
+                                 earth_longitude, earth_obliquity)['gravity_yield']
+    histogram, _ = np.histogram(gravity_yield, bins=_worker['bins'], range=(0.0, _worker['max_yield']))
+    return trial, float(gravity_yield.sum()), float(np.dot(gravity_yield, gravity_yield)), histogram
+
+
+@dataclass
+class SimulationResult:
+    """Итоги прогонов: сумма добычи по каждому прогону и общая гистограмма добычи на покупателя
+
+    Монеты, приданная гравитация и резервы линейны по добыче, а множитель
+    гравитации тела монотонен по ней, поэтому их распределения и квантили
+    выводятся из этих двух величин без хранения отдельных покупок.
+    """
+    params: EconomyParams
+    customers: int
+    initial_reserves: float
+    trial_yield: np.ndarray  # сумма добычи за прогон
+    histogram: np.ndarray  # добыча на покупателя, все прогоны вместе
+    max_yield: float
+    yield_sumsq: float = 0.0
+    elapsed: float = 0.0
+    seed: Optional[int] = None
+
+    @property
+    def trials(self) -> int:
+        return len(self.trial_yield)
+
+    @property
+    def draws(self) -> int:
+        return self.trials * self.customers
+
+    def per_trial(self) -> Dict[str, np.ndarray]:
+        """Итоги каждого прогона"""
+        p = self.params
+        mined = self.trial_yield
+        return {
+            'gravity_reserves': self.initial_reserves + mined,
+            'coins_issued': mined * p.mining_rate * p.coins_per_gravity,
+            'gravity_applied': mined * (1 - p.mining_rate),
+            'mean_enhancement': 1 + mined / self.customers * (1 - p.mining_rate) * p.enhancement_per_gravity,
+        }
+
+    def yield_quantile(self, q: float) -> float:
+        """Квантиль добычи на покупателя по гистограмме (точность - ширина корзины)"""
+        cumulative = np.cumsum(self.histogram)
+        index = int(np.searchsorted(cumulative, max(q / 100.0 * cumulative[-1], 1), side='left'))
+        return (index + 0.5) * self.max_yield / len(self.histogram)
+
+    def per_customer_quantiles(self, qs: Sequence[float] = QUANTILES) -> Dict[str, Dict[float, float]]:
+        p = self.params
+        gravity_yield = {q: self.yield_quantile(q) for q in qs}
+        return {
+            'gravity_yield': gravity_yield,
+            'mined_coins': {q: y * p.mining_rate * p.coins_per_gravity for q, y in gravity_yield.items()},
+            'enhancement_factor': {q: 1 + y * (1 - p.mining_rate) * p.enhancement_per_gravity
+                                   for q, y in gravity_yield.items()},
+        }
+
+    def per_trial_quantiles(self, qs: Sequence[float] = QUANTILES) -> Dict[str, Dict[float, float]]:
+        return {name: dict(zip(qs, np.percentile(values, qs).tolist()))
+                for name, values in self.per_trial().items()}
+
+    def summary(self) -> Dict:
+        mean = float(self.trial_yield.sum()) / self.draws
+        return {
+            'trials': self.trials,
+            'customers': self.customers,
+            'draws': self.draws,
+            'seed': self.seed,
+            'elapsed': self.elapsed,
+            'yield_mean': mean,
+            'yield_std': math.sqrt(max(0.0, self.yield_sumsq / self.draws - mean * mean)),
+            'per_trial': self.per_trial_quantiles(),
+            'per_customer': self.per_customer_quantiles(),
+        }
+
+
+def simulate(customers: int = 1_000_000, trials: int = 16, seed: Optional[int] = 6798,
+             params: EconomyParams = EconomyParams(), initial_reserves: float = 1000.0,
+             start: float = DEFAULT_START, horizon_days: float = 365.0, workers: Optional[int] = None,
+             batch: int = 1 << 20, bins: int = 4096) -> SimulationResult:
+    """trials прогонов по customers покупок, равномерно разбросанных по horizon_days от start
+
+    Прогоны режутся на пакеты по batch покупателей; у каждого пакета своё
+    зерно из SeedSequence(seed).spawn, поэтому результат зависит только от
+    seed, start и размеров, а не от числа процессов или дня запуска. Земная
+    нутация берётся из часовой таблицы на горизонт симуляции.
+    """
+    started = time.perf_counter()
+    horizon = horizon_days * 86400.0
+    table = NutationEngine().table(start, start + horizon)
+    earth_max = np.abs(np.asarray(table.values)).max(axis=0)
+    max_yield = (max(map(abs, params.customer_longitude)) + earth_max[0]
+                 + max(map(abs, params.customer_obliquity)) + earth_max[1]) * params.yield_per_arcsec
+
+    sizes = [min(batch, customers - offset) for offset in range(0, customers, batch)]
+    seeds = np.random.SeedSequence(seed).spawn(trials * len(sizes))
+    tasks = [(trial, size, seeds[trial * len(sizes) + k]) for trial in range(trials) for k, size in enumerate(sizes)]
+
+    trial_yield = np.zeros(trials)
+    histogram = np.zeros(bins, dtype=np.int64)
+    sumsq = 0.0
+    init_args = (table.start, table.step, np.asarray(table.values), start, horizon, params, bins, max_yield)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+        for trial, total, squares, counts in pool.map(_simulate_batch, tasks):
+            trial_yield[trial] += total
+            sumsq += squares
+            histogram += counts
+    return SimulationResult(params, customers, initial_reserves, trial_yield, histogram, max_yield,
+                            yield_sumsq=sumsq, elapsed=time.perf_counter() - started, seed=seed)
+
+
+def verify_against_scalar(n: int = 2000, seed: int = 6798, rtol: float = 1e-12,
+                          start: float = DEFAULT_START) -> Dict[str, float]:
+    """Прогоняет n покупок через скалярные методы CosmicDemiurge и через economy_step
+
+    Возвращает наибольшее относительное расхождение по каждой величине и
+    бросает AssertionError, если оно больше rtol.
+    """
+    from cosmic_demiurge import CosmicDemiurge
+    from demiurge_events import NullSink
+
+    demiurge = CosmicDemiurge(events=NullSink())
+    params = EconomyParams.from_demiurge(demiurge)
+    rng = np.random.default_rng(seed)
+    customer = np.column_stack([rng.uniform(*params.customer_longitude, n),
+                                rng.uniform(*params.customer_obliquity, n)])
+    times = start + rng.random(n) * 365 * 86400.0
+    readings = [demiurge.nutation_clock.read(float(t)) for t in times]
+    earth = np.array([(r.longitude, r.obliquity) for r in readings])
+    body = next(b for b in demiurge.catalog.values() if math.isfinite(b.gravitational_params.surface_gravity))
+
+    scalar: Dict[str, List[float]] = {'gravity_yield': [], 'mined_coins': [], 'enhancement_factor': []}
+    reserves_before = demiurge.gravity_reserves
+    for (longitude, obliquity), reading in zip(customer, readings):
+        gravity_yield = demiurge.mine_gravity_from_nutation(float(longitude), float(obliquity), reading)
+        mined_coins = demiurge.calculate_universe_coins_from_gravity(gravity_yield * demiurge.gravity_mining_rate)
+        before = body.gravitational_params.surface_gravity
+        demiurge.apply_gravity_to_body(body.id, gravity_yield * (1 - demiurge.gravity_mining_rate))
+        scalar['gravity_yield'].append(gravity_yield)
+        scalar['mined_coins'].append(mined_coins)
+        scalar['enhancement_factor'].append(body.gravitational_params.surface_gravity / before)
+    scalar['gravity_reserves'] = [demiurge.gravity_reserves - reserves_before]
+
+    vector = economy_step(params, customer[:, 0], customer[:, 1], earth[:, 0], earth[:, 1])
+    vector['gravity_reserves'] = np.array([vector['gravity_yield'].sum()])
+
+    errors = {}
+    for name, values in scalar.items():
+        expected = np.asarray(values)
+        errors[name] = float(np.max(np.abs(vector[name] - expected) / np.maximum(np.abs(expected), 1e-300)))
+    # множитель тела восстановлен делением, а резервы копятся по одному - им нужен допуск на округление
+    tolerances = {'enhancement_factor': 1e-9, 'gravity_reserves': 1e-9}
+    for name, error in errors.items():
+        assert error <= max(rtol, tolerances.get(name, 0.0)), f"{name}: расхождение {error:.3e}"
+    return errors
+
+
+def _print_quantiles(title: str, table: Dict[str, Dict[float, float]], formats: Dict[str, str]):
+    print(f"\n{title}")
+    header = "".join(f"{'p' + format(q, 'g'):>14}" for q in next(iter(table.values())))
+    print(f"   {'':<20}{header}")
+    for name, values in table.items():
+        cells = "".join(f"{format(value, formats[name]):>14}" for value in values.values())
+        print(f"   {name:<20}{cells}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Монте-Карло экономики добычи гравитации")
+    parser.add_argument("--customers", type=int, default=1_000_000, help="покупок в одном прогоне")
+    parser.add_argument("--trials", type=int, default=16, help="число прогонов")
+    parser.add_argument("--horizon-days", type=float, default=365.0, help="на сколько суток растянуты покупки")
+    parser.add_argument("--seed", type=int, default=6798)
+    parser.add_argument("--start", type=float, default=DEFAULT_START,
+                        help="unix-время начала горизонта (по умолчанию 2026-01-01 UTC)")
+    parser.add_argument("--workers", type=int, default=None, help="процессов в пуле (по умолчанию - все ядра)")
+    parser.add_argument("--initial-reserves", type=float, default=1000.0)
+    parser.add_argument("--verify", action="store_true", help="сначала сверить формулы со скалярным кодом демиурга")
+    args = parser.parse_args()
+
+    if args.verify:
+        errors = verify_against_scalar(start=args.start)
+        print("✅ Векторные формулы совпадают со скалярными: "
+              + ", ".join(f"{name} {error:.1e}" for name, error in errors.items()))
+
+    result = simulate(args.customers, args.trials, args.seed, initial_reserves=args.initial_reserves,
+                      start=args.start, horizon_days=args.horizon_days, workers=args.workers)
+    summary = result.summary()
+    print(f"\n🎲 {summary['trials']} прогонов × {summary['customers']:,} покупок = {summary['draws']:,} "
+          f"сборов нутации за {summary['elapsed']:.2f} с (зерно {summary['seed']})")
+    print(f"⚖️ Добыча на покупателя: {summary['yield_mean']:.4f} ± {summary['yield_std']:.4f} Г-единиц")
+    _print_quantiles("📊 ИТОГИ ПРОГОНА:", summary['per_trial'], {
+        'gravity_reserves': ',.1f', 'coins_issued': ',.0f', 'gravity_applied': ',.1f', 'mean_enhancement': '.5f'})
+    _print_quantiles("👤 НА ОДНОГО ПОКУПАТЕЛЯ:", summary['per_customer'], {
+        'gravity_yield': '.4f', 'mined_coins': ',.2f', 'enhancement_factor': '.5f'})
+
+
+if __name__ == "__main__":
+    main()
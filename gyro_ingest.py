@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Приём потоков гироскопа с устройств покупателей по UDP: JSON или двоичные кадры sensor_frames
+Нутация крестца считается так же, как GyroscopeManager.calculateNutation, но пакетом NumPy
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from sensor_frames import decode_frame, encode_frame, is_frame
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9750
+
+RAD_TO_ARCSEC = np.float32(206264.806)
+ROTATION_STEP = np.float32(0.1)  # currentRotation += values * 0.1f
+NUTATION_LIMIT = 20.0  # coerceIn(-20f, 20f)
+FRESH_SECONDS = 30.0  # показания старше этого в покупку не идут
+
+
+def rotations(start: np.ndarray, xyz: np.ndarray) -> np.ndarray:
+    """Углы после каждого сэмпла: накопление в float32, как currentRotation += values[i] * 0.1f"""
+    steps = np.empty((len(xyz) + 1, 3), dtype=np.float32)
+    steps[0] = start
+    np.multiply(xyz, ROTATION_STEP, out=steps[1:], casting="unsafe")
+    return np.cumsum(steps, axis=0, dtype=np.float32)[1:]
+
+
+def calculate_nutation(rotation: np.ndarray, base: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Долгота и наклон (arcsec) для массива углов n × 3 - векторный calculateNutation"""
+    delta = (rotation - base).astype(np.float32)
+    dx, dy, dz = (delta[:, i].astype(np.float64) for i in range(3))
+    cos_x, sin_x = np.cos(dx), np.sin(dx)
+    longitude = (dz * cos_x + dy * sin_x).astype(np.float32) * RAD_TO_ARCSEC
+    obliquity = (dy * cos_x - dz * sin_x).astype(np.float32) * RAD_TO_ARCSEC
+    return np.clip(longitude, -NUTATION_LIMIT, NUTATION_LIMIT), np.clip(obliquity, -NUTATION_LIMIT, NUTATION_LIMIT)
+
+
+@dataclass
+class DeviceState:
+    """Накопленные углы устройства и его последняя нутация"""
+    device: str
+    customer: Optional[str] = None
+    rotation: np.ndarray = field(default_factory=lambda: np.zeros(3, dtype=np.float32))
+    base: np.ndarray = field(default_factory=lambda: np.zeros(3, dtype=np.float32))
+    longitude: float = 0.0
+    obliquity: float = 0.0
+    samples: int = 0
+    last_sample_at: float = 0.0  # время устройства
+    last_seen: float = 0.0  # время приёма
+
+    def calibrate(self):
+        self.base = self.rotation.copy()
+
+
+class GyroHub:
+    """Состояние всех устройств и их привязка к покупателям
+
+    Устройство считается откалиброванным с первого пакета (углы с нуля,
+    как после запуска приложения); пакет с calibrate сдвигает базу на
+    текущие углы, как кнопка калибровки. Пакет сэмплов одного устройства
+    обрабатывается целиком массивами. latest(customer) отдаёт последнюю
+    свежую нутацию устройства покупателя - её берёт collect_customer_nutation.
+    """
+
+    def __init__(self, fresh_seconds: float = FRESH_SECONDS):
+        self.fresh_seconds = fresh_seconds
+        self.devices: Dict[str, DeviceState] = {}
+        self._by_customer: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.packets = 0
+        self.samples = 0
+        self.rejected = 0
+
+    def ingest(self, device: str, timestamps: np.ndarray, xyz: np.ndarray, customer: Optional[str] = None,
+               calibrate: bool = False, received_at: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Пакет сэмплов устройства: timestamps (n,), угловые скорости xyz (n × 3, рад/с)
+
+        Возвращает долготу и наклон после каждого сэмпла. Пакет с нечисловыми
+        или переполняющими углы значениями отклоняется целиком (ValueError),
+        не трогая состояния устройства.
+        """
+        received_at = time.time() if received_at is None else received_at
+        with self._lock:
+            state = self.devices.get(device)
+            if len(xyz) and not (np.isfinite(xyz).all() and np.isfinite(timestamps).all()):
+                self.rejected += 1
+                raise ValueError(f"{device}: в пакете есть NaN или бесконечность")
+            if len(xyz):
+                with np.errstate(over="ignore"):  # переполнение отловит проверка ниже
+                    angles = rotations(state.rotation if state is not None else np.zeros(3, dtype=np.float32), xyz)
+                if not np.isfinite(angles).all():
+                    self.rejected += 1
+                    raise ValueError(f"{device}: углы поворота переполнились")
+            if state is None:
+                state = self.devices[device] = DeviceState(device)
+            if customer and customer != state.customer:
+                if state.customer is not None:
+                    self._by_customer.pop(state.customer, None)
+                state.customer = customer
+                self._by_customer[customer] = device
+            if calibrate:
+                state.calibrate()
+            self.packets += 1
+            if not len(xyz):
+                return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32)
+            longitude, obliquity = calculate_nutation(angles, state.base)
+            state.rotation = angles[-1].copy()
+            state.longitude = float(longitude[-1])
+            state.obliquity = float(obliquity[-1])
+            state.samples += len(xyz)
+            state.last_sample_at = float(timestamps[-1])
+            state.last_seen = received_at
+            self.samples += len(xyz)
+        return longitude, obliquity
+
+    def ingest_json(self, payload: bytes, received_at: Optional[float] = None) -> bool:
+        """{"device": ..., "customer": ..., "calibrate": false, "samples": [[t, x, y, z], ...]}"""
+        try:
+            message = json.loads(payload)
+            samples = np.asarray(message.get("samples", []), dtype=np.float64).reshape(-1, 4)
+            device = str(message["device"])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            with self._lock:
+                self.rejected += 1
+            return False
+        with np.errstate(over="ignore"):  # 1e300 станет inf и будет отклонено в ingest
+            xyz = samples[:, 1:].astype(np.float32)
+        try:
+            self.ingest(device, samples[:, 0], xyz, message.get("customer"),
+                        bool(message.get("calibrate")), received_at)
+        except ValueError:
+            return False  # уже учтён в rejected
+        return True
+
+    def ingest_frame(self, payload, received_at: Optional[float] = None) -> bool:
+        """Двоичный кадр sensor_frames: сэмплы идут в расчёт прямо видом на буфер пакета"""
+        try:
+            frame = decode_frame(payload)
+        except ValueError:
+            with self._lock:
+                self.rejected += 1
+            return False
+        try:
+            self.ingest(frame.device, frame.timestamps, frame.xyz, frame.customer, frame.calibrate, received_at)
+        except ValueError:
+            return False  # уже учтён в rejected
+        return True
+
+    def ingest_payload(self, payload, received_at: Optional[float] = None) -> bool:
+        """Пакет любого формата: двоичный кадр по магическим байтам, иначе JSON"""
+        if is_frame(payload):
+            return self.ingest_frame(payload, received_at)
+        return self.ingest_json(payload, received_at)
+
+    def latest(self, customer: str, now: Optional[float] = None) -> Optional[Tuple[float, float]]:
+        """Свежая нутация устройства покупателя или None, если устройства нет или оно молчит"""
+        now = time.time() if now is None else now
+        with self._lock:
+            device = self._by_customer.get(customer)
+            state = self.devices.get(device) if device is not None else None
+            if state is None or not state.samples or now - state.last_seen > self.fresh_seconds:
+                return None
+            return state.longitude, state.obliquity
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'devices': len(self.devices),
+                'customers': len(self._by_customer),
+                'packets': self.packets,
+                'samples': self.samples,
+                'rejected': self.rejected,
+            }
+
+    # Сервер
+
+    def start_background(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                         record: Optional[str] = None) -> "GyroServer":
+        """Запускает приём в отдельном потоке со своим циклом событий; record - файл записи сессии"""
+        server = GyroServer(self, host, port, record)
+        server.start()
+        return server
+
+
+class GyroProtocol(asyncio.DatagramProtocol):
+    def __init__(self, hub: GyroHub, recording: Optional[BinaryIO] = None):
+        self.hub = hub
+        self.recording = recording
+
+    def datagram_received(self, data: bytes, addr):
+        if self.hub.ingest_payload(data) and self.recording is not None and is_frame(data):
+            self.recording.write(data)  # запись сессии - те же кадры подряд
+
+
+class GyroServer:
+    """UDP-сервер приёма в фоновом потоке: для консоли и веб-интерфейса"""
+
+    def __init__(self, hub: GyroHub, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 record: Optional[str] = None):
+        self.hub = hub
+        self.host = host
+        self.port = port
+        self.record = record
+        self._recording: Optional[BinaryIO] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._transport = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="gyro-ingest", daemon=True)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        if self.record:
+            self._recording = open(self.record, "ab")
+        self._transport, _ = self._loop.run_until_complete(self._loop.create_datagram_endpoint(
+            lambda: GyroProtocol(self.hub, self._recording), local_addr=(self.host, self.port)))
+        self.port = self._transport.get_extra_info("sockname")[1]
+        self._ready.set()
+        self._loop.run_forever()
+        self._transport.close()
+        self._loop.close()
+        if self._recording is not None:
+            self._recording.close()
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+
+# Симулятор устройств
+
+def synthetic_samples(rng: random.Random, start: float, rate_hz: float, count: int) -> List[List[float]]:
+    """count сэмплов покачивающегося покупателя: медленная синусоида плюс дрожь руки"""
+    phase = rng.uniform(0, 2 * math.pi)
+    samples = []
+    for i in range(count):
+        t = start + i / rate_hz
+        sway = 1e-5 * math.sin(0.5 * t + phase)
+        samples.append([t, sway + rng.gauss(0, 2e-6), rng.gauss(0, 2e-6), -sway + rng.gauss(0, 2e-6)])
+    return samples
+
+
+async def simulate_devices(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, devices: int = 10,
+                           rate_hz: float = 200.0, seconds: float = 5.0, batch: int = 20,
+                           seed: int = 6798, binary: bool = False) -> int:
+    """devices устройств шлют по batch сэмплов с частотой rate_hz; возвращает число отправленных сэмплов
+
+    binary - двоичные кадры sensor_frames вместо JSON.
+    """
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, port))
+    sent = 0
+
+    async def device(n: int):
+        nonlocal sent
+        rng = random.Random(seed + n)
+        name = f"устройство_{n}"
+        customer = f"покупатель_{n}"
+        started = time.time()
+        t = started
+        packets = int(seconds * rate_hz / batch)
+        for k in range(packets):
+            samples = synthetic_samples(rng, t, rate_hz, batch)
+            if binary:
+                transport.sendto(encode_frame(name, [s[0] for s in samples], [s[1:] for s in samples], customer))
+            else:
+                message = {"device": name, "customer": customer, "samples": samples}
+                transport.sendto(json.dumps(message).encode("utf-8"))
+            sent += batch
+            t += batch / rate_hz
+            await asyncio.sleep(max(0.0, started + (k + 1) * batch / rate_hz - time.time()))
+
+    try:
+        await asyncio.gather(*(device(n) for n in range(devices)))
+    finally:
+        transport.close()
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Приём потоков гироскопа и симулятор устройств")
+    parser.add_argument("mode", choices=["serve", "simulate", "bench"])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--devices", type=int, default=50, help="устройств в симуляторе")
+    parser.add_argument("--rate", type=float, default=200.0, help="сэмплов в секунду на устройство")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--batch", type=int, default=20, help="сэмплов в пакете")
+    parser.add_argument("--format", choices=["json", "binary"], default="json", help="формат пакетов симулятора")
+    parser.add_argument("--record", default=None, help="дописывать принятые двоичные кадры в файл сессии")
+    args = parser.parse_args()
+    binary = args.format == "binary"
+
+    if args.mode == "simulate":
+        sent = asyncio.run(simulate_devices(args.host, args.port, args.devices, args.rate, args.seconds, args.batch,
+                                            binary=binary))
+        print(f"📡 Отправлено сэмплов: {sent:,}")
+        return
+
+    hub = GyroHub()
+    server = hub.start_background(args.host, args.port if args.mode == "serve" else 0, args.record)
+    print(f"📱 Приём гироскопов на udp://{server.host}:{server.port}")
+    try:
+        if args.mode == "serve":
+            while True:
+                time.sleep(5)
+                print(f"   {hub.stats()}")
+        started = time.perf_counter()
+        sent = asyncio.run(simulate_devices(server.host, server.port, args.devices, args.rate,
+                                            args.seconds, args.batch, binary=binary))
+        time.sleep(0.2)  # дочитать хвост очереди
+        elapsed = time.perf_counter() - started
+        stats = hub.stats()
+        print(f"📡 {args.devices} устройств × {args.rate:.0f} Гц: отправлено {sent:,}, принято {stats['samples']:,} "
+              f"сэмплов ({stats['samples'] / elapsed:,.0f}/с), пакетов {stats['packets']:,}, отброшено {stats['rejected']}")
+        for state in list(hub.devices.values())[:3]:
+            print(f"   {state.device} → {state.customer}: {state.longitude:+.3f}'' × {state.obliquity:+.3f}''")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Поиск космических тел по имени: регистр и ё/е не важны, опечатки прощаются
+Триграммный индекс каталога и разбор имён процедурных тел без их перебора
+"""
+
+import bisect
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+_NON_WORD = re.compile(r"[^\w№]+")
+_NUMBER = re.compile(r"№?\s*(\d+)")
+
+EXACT_BONUS = 1.0
+PREFIX_BONUS = 0.5
+SUBSTRING_BONUS = 0.25
+MIN_SCORE = 0.3  # ниже этого совпадение считается случайным
+SHORT_QUERY = 3  # запросы короче - по началу имени, а не по триграммам
+
+
+def normalize(text: str) -> str:
+    """Имя для сравнения: без регистра, ё как е, дефисы и знаки - пробелы"""
+    text = text.casefold().replace("ё", "е")
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def trigrams(normalized: str) -> Set[str]:
+    """Триграммы слов с отбивкой в начале: «ко» и «кол» совпадут с началом «колыбель»"""
+    grams = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def score(query: str, name: str, query_grams: Optional[Set[str]] = None,
+          name_grams: Optional[Set[str]] = None) -> float:
+    """Сходство нормализованных строк: коэффициент Дайса по триграммам плюс надбавки"""
+    query_grams = trigrams(query) if query_grams is None else query_grams
+    name_grams = trigrams(name) if name_grams is None else name_grams
+    if not query_grams or not name_grams:
+        return 0.0
+    similarity = 2 * len(query_grams & name_grams) / (len(query_grams) + len(name_grams))
+    if name == query:
+        return similarity + EXACT_BONUS
+    if name.startswith(query):
+        return similarity + PREFIX_BONUS
+    if query in name:
+        return similarity + SUBSTRING_BONUS
+    return similarity
+
+
+class NameIndex:
+    """Триграммный индекс имён тел каталога
+
+    Для каждой триграммы хранится множество id тел, в чьём имени она
+    встречается. Кандидаты - тела, разделяющие с запросом хотя бы
+    треть его триграмм; только они и ранжируются. Отсортированный
+    список нормализованных имён отвечает на короткие запросы по началу
+    имени двумя бинарными поисками.
+    """
+
+    def __init__(self):
+        self._names: Dict[str, str] = {}  # id -> нормализованное имя
+        self._postings: Dict[str, Set[str]] = {}
+        self._sorted: List[Tuple[str, str]] = []  # (нормализованное имя, id)
+        self._lock = threading.Lock()
+
+    def add(self, body_id: str, name: str):
+        normalized = normalize(name)
+        with self._lock:
+            if self._names.get(body_id) == normalized:
+                return
+            if body_id in self._names:
+                self._remove(body_id)
+            self._names[body_id] = normalized
+            for gram in trigrams(normalized):
+                self._postings.setdefault(gram, set()).add(body_id)
+            bisect.insort(self._sorted, (normalized, body_id))
+
+    def _remove(self, body_id: str):
+        normalized = self._names.pop(body_id)
+        for gram in trigrams(normalized):
+            self._postings[gram].discard(body_id)
+        del self._sorted[bisect.bisect_left(self._sorted, (normalized, body_id))]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def prefix(self, query: str, limit: int = 10) -> List[str]:
+        """id тел, чьё имя начинается с query, по алфавиту"""
+        query = normalize(query)
+        with self._lock:
+            start = bisect.bisect_left(self._sorted, (query,))
+            found = []
+            for name, body_id in self._sorted[start:start + limit]:
+                if not name.startswith(query):
+                    break
+                found.append(body_id)
+        return found
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[float, str]]:
+        """(оценка, id) лучших совпадений, лучшие первыми"""
+        query = normalize(query)
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        if len(query) < SHORT_QUERY:
+            # короче триграммы: ищем только по началу имени в отсортированном списке
+            found = self.prefix(query, limit)
+            with self._lock:
+                names = {body_id: self._names[body_id] for body_id in found if body_id in self._names}
+        else:
+            with self._lock:
+                hits = Counter()
+                for gram in query_grams:
+                    hits.update(self._postings.get(gram, ()))
+                needed = max(1, len(query_grams) // 3)
+                names = {body_id: self._names[body_id] for body_id, n in hits.items() if n >= needed}
+        ranked = []
+        for body_id, name in names.items():
+            value = score(query, name, query_grams)
+            if value >= MIN_SCORE:
+                ranked.append((value, body_id))
+        ranked.sort(key=lambda hit: (-hit[0], names[hit[1]]))
+        return ranked[:limit]
+
+
+class ProceduralNameIndex:
+    """Поиск по именам процедурного каталога без материализации тел
+
+    Имя процедурного тела - «{голова} {хвост} №{номер}», где голова и
+    хвост берутся из NAME_HEADS и NAME_TAILS по случайным слотам тела.
+    Запрос сравнивается со всеми парами голова-хвост (их сотни, а не
+    миллионы), а номер из запроса сразу даёт тело. Для поиска без номера
+    коды пар всех тел один раз вычисляются векторно и раскладываются по
+    парам: тела подходящей пары - срез готового массива номеров
+    (4 байта на тело каталога, строится при первом таком запросе).
+    """
+
+    def __init__(self, procedural):
+        from celestial_generator import NAME_HEADS, NAME_TAILS
+        self.procedural = procedural
+        self.heads = NAME_HEADS
+        self.tails = NAME_TAILS
+        self.pairs = [normalize(f"{head} {tail}") for head in NAME_HEADS for tail in NAME_TAILS]
+        self._pair_grams = [trigrams(pair) for pair in self.pairs]
+        self._order: Optional[np.ndarray] = None  # номера тел, сгруппированные по паре
+        self._pair_start: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def pair_of(self, index: int) -> int:
+        from celestial_generator import U_HEAD, U_TAIL
+        u = self.procedural.uniform
+        head = int(u(index, U_HEAD) * len(self.heads))
+        tail = int(u(index, U_TAIL) * len(self.tails))
+        return head * len(self.tails) + tail
+
+    def _build(self, chunk: int = 1 << 20):
+        from celestial_generator import U_HEAD, U_TAIL, _DRAWS_PER_BODY, _TO_UNIT
+        from columnar_catalog import _splitmix64
+        size = self.procedural.size
+        codes = np.empty(size, dtype=np.uint16)
+        for start in range(0, size, chunk):
+            index = np.arange(start, min(size, start + chunk), dtype=np.uint64)
+            base = np.uint64(self.procedural._seed_base) + index * np.uint64(_DRAWS_PER_BODY)
+
+            def u(slot):  # те же числа, что у ProceduralCatalog.uniform
+                return (_splitmix64(base + np.uint64(slot)) >> np.uint64(11)).astype(np.float64) * _TO_UNIT
+
+            head = (u(U_HEAD) * len(self.heads)).astype(np.uint16)
+            tail = (u(U_TAIL) * len(self.tails)).astype(np.uint16)
+            codes[start:start + len(index)] = head * len(self.tails) + tail
+        self._order = np.argsort(codes, kind="stable").astype(np.int32 if size < 2 ** 31 else np.int64)
+        self._pair_start = np.searchsorted(codes[self._order], np.arange(len(self.pairs) + 1))
+
+    def bodies_of_pair(self, pair: int, limit: int) -> np.ndarray:
+        """Первые limit номеров тел с данной парой голова-хвост"""
+        with self._lock:
+            if self._order is None:
+                self._build()
+        start = self._pair_start[pair]
+        return self._order[start:min(self._pair_start[pair + 1], start + limit)]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[float, str]]:
+        """(оценка, id) лучших совпадений среди процедурных тел"""
+        normalized = normalize(query)
+        number = _NUMBER.search(normalized)
+        words = normalize(_NUMBER.sub(" ", normalized)) if number else normalized
+        word_grams = trigrams(words)
+        pair_scores = [score(words, pair, word_grams, grams) if word_grams else 0.0
+                       for pair, grams in zip(self.pairs, self._pair_grams)]
+
+        if number:
+            index = int(number.group(1)) - 1
+            if not 0 <= index < self.procedural.size:
+                return []
+            value = pair_scores[self.pair_of(index)] if word_grams else EXACT_BONUS
+            return [(value + EXACT_BONUS, self.procedural.body_id(index))] if value >= MIN_SCORE else []
+
+        ranked = sorted(((value, pair) for pair, value in enumerate(pair_scores) if value >= MIN_SCORE),
+                        key=lambda hit: -hit[0])
+        found: List[Tuple[float, str]] = []
+        for value, pair in ranked:
+            for index in self.bodies_of_pair(pair, limit - len(found)):
+                found.append((value, self.procedural.body_id(int(index))))
+            if len(found) >= limit:
+                break
+        return found
+
+
+class NameSearch:
+    """Общий поиск по рукотворному каталогу и процедурным телам"""
+
+    def __init__(self, procedural=None):
+        self.index = NameIndex()
+        self.procedural = ProceduralNameIndex(procedural) if procedural is not None else None
+
+    def add(self, body_id: str, name: str):
+        self.index.add(body_id, name)
+
+    def add_many(self, bodies: Iterable):
+        for body in bodies:
+            self.index.add(body.id, body.name)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[float, str]]:
+        best: Dict[str, float] = {}
+        sources = [self.index] if self.procedural is None else [self.index, self.procedural]
+        for source in sources:
+            for value, body_id in source.search(query, limit):
+                if value > best.get(body_id, -1.0):
+                    best[body_id] = value
+        return sorted(((value, body_id) for body_id, value in best.items()), key=lambda hit: -hit[0])[:limit]
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Кольцевой буфер собранной нутации покупателей
+Память не растёт со временем, а сводная статистика читается за постоянное время
+"""
+
+import math
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+SAMPLE_DTYPE = np.dtype([
+    ('timestamp', 'f8'),
+    ('customer', 'i4'),  # номер в таблице имён покупателей
+    ('customer_longitude', 'f8'),
+    ('customer_obliquity', 'f8'),
+    ('earth_longitude', 'f8'),
+    ('earth_obliquity', 'f8'),
+    ('gravity_yield', 'f8'),
+])
+
+
+class NutationRingBuffer:
+    """Последние capacity сборов нутации в массиве фиксированного размера
+
+    Старые записи затираются новыми. Для добычи гравитации в окне буфера
+    поддерживаются сумма, сумма квадратов и гистограмма: при записи
+    значение добавляется, при вытеснении - вычитается, поэтому среднее,
+    дисперсия и перцентили не требуют прохода по данным. Суммы раз в
+    capacity записей пересчитываются заново, чтобы не копилась ошибка
+    округления. Имена покупателей хранятся один раз в таблице имён.
+    """
+
+    def __init__(self, capacity: int = 100_000, bins: int = 1000, max_yield: float = 10.0):
+        if capacity <= 0:
+            raise ValueError("capacity должен быть положительным")
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=SAMPLE_DTYPE)
+        self._head = 0  # куда пойдёт следующая запись
+        self._size = 0
+        self.total = 0  # записей за всё время, включая вытесненные
+        self._names: List[str] = []
+        self._name_codes: Dict[str, int] = {}
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self.bin_width = max_yield / bins
+        self._histogram = np.zeros(bins, dtype=np.int64)
+        self._since_resync = 0
+
+    def _code(self, customer: str) -> int:
+        code = self._name_codes.get(customer)
+        if code is None:
+            code = self._name_codes[customer] = len(self._names)
+            self._names.append(customer)
+        return code
+
+    def _bin(self, value: float) -> int:
+        return min(int(value / self.bin_width), len(self._histogram) - 1)
+
+    def append(self, customer: str, customer_nutation, earth_nutation, timestamp: float,
+               gravity_yield: Optional[float] = None):
+        """Добавляет один сбор нутации"""
+        customer_longitude, customer_obliquity = customer_nutation
+        earth_longitude, earth_obliquity = earth_nutation
+        if gravity_yield is None:
+            gravity_yield = (abs(customer_longitude - earth_longitude) + abs(customer_obliquity - earth_obliquity)) * 0.1
+        if not math.isfinite(gravity_yield):
+            return  # NaN или бесконечность испортили бы суммы и гистограмму навсегда
+        if self._size == self.capacity:
+            evicted = float(self._data['gravity_yield'][self._head])
+            self._sum -= evicted
+            self._sumsq -= evicted * evicted
+            self._histogram[self._bin(evicted)] -= 1
+        else:
+            self._size += 1
+        self._data[self._head] = (timestamp, self._code(customer), customer_longitude, customer_obliquity,
+                                  earth_longitude, earth_obliquity, gravity_yield)
+        self._sum += gravity_yield
+        self._sumsq += gravity_yield * gravity_yield
+        self._histogram[self._bin(gravity_yield)] += 1
+        self._head = (self._head + 1) % self.capacity
+        self.total += 1
+        self._since_resync += 1
+        if self._since_resync >= self.capacity:
+            self._resync()
+
+    def extend(self, customers: List[str], customer_nutation: np.ndarray, earth_nutation, timestamp: float,
+               gravity_yield: Optional[np.ndarray] = None):
+        """Добавляет пакет сборов с общей земной нутацией (для пакетной покупки)"""
+        customer_nutation = np.asarray(customer_nutation, dtype=np.float64).reshape(-1, 2)
+        earth = np.asarray(earth_nutation, dtype=np.float64)
+        if gravity_yield is None:
+            gravity_yield = np.abs(customer_nutation - earth).sum(axis=1) * 0.1
+        finite = np.isfinite(gravity_yield)
+        if not finite.all():  # нечисловые сборы пропускаются, как и в append
+            customers = [c for c, ok in zip(customers, finite) if ok]
+            customer_nutation = customer_nutation[finite]
+            gravity_yield = gravity_yield[finite]
+        n = len(customer_nutation)
+        if not n:
+            return
+        if n > self.capacity:  # выживут только последние capacity
+            customers = customers[-self.capacity:]
+            customer_nutation = customer_nutation[-self.capacity:]
+            gravity_yield = gravity_yield[-self.capacity:]
+            self.total += n - self.capacity
+            n = self.capacity
+        positions = (self._head + np.arange(n)) % self.capacity
+        overwritten = max(0, self._size + n - self.capacity)
+        if overwritten:
+            evicted = self._data['gravity_yield'][positions[n - overwritten:] if self._size < self.capacity
+                                                  else positions[:overwritten]]
+            self._remove(evicted)
+        records = self._data[positions]
+        records['timestamp'] = timestamp
+        records['customer'] = [self._code(c) for c in customers]
+        records['customer_longitude'] = customer_nutation[:, 0]
+        records['customer_obliquity'] = customer_nutation[:, 1]
+        records['earth_longitude'] = earth[0]
+        records['earth_obliquity'] = earth[1]
+        records['gravity_yield'] = gravity_yield
+        self._data[positions] = records
+        self._sum += float(gravity_yield.sum())
+        self._sumsq += float(np.dot(gravity_yield, gravity_yield))
+        np.add.at(self._histogram, self._bins(gravity_yield), 1)
+        self._size = min(self.capacity, self._size + n)
+        self._head = (self._head + n) % self.capacity
+        self.total += n
+        self._since_resync += n
+        if self._since_resync >= self.capacity:
+            self._resync()
+
+    def _bins(self, values: np.ndarray) -> np.ndarray:
+        return np.minimum((values / self.bin_width).astype(np.int64), len(self._histogram) - 1)
+
+    def _remove(self, values: np.ndarray):
+        self._sum -= float(values.sum())
+        self._sumsq -= float(np.dot(values, values))
+        np.subtract.at(self._histogram, self._bins(values), 1)
+
+    def _resync(self):
+        values = self._ordered()['gravity_yield']
+        self._sum = float(values.sum())
+        self._sumsq = float(np.dot(values, values))
+        self._since_resync = 0
+
+    def _ordered(self) -> np.ndarray:
+        if self._size < self.capacity:
+            return self._data[:self._size]
+        return np.concatenate([self._data[self._head:], self._data[:self._head]])
+
+    # Чтение
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def _as_dict(self, record) -> Dict:
+        return {
+            'customer': self._names[int(record['customer'])],
+            'customer_nutation': (float(record['customer_longitude']), float(record['customer_obliquity'])),
+            'earth_nutation': (float(record['earth_longitude']), float(record['earth_obliquity'])),
+            'gravity_yield': float(record['gravity_yield']),
+            'timestamp': float(record['timestamp']),
+        }
+
+    def last(self, n: int) -> List[Dict]:
+        """Последние n сборов, старые первыми - в прежнем формате словарей"""
+        n = min(n, self._size)
+        positions = (self._head - n + np.arange(n)) % self.capacity
+        return [self._as_dict(record) for record in self._data[positions]]
+
+    def __iter__(self) -> Iterator[Dict]:
+        for record in self._ordered():
+            yield self._as_dict(record)
+
+    def array(self) -> np.ndarray:
+        """Копия содержимого буфера в порядке поступления"""
+        return self._ordered().copy()
+
+    def percentile(self, q: float) -> float:
+        """Перцентиль добычи гравитации по гистограмме (точность - ширина корзины)"""
+        if not self._size:
+            return 0.0
+        rank = q / 100.0 * self._size
+        cumulative = np.cumsum(self._histogram)
+        index = int(np.searchsorted(cumulative, max(rank, 1), side='left'))
+        return (index + 0.5) * self.bin_width
+
+    def stats(self) -> Dict[str, float]:
+        """Число, среднее, дисперсия и перцентили добычи гравитации в окне буфера"""
+        n = self._size
+        mean = self._sum / n if n else 0.0
+        variance = max(0.0, self._sumsq / n - mean * mean) if n else 0.0
+        return {
+            'count': n,
+            'total': self.total,
+            'mean': mean,
+            'variance': variance,
+            'std': variance ** 0.5,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+        }
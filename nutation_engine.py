@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Движок нутации Земли: многочленный ряд IAU 1980 и таблицы эфемерид
+Одна и та же нутация для одиночного момента и для целых массивов эпох
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+UNIX_EPOCH_JD = 2440587.5
+J2000_JD = 2451545.0
+DAYS_PER_CENTURY = 36525.0
+
+# Главные члены ряда нутации IAU 1980 (Meeus, табл. 22.A).
+# Множители аргументов D, M, M', F, Ω; Δψ = (A + B·T)·0.0001″, Δε = (C + D·T)·0.0001″
+IAU1980_TERMS: Sequence[Tuple[int, int, int, int, int, float, float, float, float]] = (
+    (0, 0, 0, 0, 1, -171996, -174.2, 92025, 8.9),
+    (-2, 0, 0, 2, 2, -13187, -1.6, 5736, -3.1),
+    (0, 0, 0, 2, 2, -2274, -0.2, 977, -0.5),
+    (0, 0, 0, 0, 2, 2062, 0.2, -895, 0.5),
+    (0, 1, 0, 0, 0, 1426, -3.4, 54, -0.1),
+    (0, 0, 1, 0, 0, 712, 0.1, -7, 0),
+    (-2, 1, 0, 2, 2, -517, 1.2, 224, -0.6),
+    (0, 0, 0, 2, 1, -386, -0.4, 200, 0),
+    (0, 0, 1, 2, 2, -301, 0, 129, -0.1),
+    (-2, -1, 0, 2, 2, 217, -0.5, -95, 0.3),
+    (-2, 0, 1, 0, 0, -158, 0, 0, 0),
+    (-2, 0, 0, 2, 1, 129, 0.1, -70, 0),
+    (0, 0, -1, 2, 2, 123, 0, -53, 0),
+    (2, 0, 0, 0, 0, 63, 0, 0, 0),
+    (0, 0, 1, 0, 1, 63, 0.1, -33, 0),
+    (2, 0, -1, 2, 2, -59, 0, 26, 0),
+    (0, 0, -1, 0, 1, -58, -0.1, 32, 0),
+    (0, 0, 1, 2, 1, -51, 0, 27, 0),
+    (-2, 0, 2, 0, 0, 48, 0, 0, 0),
+    (0, 0, -2, 2, 1, 46, 0, -24, 0),
+    (2, 0, 0, 2, 2, -38, 0, 16, 0),
+    (0, 0, 2, 2, 2, -31, 0, 13, 0),
+    (0, 0, 2, 0, 0, 29, 0, 0, 0),
+    (-2, 0, 1, 2, 2, 29, 0, -12, 0),
+    (0, 0, 0, 2, 0, 26, 0, 0, 0),
+    (-2, 0, 0, 2, 0, -22, 0, 0, 0),
+    (0, 0, -1, 2, 1, 21, 0, -10, 0),
+    (0, 2, 0, 0, 0, 17, -0.1, 0, 0),
+    (2, 0, -1, 0, 1, 16, 0, -8, 0),
+    (-2, 2, 0, 2, 2, -16, 0.1, 7, 0),
+)
+
+# Фундаментальные аргументы: полиномы по T в градусах (Meeus, гл. 22)
+_FUNDAMENTAL = np.array([
+    (297.85036, 445267.111480, -0.0019142, 1.0 / 189474.0),   # D - элонгация Луны
+    (357.52772, 35999.050340, -0.0001603, -1.0 / 300000.0),   # M - аномалия Солнца
+    (134.96298, 477198.867398, 0.0086972, 1.0 / 56250.0),     # M' - аномалия Луны
+    (93.27191, 483202.017538, -0.0036825, 1.0 / 327270.0),    # F - аргумент широты Луны
+    (125.04452, -1934.136261, 0.0020708, 1.0 / 450000.0),     # Ω - узел лунной орбиты
+])
+
+
+def julian_centuries(unix_time):
+    """Юлианские столетия от J2000.0 для unix-времени (число или массив)"""
+    return (np.asarray(unix_time, dtype=np.float64) / 86400.0 + UNIX_EPOCH_JD - J2000_JD) / DAYS_PER_CENTURY
+
+
+class NutationEngine:
+    """Нутация в долготе Δψ и наклоне Δε, в угловых секундах"""
+
+    CHUNK = 1 << 18  # эпох за один проход, чтобы не раздувать промежуточные матрицы
+
+    def __init__(self, terms: Sequence[Tuple] = IAU1980_TERMS):
+        table = np.array(terms, dtype=np.float64)
+        self.multipliers = table[:, :5]
+        self.psi = table[:, 5:7] * 1e-4
+        self.eps = table[:, 7:9] * 1e-4
+        self._terms = [tuple(float(x) for x in row) for row in table]
+        self._fundamental = [tuple(float(x) for x in row) for row in _FUNDAMENTAL]
+
+    def evaluate(self, unix_times) -> Tuple[np.ndarray, np.ndarray]:
+        """Δψ и Δε для массива моментов"""
+        times = np.atleast_1d(np.asarray(unix_times, dtype=np.float64))
+        dpsi = np.empty_like(times)
+        deps = np.empty_like(times)
+        for start in range(0, len(times), self.CHUNK):
+            t = julian_centuries(times[start:start + self.CHUNK])
+            powers = np.stack([np.ones_like(t), t, t * t, t * t * t])           # 4 × n
+            args = np.radians(np.mod(_FUNDAMENTAL @ powers, 360.0))               # 5 × n
+            phase = self.multipliers @ args                                        # k × n
+            dpsi[start:start + len(t)] = np.einsum("kn,kn->n", self.psi[:, :1] + self.psi[:, 1:] * t, np.sin(phase))
+            deps[start:start + len(t)] = np.einsum("kn,kn->n", self.eps[:, :1] + self.eps[:, 1:] * t, np.cos(phase))
+        return dpsi, deps
+
+    def at(self, unix_time: float) -> Tuple[float, float]:
+        """Δψ и Δε для одного момента - без массивов, для частых одиночных запросов"""
+        t = (unix_time / 86400.0 + UNIX_EPOCH_JD - J2000_JD) / DAYS_PER_CENTURY
+        args = [math.radians((a + t * (b + t * (c + t * d))) % 360.0) for a, b, c, d in self._fundamental]
+        dpsi = deps = 0.0
+        for kd, km, kmp, kf, ko, a, b, c, d in self._terms:
+            phase = kd * args[0] + km * args[1] + kmp * args[2] + kf * args[3] + ko * args[4]
+            dpsi += (a + b * t) * math.sin(phase)
+            deps += (c + d * t) * math.cos(phase)
+        return dpsi * 1e-4, deps * 1e-4
+
+    def table(self, start: float, end: float, step_seconds: float = 3600.0) -> "NutationTable":
+        """Плотная таблица эфемерид на интервале [start, end]"""
+        count = int(math.ceil((end - start) / step_seconds)) + 1
+        times = start + np.arange(count) * step_seconds
+        dpsi, deps = self.evaluate(times)
+        return NutationTable(start, step_seconds, np.stack([dpsi, deps], axis=1))
+
+
+class NutationTable:
+    """Предвычисленная нутация с линейной интерполяцией
+
+    Нутация меняется плавно (кратчайший член ряда - около 5.5 суток), поэтому
+    при шаге в час ошибка интерполяции - микросекунды дуги. Таблица
+    сохраняется в .npy и открывается через mmap без чтения целиком.
+    Вне интервала таблицы запрос уходит в движок-резерв.
+    """
+
+    def __init__(self, start: float, step: float, values: np.ndarray,
+                 fallback: Optional[NutationEngine] = None):
+        self.start = float(start)
+        self.step = float(step)
+        self.values = values  # n × 2: Δψ, Δε
+        self.end = self.start + self.step * (len(values) - 1)
+        self.fallback = fallback or NutationEngine()
+
+    def save(self, path: str):
+        header = np.array([[self.start, self.step]])
+        np.save(path, np.concatenate([header, np.asarray(self.values)]))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "NutationTable":
+        data = np.load(path, mmap_mode="r" if mmap else None)
+        return cls(data[0, 0], data[0, 1], data[1:])
+
+    def covers(self, unix_time: float) -> bool:
+        return self.start <= unix_time <= self.end
+
+    def at(self, unix_time: float) -> Tuple[float, float]:
+        if not self.covers(unix_time):
+            return self.fallback.at(unix_time)
+        pos = (unix_time - self.start) / self.step
+        i = min(int(pos), len(self.values) - 2)
+        frac = pos - i
+        (psi0, eps0), (psi1, eps1) = self.values[i], self.values[i + 1]
+        return float(psi0 + (psi1 - psi0) * frac), float(eps0 + (eps1 - eps0) * frac)
+
+    def evaluate(self, unix_times) -> Tuple[np.ndarray, np.ndarray]:
+        times = np.atleast_1d(np.asarray(unix_times, dtype=np.float64))
+        inside = (times >= self.start) & (times <= self.end)
+        pos = (times[inside] - self.start) / self.step
+        i = np.minimum(pos.astype(np.int64), len(self.values) - 2)
+        frac = pos - i
+        lo = np.asarray(self.values[i])
+        hi = np.asarray(self.values[i + 1])
+        interpolated = lo + (hi - lo) * frac[:, None]
+        dpsi = np.empty_like(times)
+        deps = np.empty_like(times)
+        dpsi[inside], deps[inside] = interpolated[:, 0], interpolated[:, 1]
+        if not inside.all():
+            dpsi[~inside], deps[~inside] = self.fallback.evaluate(times[~inside])
+        return dpsi, deps
+
+
+class NutationReading(NamedTuple):
+    """Показание часов нутации: эпоха кванта и нутация на эту эпоху"""
+    epoch: float
+    longitude: float
+    obliquity: float
+
+
+class NutationClock:
+    """Часы нутации, общие для всех путей запроса
+
+    Время округляется вниз до кванта, и нутация считается один раз на квант:
+    все, кто спросил внутри одного кванта, получают одно и то же значение.
+    Последние кванты хранятся в маленьком LRU - запросы со сдвигом во
+    времени (прогнозы) не вытесняют текущий.
+    """
+
+    def __init__(self, source=None, quantum_seconds: float = 1.0, capacity: int = 64):
+        if quantum_seconds <= 0:
+            raise ValueError("quantum_seconds должен быть положительным")
+        self.source = source or NutationEngine()
+        self.quantum_seconds = float(quantum_seconds)
+        self.capacity = capacity
+        self._cache: "OrderedDict[int, NutationReading]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.compute_seconds = 0.0  # суммарное время вычислений при промахах
+
+    def read(self, unix_time: Optional[float] = None) -> NutationReading:
+        """Нутация на квант, в который попадает unix_time (по умолчанию - сейчас)"""
+        unix_time = time.time() if unix_time is None else unix_time
+        quantum = math.floor(unix_time / self.quantum_seconds)
+        with self._lock:
+            reading = self._cache.get(quantum)
+            if reading is not None:
+                self.hits += 1
+                self._cache.move_to_end(quantum)
+                return reading
+        epoch = quantum * self.quantum_seconds
+        started = time.perf_counter()
+        longitude, obliquity = self.source.at(epoch)
+        elapsed = time.perf_counter() - started
+        reading = NutationReading(epoch, longitude, obliquity)
+        with self._lock:
+            self.misses += 1
+            self.compute_seconds += elapsed
+            self._cache[quantum] = reading
+            if len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+        return reading
+
+    def stats(self) -> Dict[str, float]:
+        """Попадания, промахи и сэкономленное время вычислений"""
+        with self._lock:
+            total = self.hits + self.misses
+            per_compute = self.compute_seconds / self.misses if self.misses else 0.0
+            return {
+                'quantum_seconds': self.quantum_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'compute_seconds': self.compute_seconds,
+                'saved_seconds': self.hits * per_compute,
+            }
+
+
+_shared_clocks: Dict[float, NutationClock] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_clock(quantum_seconds: float = 1.0) -> NutationClock:
+    """Часы нутации процесса - одни на веб-интерфейс, консоль и демонстрации
+
+    Часы общие для каждого кванта: запрос с другим квантом получит свои
+    часы, а не чужие с молча подменённым квантом.
+    """
+    quantum_seconds = float(quantum_seconds)
+    with _shared_lock:
+        clock = _shared_clocks.get(quantum_seconds)
+        if clock is None:
+            clock = _shared_clocks[quantum_seconds] = NutationClock(quantum_seconds=quantum_seconds)
+        return clock
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Backtester for GCR/OGLEC strategies over recorded market event logs.
+
+Event logs are the JSONL files written by ogle_market.EventLog. replay() runs
+the recorded orders and cancels through ogle_market.match_books, the same
+matching code the node uses, and reproduces its trades. replay_columns() is
+the fast path: the same crossing rules compiled from ogle_match.c (built on
+first use with the system C compiler and loaded with ctypes) over columnar
+events, at several million events per second on one core. Without a C
+compiler it falls back to replay().
+
+A market maker can be put into either path. Before every order it re-quotes
+around the last trade, and its quotes queue and fill in the book like
+anyone else's, so fills respect queue position and resting liquidity.
+Parameter sweeps fan out over a process pool.
+"""
+import argparse
+import bisect
+import ctypes
+import functools
+import hashlib
+import itertools
+import json
+import os
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from ogle_market import EVENTS_FILE, _ask_key, _bid_key, match_books
+
+MAKER = "maker"
+MAKER_BID = "maker-bid"
+MAKER_ASK = "maker-ask"
+KERNEL_SOURCE = os.path.join(os.path.dirname(__file__), "ogle_match.c")
+
+
+def read_events(path: str = EVENTS_FILE) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _remove(book: List[Dict], entry: Dict):
+    key = _bid_key if entry["side"] == "buy" else _ask_key
+    i = bisect.bisect_left(book, key(entry), key=key)
+    while book[i]["id"] != entry["id"]:
+        i += 1
+    book.pop(i)
+
+
+def replay(events: Iterable[Dict], half_spread: float = 0.0, quote_size: float = 0.0) -> List[Dict]:
+    """Rebuild the book from order/cancel events and return the trades it produces.
+
+    Recorded trade events are ignored; they are what a faithful replay
+    should reproduce. With quote_size > 0 a market maker re-quotes
+    last_trade * (1 -/+ half_spread) for quote_size before every order.
+    """
+    bids: List[Dict] = []
+    asks: List[Dict] = []
+    resting: Dict[str, Dict] = {}
+    trades: List[Dict] = []
+
+    def forget(o):
+        resting.pop(o["id"], None)
+
+    def rest(entry, ts):
+        if entry["side"] == "buy":
+            bisect.insort(bids, entry, key=_bid_key)
+        else:
+            bisect.insort(asks, entry, key=_ask_key)
+        resting[entry["id"]] = entry
+        # most orders rest without crossing; only a crossed book goes through the matcher
+        if bids and asks and bids[0]["price"] >= asks[0]["price"]:
+            trades.extend(match_books(bids, asks, ts=ts, on_filled=forget))
+
+    for e in events:
+        kind = e.get("kind")
+        if kind == "order":
+            if quote_size > 0 and trades:
+                last = trades[-1]["price"]
+                for side, order_id, factor in (("buy", MAKER_BID, 1.0 - half_spread),
+                                               ("sell", MAKER_ASK, 1.0 + half_spread)):
+                    stale = resting.pop(order_id, None)
+                    if stale is not None:
+                        _remove(bids if side == "buy" else asks, stale)
+                    rest({"id": order_id, "username": MAKER, "side": side, "price": last * factor,
+                          "amount": quote_size, "ts": e["ts"]}, e["ts"])
+            entry = dict(e)  # the book mutates amounts; the caller's events stay intact
+            del entry["kind"]
+            rest(entry, e["ts"])
+        elif kind == "cancel":
+            entry = resting.pop(e["id"], None)
+            if entry is not None:
+                _remove(bids if entry["side"] == "buy" else asks, entry)
+    return trades
+
+
+class EventColumns(NamedTuple):
+    """Order/cancel events as arrays; orders are numbered by first appearance of their id."""
+    kind: np.ndarray  # uint8: 0 order, 1 cancel
+    side: np.ndarray  # uint8: 0 buy, 1 sell
+    order: np.ndarray  # int64 order number (for a cancel, of the order it names; -1 if unknown)
+    amount: np.ndarray  # float64 per event
+    price: np.ndarray  # float64 per order number, plus the maker's two quotes
+    ts: np.ndarray  # float64 per order number, plus the maker's two quotes
+    ids: List[str]  # order number -> id; the last two are MAKER_BID and MAKER_ASK
+    users: List[str]
+
+    @property
+    def orders(self) -> int:
+        return len(self.price) - 2
+
+
+class TradeColumns(NamedTuple):
+    price: np.ndarray
+    amount: np.ndarray
+    ts: np.ndarray
+    buy: np.ndarray  # order numbers into EventColumns.ids
+    sell: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+
+def columns(events: Iterable[Dict]) -> EventColumns:
+    """Columnar form of order and cancel events (trade events are dropped)."""
+    events = [e for e in events if e.get("kind") in ("order", "cancel")]
+    numbers: Dict[str, int] = {}
+    ids: List[str] = []
+    users: List[str] = []
+    prices: List[float] = []
+    stamps: List[float] = []
+    kind = np.fromiter((e["kind"] == "cancel" for e in events), dtype=np.uint8, count=len(events))
+    order = np.empty(len(events), dtype=np.int64)
+    for i, e in enumerate(events):
+        if e["kind"] == "order":
+            order[i] = numbers[e["id"]] = len(ids)
+            ids.append(e["id"])
+            users.append(e.get("username", ""))
+            prices.append(e["price"])
+            stamps.append(e["ts"])
+        else:
+            order[i] = numbers.get(e["id"], -1)
+    side = np.fromiter((e.get("side") == "sell" for e in events), dtype=np.uint8, count=len(events))
+    amount = np.fromiter((e.get("amount", 0.0) for e in events), dtype=np.float64, count=len(events))
+    # the maker's two quotes get the last order numbers; their prices are set during replay
+    return EventColumns(kind, side, order, amount,
+                        np.array(prices + [0.0, 0.0], dtype=np.float64),
+                        np.array(stamps + [0.0, 0.0], dtype=np.float64),
+                        ids + [MAKER_BID, MAKER_ASK], users + [MAKER, MAKER])
+
+
+@functools.lru_cache(maxsize=None)
+def _kernel():
+    """ctypes handle of the compiled ogle_match.c, built once per source version; None without a compiler"""
+    with open(KERNEL_SOURCE, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    cache = os.path.join(os.path.dirname(KERNEL_SOURCE), "__pycache__")
+    library = os.path.join(cache, f"ogle_match-{digest}.so")
+    try:
+        if not os.path.exists(library):
+            os.makedirs(cache, exist_ok=True)
+            partial = f"{library}.{os.getpid()}"
+            subprocess.run([os.environ.get("CC", "cc"), "-O2", "-shared", "-fPIC", "-o", partial, KERNEL_SOURCE],
+                           check=True, capture_output=True)
+            os.replace(partial, library)
+        lib = ctypes.CDLL(library)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    f64 = np.ctypeslib.ndpointer(np.float64, flags="C_CONTIGUOUS")
+    i64 = np.ctypeslib.ndpointer(np.int64, flags="C_CONTIGUOUS")
+    u8 = np.ctypeslib.ndpointer(np.uint8, flags="C_CONTIGUOUS")
+    lib.ogle_replay.restype = ctypes.c_longlong
+    lib.ogle_replay.argtypes = [ctypes.c_longlong, u8, u8, i64, f64, ctypes.c_longlong, f64, f64,
+                                ctypes.c_double, ctypes.c_double, f64, f64, f64, i64, i64, ctypes.c_longlong]
+    return lib
+
+
+def has_fast_path() -> bool:
+    return _kernel() is not None
+
+
+def trade_columns(trades: List[Dict], cols: EventColumns) -> TradeColumns:
+    numbers = {order_id: k for k, order_id in enumerate(cols.ids)}
+    return TradeColumns(
+        price=np.array([t["price"] for t in trades], dtype=np.float64),
+        amount=np.array([t["amount"] for t in trades], dtype=np.float64),
+        ts=np.array([t["ts"] for t in trades], dtype=np.float64),
+        buy=np.array([numbers[t["buy_order"]] for t in trades], dtype=np.int64),
+        sell=np.array([numbers[t["sell_order"]] for t in trades], dtype=np.int64),
+    )
+
+
+def _events(cols: EventColumns) -> List[Dict]:
+    """Back to event dicts, for the pure Python fallback."""
+    events = []
+    for kind, side, order, amount in zip(cols.kind.tolist(), cols.side.tolist(), cols.order.tolist(),
+                                         cols.amount.tolist()):
+        if kind:
+            events.append({"kind": "cancel", "id": cols.ids[order] if order >= 0 else None})
+        else:
+            events.append({"kind": "order", "id": cols.ids[order], "username": cols.users[order],
+                           "side": "sell" if side else "buy", "price": float(cols.price[order]),
+                           "amount": amount, "ts": float(cols.ts[order])})
+    return events
+
+
+def replay_columns(cols: EventColumns, half_spread: float = 0.0, quote_size: float = 0.0) -> TradeColumns:
+    """replay() over columnar events through the compiled kernel; same trades, same order"""
+    lib = _kernel()
+    if lib is None:
+        return trade_columns(replay(_events(cols), half_spread, quote_size), cols)
+    cap = 3 * cols.orders + 2  # every trade fills an order; the maker adds two quotes per order
+    out = TradeColumns(np.empty(cap), np.empty(cap), np.empty(cap),
+                       np.empty(cap, dtype=np.int64), np.empty(cap, dtype=np.int64))
+    count = lib.ogle_replay(len(cols.kind), cols.kind, cols.side, cols.order, cols.amount, cols.orders,
+                            cols.price.copy(), cols.ts.copy(), half_spread, quote_size, *out, cap)
+    if count < 0:
+        raise MemoryError("ogle_match: replay failed")
+    return TradeColumns(*(column[:count] for column in out))
+
+
+def maker_result(trades: TradeColumns, maker_bid: int, half_spread: float, quote_size: float) -> Dict:
+    """PnL of the maker's fills in a replayed tape, marked to each trade price."""
+    bought = np.where(trades.buy == maker_bid, trades.amount, 0.0)
+    sold = np.where(trades.sell == maker_bid + 1, trades.amount, 0.0)
+    position = np.cumsum(bought - sold)
+    cash = np.cumsum((sold - bought) * trades.price)
+    equity = cash + position * trades.price
+    drawdown = np.maximum.accumulate(equity) - equity if len(equity) else equity
+    return {
+        "half_spread": half_spread,
+        "quote_size": quote_size,
+        "pnl": float(equity[-1]) if len(equity) else 0.0,
+        "max_drawdown": float(drawdown.max()) if len(drawdown) else 0.0,
+        "fills": int(np.count_nonzero(bought) + np.count_nonzero(sold)),
+        "volume": float(bought.sum() + sold.sum()),
+        "final_position": float(position[-1]) if len(position) else 0.0,
+    }
+
+
+def backtest_market_maker(cols: EventColumns, half_spread: float = 0.001, quote_size: float = 1.0) -> Dict:
+    """Replay the flow with the maker quoting in the book and score its fills."""
+    trades = replay_columns(cols, half_spread, quote_size)
+    return maker_result(trades, cols.orders, half_spread, quote_size)
+
+
+def synthetic_events(n: int, seed: int = 0, start_price: float = 2.5, volatility: float = 0.002,
+                     spread: float = 0.002, cancel_share: float = 0.3) -> List[Dict]:
+    """Order and cancel events around a log-normal mid price, in EventLog format.
+
+    Limit prices scatter around the mid by about spread, so roughly half of
+    the orders cross the book. A cancel names a random earlier order, which
+    may already be filled, as happens in recorded logs.
+    """
+    rng = np.random.default_rng(seed)
+    mid = start_price * np.exp(np.cumsum(rng.normal(0.0, volatility, n)))
+    buys = rng.random(n) < 0.5
+    offsets = rng.normal(0.0, spread, n)
+    amounts = rng.exponential(1.0, n) + 1e-3
+    cancels = rng.random(n) < cancel_share
+    picks = rng.random(n)
+    events: List[Dict] = []
+    placed: List[str] = []
+    for i in range(n):
+        if cancels[i] and placed:
+            events.append({"kind": "cancel", "ts": float(i), "id": placed[int(picks[i] * len(placed))]})
+            continue
+        side = "buy" if buys[i] else "sell"
+        price = float(mid[i] * (1.0 - offsets[i] if buys[i] else 1.0 + offsets[i]))
+        placed.append(f"s{i}")
+        events.append({"kind": "order", "id": placed[-1], "username": side, "side": side, "price": round(price, 6),
+                       "amount": round(float(amounts[i]), 6), "ts": float(i), "tif": "GTC", "expires_at": None})
+    return events
+
+
+_worker: Dict = {}
+
+
+def _init_worker(cols: EventColumns):
+    _worker["cols"] = cols
+
+
+def _sweep_one(params: Dict) -> Dict:
+    return backtest_market_maker(_worker["cols"], **params)
+
+
+def sweep(cols: EventColumns, grid: Dict[str, List[float]], processes: Optional[int] = None) -> List[Dict]:
+    """Evaluate every combination of grid parameters across a process pool."""
+    names = list(grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    # the flow goes to each worker once; order ids are not needed for scoring
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(cols._replace(ids=[], users=[]),)) as pool:
+        results = list(pool.map(_sweep_one, combos))
+    return sorted(results, key=lambda r: r["pnl"], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest market-making strategies on GCR/OGLEC flow")
+    parser.add_argument("--events", help="recorded event log (default: synthetic order flow)")
+    parser.add_argument("-n", type=int, default=2_000_000, help="synthetic order/cancel events")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    events = read_events(args.events) if args.events else synthetic_events(args.n)
+    start = time.perf_counter()
+    cols = columns(events)
+    print(f"columns: {len(cols.kind):,} events in {time.perf_counter() - start:.3f} s")
+    if not has_fast_path():
+        print("no C compiler: replay runs through match_books in pure Python")
+
+    start = time.perf_counter()
+    trades = replay_columns(cols)
+    elapsed = time.perf_counter() - start
+    print(f"replay: {len(cols.kind):,} events -> {len(trades):,} trades in {elapsed:.3f} s "
+          f"({len(cols.kind) / max(elapsed, 1e-9):,.0f} events/s, one core)")
+
+    start = time.perf_counter()
+    result = backtest_market_maker(cols)
+    elapsed = time.perf_counter() - start
+    print(f"market maker in the book: {len(cols.kind) / max(elapsed, 1e-9):,.0f} events/s")
+    print(f"  {result}")
+
+    grid = {"half_spread": [0.0005, 0.001, 0.002, 0.004], "quote_size": [0.5, 1.0, 2.0]}
+    start = time.perf_counter()
+    results = sweep(cols, grid, args.processes)
+    elapsed = time.perf_counter() - start
+    total = len(cols.kind) * len(results)
+    print(f"sweep: {len(results)} parameter sets in {elapsed:.3f} s ({total / max(elapsed, 1e-9):,.0f} events/s)")
+    for r in results[:3]:
+        print(f"  {r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Client library for the OGLE NODE API (ogle_node.py).
+
+OgleClient keeps a pooled keep-alive requests.Session; AsyncOgleClient does the
+same on top of httpx. Every mutating call carries an Idempotency-Key, so
+retries after timeouts or 5xx responses never place an order twice.
+
+Running this module benchmarks naive per-call connections against the pooled,
+batched and pipelined paths of a running node.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_URL = "http://localhost:8080"
+RETRY_STATUSES = (502, 503, 504)
+
+
+class OgleApiError(Exception):
+    def __init__(self, status: int, detail):
+        super().__init__(f"{status}: {detail}")
+        self.status = status
+        self.detail = detail
+
+
+def _order_payload(username: str, side: str, price: float, amount: float,
+                   tif: str = "GTC", expires_at: Optional[float] = None) -> Dict:
+    return {"username": username, "side": side, "price": price, "amount": amount,
+            "tif": tif, "expires_at": expires_at}
+
+
+class OgleClient:
+    def __init__(self, base_url: str = DEFAULT_URL, pool_size: int = 10, retries: int = 3,
+                 backoff: float = 0.1, timeout: float = 10.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=None,  # POSTs are safe to retry thanks to Idempotency-Key
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def _request(self, method: str, path: str, json=None, idempotent: bool = False):
+        headers = {"Idempotency-Key": uuid.uuid4().hex} if idempotent else None
+        r = self.session.request(method, self.base_url + path, json=json, headers=headers, timeout=self.timeout)
+        if r.status_code >= 400:
+            try:
+                detail = r.json().get("detail")
+            except ValueError:
+                detail = r.text
+            raise OgleApiError(r.status_code, detail)
+        return r.json()
+
+    def register(self, username: str) -> Dict:
+        return self._request("POST", "/register", {"username": username})
+
+    def mint_gcr(self, username: str, amount: float) -> Dict:
+        return self._request("POST", "/mint_gcr", {"username": username, "amount": amount}, idempotent=True)
+
+    def balances(self, username: str) -> Dict[str, float]:
+        return self._request("GET", f"/balances/{username}")
+
+    def place_order(self, username: str, side: str, price: float, amount: float,
+                    tif: str = "GTC", expires_at: Optional[float] = None) -> Dict:
+        payload = _order_payload(username, side, price, amount, tif, expires_at)
+        return self._request("POST", "/order", payload, idempotent=True)
+
+    def place_orders(self, orders: List[Dict], batch_size: int = 100) -> List[Dict]:
+        """Submit orders (dicts with place_order's arguments) in batched round trips."""
+        results: List[Dict] = []
+        for i in range(0, len(orders), batch_size):
+            chunk = [_order_payload(**o) for o in orders[i:i + batch_size]]
+            results.extend(self._request("POST", "/orders/batch", {"orders": chunk}, idempotent=True)["results"])
+        return results
+
+    def place_stop_order(self, username: str, side: str, stop_price: float, price: float,
+                         amount: float, order_type: str = "stop_limit") -> Dict:
+        payload = {"username": username, "side": side, "stop_price": stop_price, "price": price,
+                   "amount": amount, "order_type": order_type}
+        return self._request("POST", "/stop_order", payload, idempotent=True)
+
+    def open_orders(self, username: str) -> Dict:
+        return self._request("GET", f"/orders/{username}")
+
+    def cancel_all(self, username: str) -> Dict:
+        return self._request("DELETE", f"/orders/{username}")
+
+    def orderbook(self) -> Dict:
+        return self._request("GET", "/orderbook")
+
+
+class AsyncOgleClient:
+    def __init__(self, base_url: str = DEFAULT_URL, pool_size: int = 10, retries: int = 3,
+                 backoff: float = 0.1, timeout: float = 10.0):
+        import httpx
+
+        self._httpx = httpx
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def _request(self, method: str, path: str, json=None, idempotent: bool = False):
+        # The key is fixed before the first attempt so every retry replays the same request
+        headers = {"Idempotency-Key": uuid.uuid4().hex} if idempotent else None
+        attempt = 0
+        while True:
+            try:
+                r = await self.client.request(method, path, json=json, headers=headers)
+                if r.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    break
+            except self._httpx.TransportError:
+                if attempt >= self.retries:
+                    raise
+            await asyncio.sleep(self.backoff * (2 ** attempt))
+            attempt += 1
+        if r.status_code >= 400:
+            try:
+                detail = r.json().get("detail")
+            except ValueError:
+                detail = r.text
+            raise OgleApiError(r.status_code, detail)
+        return r.json()
+
+    async def register(self, username: str) -> Dict:
+        return await self._request("POST", "/register", {"username": username})
+
+    async def mint_gcr(self, username: str, amount: float) -> Dict:
+        return await self._request("POST", "/mint_gcr", {"username": username, "amount": amount}, idempotent=True)
+
+    async def balances(self, username: str) -> Dict[str, float]:
+        return await self._request("GET", f"/balances/{username}")
+
+    async def place_order(self, username: str, side: str, price: float, amount: float,
+                          tif: str = "GTC", expires_at: Optional[float] = None) -> Dict:
+        payload = _order_payload(username, side, price, amount, tif, expires_at)
+        return await self._request("POST", "/order", payload, idempotent=True)
+
+    async def place_orders(self, orders: List[Dict], batch_size: int = 100) -> List[Dict]:
+        """Submit orders in batches, keeping up to pool_size batches in flight at once."""
+        sem = asyncio.Semaphore(self.pool_size)
+
+        async def send(chunk):
+            async with sem:
+                return (await self._request("POST", "/orders/batch", {"orders": chunk}, idempotent=True))["results"]
+
+        chunks = [[_order_payload(**o) for o in orders[i:i + batch_size]]
+                  for i in range(0, len(orders), batch_size)]
+        results: List[Dict] = []
+        for part in await asyncio.gather(*(send(c) for c in chunks)):
+            results.extend(part)
+        return results
+
+    async def place_orders_pipelined(self, orders: List[Dict]) -> List[Dict]:
+        """Submit orders one per request, keeping up to pool_size requests in flight."""
+        sem = asyncio.Semaphore(self.pool_size)
+
+        async def send(o):
+            async with sem:
+                return await self.place_order(**o)
+
+        return list(await asyncio.gather(*(send(o) for o in orders)))
+
+    async def place_stop_order(self, username: str, side: str, stop_price: float, price: float,
+                               amount: float, order_type: str = "stop_limit") -> Dict:
+        payload = {"username": username, "side": side, "stop_price": stop_price, "price": price,
+                   "amount": amount, "order_type": order_type}
+        return await self._request("POST", "/stop_order", payload, idempotent=True)
+
+    async def open_orders(self, username: str) -> Dict:
+        return await self._request("GET", f"/orders/{username}")
+
+    async def cancel_all(self, username: str) -> Dict:
+        return await self._request("DELETE", f"/orders/{username}")
+
+    async def orderbook(self) -> Dict:
+        return await self._request("GET", "/orderbook")
+
+
+def benchmark(base_url: str = DEFAULT_URL, n: int = 500, username: str = "bench_client"):
+    """Compare per-call connections with pooled, batched and pipelined submission."""
+    # Asks far above the market rest without matching; cancel_all refunds them afterwards
+    orders = [{"username": username, "side": "sell", "price": 1e6 + i, "amount": 0.001} for i in range(n)]
+    with OgleClient(base_url) as client:
+        client.register(username)
+        client.mint_gcr(username, n * 0.001 * 5)
+
+        def run(label, fn):
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            print(f"{label:<28} {elapsed:8.3f} s  {n / elapsed:10.0f} orders/s  {elapsed / n * 1000:7.3f} ms/order")
+            client.cancel_all(username)
+
+        def naive():
+            for o in orders:
+                requests.post(base_url + "/order", json=_order_payload(**o), timeout=10).raise_for_status()
+
+        def pooled():
+            for o in orders:
+                client.place_order(**o)
+
+        async def pipelined():
+            async with AsyncOgleClient(base_url) as aclient:
+                await aclient.place_orders_pipelined(orders)
+
+        async def batched_async():
+            async with AsyncOgleClient(base_url) as aclient:
+                await aclient.place_orders(orders)
+
+        run("naive requests.post", naive)
+        run("pooled session", pooled)
+        run("pooled session, batched", lambda: client.place_orders(orders))
+        run("async pipelined", lambda: asyncio.run(pipelined()))
+        run("async batched", lambda: asyncio.run(batched_async()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the OGLE NODE client against a running node")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("-n", type=int, default=500)
+    args = parser.parse_args()
+    benchmark(args.url, args.n)
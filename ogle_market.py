@@ -1,6 +1,10 @@
+import bisect
+import heapq
 import json
 import os
 import time
+import uuid
+from collections import deque
 from dataclasses import dataclass, asdict
 from typing import Dict, List, Optional, Tuple
 
@@ -8,8 +12,13 @@ STORE_DIR = os.path.join(os.path.dirname(__file__), "data")
 BALANCES_FILE = os.path.join(STORE_DIR, "balances.json")
 ORDERS_FILE = os.path.join(STORE_DIR, "orders.json")
 USERS_FILE = os.path.join(STORE_DIR, "users.json")
+STOPS_FILE = os.path.join(STORE_DIR, "stops.json")
+EVENTS_FILE = os.path.join(STORE_DIR, "events.jsonl")
 
 SUPPORTED_TOKENS = ["GCR", "OGLEC"]  # Gravity Credits and OGLE Coins
+TIME_IN_FORCE = ["GTC", "GTT", "IOC", "FOK"]
+STOP_TYPES = ["stop", "stop_limit"]
+JOURNAL_MIN = 1000  # journal entries always tolerated before orders.json is rewritten
 
 
 def ensure_store():
@@ -18,6 +27,7 @@ def ensure_store():
         (BALANCES_FILE, {}),
         (ORDERS_FILE, {"bids": [], "asks": []}),
         (USERS_FILE, {"users": []}),
+        (STOPS_FILE, {"buy": [], "sell": []}),
     ]:
         if not os.path.exists(path):
             with open(path, "w", encoding="utf-8") as f:
@@ -87,62 +97,411 @@ class Order:
     price: float  # price in OGLEC per 1 GCR
     amount: float  # amount of GCR
     ts: float
+    tif: str = "GTC"  # GTC, GTT (until expires_at), IOC or FOK
+    expires_at: Optional[float] = None
+
+
+def _bid_key(o: Dict) -> Tuple[float, float]:
+    return (-o["price"], o["ts"])
+
+
+def _ask_key(o: Dict) -> Tuple[float, float]:
+    return (o["price"], o["ts"])
+
+
+class JsonJournal:
+    """Append-only JSONL log of changes on top of a JsonStore snapshot.
+
+    Recording a change appends one short line instead of rewriting the whole
+    snapshot. Entries carry a sequence number and the snapshot stores the
+    last one it includes, so a crash between writing a snapshot and emptying
+    the journal cannot apply an entry twice. A torn last line (a crash
+    mid-append) is cut off when the journal is replayed.
+    """
+
+    def __init__(self, path: str, seq: int = 0):
+        self.path = path
+        self.seq = seq
+        self.length = 0  # entries written since the last snapshot
+
+    def replay(self) -> List[Dict]:
+        """Entries newer than the snapshot, oldest first."""
+        if not os.path.exists(self.path):
+            return []
+        after = self.seq
+        entries: List[Dict] = []
+        good = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                good += len(line)
+                self.seq = max(self.seq, entry["seq"])
+                if entry["seq"] > after:
+                    entries.append(entry)
+        if good != os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+        self.length = len(entries)
+        return entries
+
+    def append(self, entries: List[Dict]):
+        if not entries:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            for e in entries:
+                self.seq += 1
+                f.write(json.dumps(dict(e, seq=self.seq), ensure_ascii=False))
+                f.write("\n")
+        self.length += len(entries)
+
+    def truncate(self):
+        with open(self.path, "w", encoding="utf-8"):
+            pass
+        self.length = 0
 
 
 class OrderBook:
+    """Bids and asks kept sorted in memory and persisted as snapshot + journal.
+
+    Every change (an order added or removed, a partial fill) is appended to
+    orders.json.journal, so a book operation writes only what it touched.
+    orders.json itself is rewritten once the journal outgrows the book, which
+    keeps the cost amortized O(1) per change and restart replay short.
+
+    GTT orders are tracked in a min-heap keyed by expires_at, so expiry pops
+    only the due entries instead of scanning the book. Orders that leave the
+    book first (filled or cancelled) leave stale heap entries behind; they
+    are counted, and the heap is rebuilt without them once they make up
+    more than half of it. Open orders are also indexed per user, sharing the
+    book's entry dicts.
+    """
+
     def __init__(self):
         self.store = JsonStore(ORDERS_FILE)
+        self._data = self.store.read()
+        self.journal = JsonJournal(self.store.path + ".journal", self._data.pop("seq", 0))
+        self._expiry_heap: List[Tuple[float, str, str, float, float]] = []
+        self._live_gtt: set = set()  # ids of resting GTT orders; other heap entries are stale
+        self._stale = 0
+        self._by_user: Dict[str, Dict[str, Dict]] = {}
+        for key in ("bids", "asks"):
+            for o in self._data[key]:
+                self._track(o)
+                if o.get("expires_at") is not None:
+                    self._expiry_heap.append(self._expiry_entry(o))
+        heapq.heapify(self._expiry_heap)
+        for entry in self.journal.replay():
+            self._apply(entry)
+        self._maybe_snapshot()
+
+    def _track(self, o: Dict):
+        self._by_user.setdefault(o["username"], {})[o["id"]] = o
+        if o.get("expires_at") is not None:
+            self._live_gtt.add(o["id"])
+
+    def _forget(self, o: Dict):
+        """Drop an order that left the book from the user index and the expiry heap."""
+        orders = self._by_user.get(o["username"])
+        if orders is not None:
+            orders.pop(o["id"], None)
+            if not orders:
+                del self._by_user[o["username"]]
+        if o["id"] in self._live_gtt:
+            self._live_gtt.discard(o["id"])
+            self._stale += 1
+            if self._stale > 64 and self._stale * 2 > len(self._expiry_heap):
+                self._expiry_heap = [e for e in self._expiry_heap if e[1] in self._live_gtt]
+                heapq.heapify(self._expiry_heap)
+                self._stale = 0
+
+    def open_orders(self, username: str) -> List[Dict]:
+        return list(self._by_user.get(username, {}).values())
+
+    @staticmethod
+    def _expiry_entry(o: Dict) -> Tuple[float, str, str, float, float]:
+        return (o["expires_at"], o["id"], o["side"], o["price"], o["ts"])
+
+    @staticmethod
+    def _position(o: Dict) -> Dict:
+        return {"side": o["side"], "id": o["id"], "price": o["price"], "ts": o["ts"]}
+
+    def _apply(self, entry: Dict):
+        """Redo one journal entry on the in-memory book."""
+        if entry["op"] == "add":
+            self._insert(entry["order"])
+        elif entry["op"] == "remove":
+            self._pop(entry["side"], entry["id"], entry["price"], entry["ts"])
+        elif entry["op"] == "amount":
+            i = self._locate(entry["side"], entry["id"], entry["price"], entry["ts"])
+            if i is not None:
+                self._side(entry["side"])[i]["amount"] = entry["amount"]
+
+    def _log(self, entries: List[Dict]):
+        self.journal.append(entries)
+        self._maybe_snapshot()
+
+    def _maybe_snapshot(self):
+        if self.journal.length > max(JOURNAL_MIN, len(self._data["bids"]) + len(self._data["asks"])):
+            self.store.write(dict(self._data, seq=self.journal.seq))
+            self.journal.truncate()
 
     def _read(self):
-        return self.store.read()
+        return self._data
 
-    def _write(self, data):
-        self.store.write(data)
+    def _side(self, side: str) -> List[Dict]:
+        return self._data["bids"] if side == "buy" else self._data["asks"]
 
     def list_books(self) -> Dict[str, List[Dict]]:
         return self._read()
 
+    def _insert(self, entry: Dict):
+        # bids desc by price, asks asc by price, ties by time
+        bisect.insort(self._side(entry["side"]), entry, key=_bid_key if entry["side"] == "buy" else _ask_key)
+        self._track(entry)
+        if entry.get("expires_at") is not None:
+            heapq.heappush(self._expiry_heap, self._expiry_entry(entry))
+
     def place(self, order: Order):
-        data = self._read()
-        book_key = "bids" if order.side == "buy" else "asks"
-        data[book_key].append(asdict(order))
-        # sort bids desc by price, asks asc by price
-        data["bids"] = sorted(data["bids"], key=lambda x: (-x["price"], x["ts"]))
-        data["asks"] = sorted(data["asks"], key=lambda x: (x["price"], x["ts"]))
-        self._write(data)
+        entry = asdict(order)
+        self._insert(entry)
+        self._log([{"op": "add", "order": entry}])
+
+    def _locate(self, side: str, order_id: str, price: float, ts: float) -> Optional[int]:
+        book = self._side(side)
+        key = _bid_key if side == "buy" else _ask_key
+        target = key({"price": price, "ts": ts})
+        i = bisect.bisect_left(book, target, key=key)
+        while i < len(book) and key(book[i]) == target:
+            if book[i]["id"] == order_id:
+                return i
+            i += 1
+        return None
+
+    def _pop(self, side: str, order_id: str, price: float, ts: float) -> Optional[Dict]:
+        i = self._locate(side, order_id, price, ts)
+        if i is None:
+            return None
+        removed = self._side(side).pop(i)
+        self._forget(removed)
+        return removed
+
+    def remove_many(self, orders: List[Dict]) -> List[Dict]:
+        removed = []
+        for o in orders:
+            entry = self._pop(o["side"], o["id"], o["price"], o["ts"])
+            if entry is not None:
+                removed.append(entry)
+        self._log([dict(self._position(o), op="remove") for o in removed])
+        return removed
+
+    def remove(self, order: Dict) -> Optional[Dict]:
+        """Remove a resting order by its book position. Returns the removed entry."""
+        removed = self.remove_many([order])
+        return removed[0] if removed else None
+
+    def fillable(self, side: str, price: float, amount: float) -> bool:
+        """Whether the opposite side holds enough crossing liquidity for amount."""
+        book = self._data["asks"] if side == "buy" else self._data["bids"]
+        available = 0.0
+        for o in book:
+            if (side == "buy" and o["price"] > price) or (side == "sell" and o["price"] < price):
+                break
+            available += o["amount"]
+            if available >= amount - 1e-9:
+                return True
+        return False
+
+    def next_expiry(self) -> Optional[float]:
+        """expires_at of the earliest resting GTT order."""
+        while self._expiry_heap and self._expiry_heap[0][1] not in self._live_gtt:
+            heapq.heappop(self._expiry_heap)
+            self._stale -= 1
+        return self._expiry_heap[0][0] if self._expiry_heap else None
+
+    def expire(self, now: Optional[float] = None) -> List[Dict]:
+        """Remove GTT orders whose expires_at has passed. Returns the removed entries."""
+        now = time.time() if now is None else now
+        due: List[Dict] = []
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, order_id, side, price, ts = heapq.heappop(self._expiry_heap)
+            if order_id not in self._live_gtt:
+                self._stale -= 1  # filled or cancelled before it expired
+                continue
+            self._live_gtt.discard(order_id)  # its heap entry is gone, so it is not stale
+            due.append({"side": side, "id": order_id, "price": price, "ts": ts})
+        return self.remove_many(due)
 
     def match(self) -> List[Dict]:
         """Simple price-time priority matching. Returns list of trades."""
         data = self._read()
-        bids = data["bids"]
-        asks = data["asks"]
-        trades: List[Dict] = []
-        i = 0
-        while bids and asks and bids[0]["price"] >= asks[0]["price"]:
-            bid = bids[0]
-            ask = asks[0]
-            trade_price = (bid["price"] + ask["price"]) / 2.0
-            trade_amount = min(bid["amount"], ask["amount"])
-            trades.append({
-                "price": trade_price,
-                "amount": trade_amount,
-                "buy_user": bid["username"],
-                "sell_user": ask["username"],
-                "ts": time.time(),
-            })
-            bid["amount"] -= trade_amount
-            ask["amount"] -= trade_amount
-            if bid["amount"] <= 1e-9:
-                bids.pop(0)
-            if ask["amount"] <= 1e-9:
-                asks.pop(0)
-            # re-sort not needed as top elements only reduced
-        data["bids"] = bids
-        data["asks"] = asks
-        self._write(data)
+        filled: List[Dict] = []
+
+        def on_filled(o: Dict):
+            self._forget(o)
+            filled.append(o)
+
+        trades = match_books(data["bids"], data["asks"], on_filled=on_filled)
+        if trades:
+            touched = {t["buy_order"] for t in trades} | {t["sell_order"] for t in trades}
+            entries = [dict(self._position(o), op="remove") for o in filled]
+            # only the orders left at the top of the book can be partially filled
+            for book in (data["bids"], data["asks"]):
+                if book and book[0]["id"] in touched:
+                    entries.append(dict(self._position(book[0]), op="amount", amount=book[0]["amount"]))
+            self._log(entries)
         return trades
 
 
+def match_books(bids: List[Dict], asks: List[Dict], ts: Optional[float] = None, on_filled=None) -> List[Dict]:
+    """Cross sorted bids and asks in place with price-time priority.
+
+    Shared by OrderBook.match and the backtester so replays fill exactly as
+    the node does. on_filled is called with every order that leaves the book.
+    """
+    trades: List[Dict] = []
+    while bids and asks and bids[0]["price"] >= asks[0]["price"]:
+        bid = bids[0]
+        ask = asks[0]
+        trade_price = (bid["price"] + ask["price"]) / 2.0
+        trade_amount = min(bid["amount"], ask["amount"])
+        trades.append({
+            "price": trade_price,
+            "amount": trade_amount,
+            "buy_user": bid["username"],
+            "sell_user": ask["username"],
+            "buy_order": bid["id"],
+            "sell_order": ask["id"],
+            "ts": time.time() if ts is None else ts,
+        })
+        bid["amount"] -= trade_amount
+        ask["amount"] -= trade_amount
+        if bid["amount"] <= 1e-9:
+            filled = bids.pop(0)
+            if on_filled is not None:
+                on_filled(filled)
+        if ask["amount"] <= 1e-9:
+            filled = asks.pop(0)
+            if on_filled is not None:
+                on_filled(filled)
+        # re-sort not needed as top elements only reduced
+    return trades
+
+
+class EventLog:
+    """Append-only JSONL record of order, cancel and trade events for replay."""
+
+    def __init__(self, path: str = EVENTS_FILE):
+        self.path = path
+        ensure_store()
+
+    def append(self, events: List[Dict]):
+        if not events:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            for e in events:
+                f.write(json.dumps(e, ensure_ascii=False))
+                f.write("\n")
+
+
+@dataclass
+class StopOrder:
+    id: str
+    username: str
+    side: str
+    stop_price: float  # last trade price that activates the order
+    price: float  # limit price once active; worst accepted price for "stop"
+    amount: float
+    ts: float
+    order_type: str = "stop_limit"  # "stop" activates as IOC, "stop_limit" as GTC
+
+
+def _buy_stop_key(o: Dict) -> Tuple[float, float]:
+    return (-o["stop_price"], o["ts"])
+
+
+def _sell_stop_key(o: Dict) -> Tuple[float, float]:
+    return (o["stop_price"], o["ts"])
+
+
+class TriggerBook:
+    """Resting stop orders indexed by stop price.
+
+    Buy stops fire once the last trade price rises to their stop price and
+    are kept in descending order; sell stops fire once it falls to theirs and
+    are kept ascending. Either way the crossed stops form a suffix of the
+    list, so a trade costs O(log n) plus the number of stops it fires.
+    """
+
+    def __init__(self):
+        self.store = JsonStore(STOPS_FILE)
+        self._data = self.store.read()
+        self._by_user: Dict[str, Dict[str, Dict]] = {}
+        for side in ("buy", "sell"):
+            for o in self._data[side]:
+                self._by_user.setdefault(o["username"], {})[o["id"]] = o
+
+    def _unindex(self, o: Dict):
+        stops = self._by_user.get(o["username"])
+        if stops is not None:
+            stops.pop(o["id"], None)
+            if not stops:
+                del self._by_user[o["username"]]
+
+    def list_stops(self) -> Dict[str, List[Dict]]:
+        return self._data
+
+    def open_stops(self, username: str) -> List[Dict]:
+        return list(self._by_user.get(username, {}).values())
+
+    def remove_many(self, stops: List[Dict]) -> List[Dict]:
+        removed = []
+        for o in stops:
+            book = self._data[o["side"]]
+            key = _buy_stop_key if o["side"] == "buy" else _sell_stop_key
+            target = key(o)
+            i = bisect.bisect_left(book, target, key=key)
+            while i < len(book) and key(book[i]) == target:
+                if book[i]["id"] == o["id"]:
+                    removed.append(book.pop(i))
+                    self._unindex(o)
+                    break
+                i += 1
+        if removed:
+            self.store.write(self._data)
+        return removed
+
+    def add(self, stop: StopOrder):
+        entry = asdict(stop)
+        if stop.side == "buy":
+            bisect.insort(self._data["buy"], entry, key=_buy_stop_key)
+        else:
+            bisect.insort(self._data["sell"], entry, key=_sell_stop_key)
+        self._by_user.setdefault(entry["username"], {})[entry["id"]] = entry
+        self.store.write(self._data)
+
+    def triggered(self, last_price: float) -> List[Dict]:
+        """Pop every stop crossed by last_price, oldest first."""
+        buys = self._data["buy"]
+        sells = self._data["sell"]
+        i = bisect.bisect_left(buys, (-last_price, float("-inf")), key=_buy_stop_key)
+        j = bisect.bisect_left(sells, (last_price, float("-inf")), key=_sell_stop_key)
+        fired = buys[i:] + sells[j:]
+        if not fired:
+            return []
+        del buys[i:]
+        del sells[j:]
+        for o in fired:
+            self._unindex(o)
+        self.store.write(self._data)
+        fired.sort(key=lambda o: o["ts"])
+        return fired
+
+
 class Users:
     def __init__(self):
         self.store = JsonStore(USERS_FILE)
@@ -165,7 +524,10 @@ class Market:
         ensure_store()
         self.ledger = BalanceLedger()
         self.orderbook = OrderBook()
+        self.triggers = TriggerBook()
         self.users = Users()
+        self.events = EventLog()
+        self.last_price: Optional[float] = None
 
     def register(self, username: str) -> Dict:
         created = self.users.register(username)
@@ -176,25 +538,102 @@ class Market:
         self.ledger.credit(username, "GCR", amount)
         return {"ok": True, "username": username, "delta": amount, "balance": self.ledger.get_balances(username)}
 
-    def place_order(self, username: str, side: str, price: float, amount: float) -> Dict:
+    def _refund(self, order: Dict):
+        """Return the reservation still held by a resting order's unfilled amount."""
+        if order["side"] == "buy":
+            self.ledger.credit(order["username"], "OGLEC", order["price"] * order["amount"])
+        else:
+            self.ledger.credit(order["username"], "GCR", order["amount"])
+
+    def expire_orders(self, now: Optional[float] = None) -> List[Dict]:
+        expired = self.orderbook.expire(now)
+        for o in expired:
+            self._refund(o)
+        self._record_cancels(expired)
+        return expired
+
+    def _record_cancels(self, orders: List[Dict]):
+        now = time.time()
+        self.events.append([{"kind": "cancel", "ts": now, "id": o["id"]} for o in orders])
+
+    def place_order(
+        self,
+        username: str,
+        side: str,
+        price: float,
+        amount: float,
+        tif: str = "GTC",
+        expires_at: Optional[float] = None,
+    ) -> Dict:
         if side not in ("buy", "sell"):
             raise ValueError("side must be 'buy' or 'sell'")
-        # Reserve funds
-        if side == "buy":
-            cost = price * amount
-            self.ledger.debit(username, "OGLEC", cost)
-        else:
-            self.ledger.debit(username, "GCR", amount)
+        if tif not in TIME_IN_FORCE:
+            raise ValueError(f"tif must be one of {', '.join(TIME_IN_FORCE)}")
+        now = time.time()
+        if tif == "GTT":
+            if expires_at is None or expires_at <= now:
+                raise ValueError("GTT orders need expires_at in the future")
+        elif expires_at is not None:
+            raise ValueError("expires_at is only valid for GTT orders")
+        self.expire_orders(now)
         order = Order(
-            id=f"ord_{int(time.time()*1000)}",
+            id=f"ord_{int(now*1000)}_{uuid.uuid4().hex[:6]}",
             username=username,
             side=side,
             price=float(price),
             amount=float(amount),
-            ts=time.time(),
+            ts=now,
+            tif=tif,
+            expires_at=expires_at,
         )
+        if tif == "FOK" and not self.orderbook.fillable(side, order.price, order.amount):
+            return {"ok": True, "order": asdict(order), "trades": [], "status": "killed"}
+        self._reserve(username, side, price, amount)
+        result = self._execute(order)
+        result["triggered"] = self._run_triggers()
+        return result
+
+    def place_stop_order(
+        self,
+        username: str,
+        side: str,
+        stop_price: float,
+        price: float,
+        amount: float,
+        order_type: str = "stop_limit",
+    ) -> Dict:
+        if side not in ("buy", "sell"):
+            raise ValueError("side must be 'buy' or 'sell'")
+        if order_type not in STOP_TYPES:
+            raise ValueError(f"order_type must be one of {', '.join(STOP_TYPES)}")
+        now = time.time()
+        stop = StopOrder(
+            id=f"stp_{int(now*1000)}_{uuid.uuid4().hex[:6]}",
+            username=username,
+            side=side,
+            stop_price=float(stop_price),
+            price=float(price),
+            amount=float(amount),
+            ts=now,
+            order_type=order_type,
+        )
+        # Funds are reserved up front so activation can never fail on balance
+        self._reserve(username, side, price, amount)
+        self.triggers.add(stop)
+        return {"ok": True, "stop": asdict(stop), "triggered": self._run_triggers()}
+
+    def _reserve(self, username: str, side: str, price: float, amount: float):
+        if side == "buy":
+            cost = price * amount
+            self.ledger.debit(username, "OGLEC", cost)
+        else:
+            self.ledger.debit(username, "GCR", amount)
+
+    def _execute(self, order: Order) -> Dict:
+        """Rest an already-funded order, match and settle it."""
         self.orderbook.place(order)
         trades = self.orderbook.match()
+        self.events.append([dict(asdict(order), kind="order")] + [dict(t, kind="trade") for t in trades])
         # Settle trades
         for t in trades:
             amt = t["amount"]
@@ -203,10 +642,63 @@ class Market:
             self.ledger.credit(t["buy_user"], "GCR", amt)
             # Seller receives OGLEC
             self.ledger.credit(t["sell_user"], "OGLEC", amt * price)
-        return {"ok": True, "order": asdict(order), "trades": trades}
+        if trades:
+            self.last_price = trades[-1]["price"]
+        own_key = "buy_order" if order.side == "buy" else "sell_order"
+        filled = sum(t["amount"] for t in trades if t[own_key] == order.id)
+        status = "filled" if filled >= order.amount - 1e-9 else "resting"
+        if status == "resting" and order.tif in ("IOC", "FOK"):
+            rest = self.orderbook.remove(asdict(order))
+            if rest is not None:
+                self._refund(rest)
+                self._record_cancels([rest])
+            status = "cancelled"
+        return {"ok": True, "order": asdict(order), "trades": trades, "status": status}
+
+    def _run_triggers(self) -> List[Dict]:
+        """Activate stops crossed by the last trade price, following cascades."""
+        if self.last_price is None:
+            return []
+        activated: List[Dict] = []
+        pending = deque(self.triggers.triggered(self.last_price))
+        while pending:
+            stop = pending.popleft()
+            order = Order(
+                id=stop["id"],
+                username=stop["username"],
+                side=stop["side"],
+                price=stop["price"],
+                amount=stop["amount"],
+                ts=time.time(),
+                tif="IOC" if stop["order_type"] == "stop" else "GTC",
+            )
+            result = self._execute(order)
+            activated.append(result)
+            if result["trades"]:
+                pending.extend(self.triggers.triggered(self.last_price))
+        return activated
+
+    def open_orders(self, username: str) -> Dict:
+        self.expire_orders()
+        return {
+            "username": username,
+            "orders": self.orderbook.open_orders(username),
+            "stops": self.triggers.open_stops(username),
+        }
+
+    def cancel_all(self, username: str) -> Dict:
+        """Cancel every resting order and stop of a user and refund reservations."""
+        self.expire_orders()
+        orders = self.orderbook.remove_many(self.orderbook.open_orders(username))
+        stops = self.triggers.remove_many(self.triggers.open_stops(username))
+        for o in orders + stops:
+            self._refund(o)
+        self._record_cancels(orders + stops)
+        return {"ok": True, "username": username, "cancelled": [o["id"] for o in orders + stops]}
 
     def balances(self, username: str) -> Dict[str, float]:
         return self.ledger.get_balances(username)
 
     def orderbook_snapshot(self) -> Dict:
+        self.expire_orders()
         return self.orderbook.list_books()
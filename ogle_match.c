@@ -0,0 +1,174 @@
+/*
+ * Compiled replay kernel for ogle_backtest: the crossing loop of
+ * ogle_market.match_books over a whole columnar event log.
+ *
+ * Each side is an array of order numbers sorted worst-first, so the best
+ * order sits at the end: fills pop from the end, and new orders, which
+ * mostly land near the touch, move only a few entries. Price-time priority,
+ * the (bid + ask) / 2 trade price, and the 1e-9 fill threshold match
+ * match_books exactly, so the trades equal those of ogle_backtest.replay.
+ *
+ * Optional market maker: when quote_size > 0, before every order event the
+ * maker cancels its quotes and re-quotes last_trade * (1 -/+ half_spread)
+ * for quote_size. The quotes are ordinary orders numbered n_ids (bid) and
+ * n_ids + 1 (ask), so they queue behind resting orders at the same price.
+ */
+#include <stdlib.h>
+#include <string.h>
+
+#define FILLED 1e-9
+
+typedef struct {
+    long long *ids;
+    long long size;
+    int bid;
+} Side;
+
+static const double *g_price;
+static const double *g_ts;
+
+/* order a ranks ahead of b: bids by higher price, asks by lower, then earlier */
+static int ahead(const Side *s, long long a, long long b) {
+    double pa = g_price[a], pb = g_price[b];
+    if (pa != pb)
+        return s->bid ? pa > pb : pa < pb;
+    return g_ts[a] < g_ts[b];
+}
+
+/* first position whose order x does not rank ahead of: the run of its key starts here */
+static long long lower(const Side *s, long long x) {
+    long long lo = 0, hi = s->size;
+    while (lo < hi) {
+        long long mid = (lo + hi) / 2;
+        if (ahead(s, x, s->ids[mid]))
+            lo = mid + 1;
+        else
+            hi = mid;
+    }
+    return lo;
+}
+
+static void insert(Side *s, long long x) {
+    /* in front of (i.e. behind in priority) every order with the same key, like bisect.insort */
+    long long i = lower(s, x);
+    memmove(s->ids + i + 1, s->ids + i, (size_t)(s->size - i) * sizeof(long long));
+    s->ids[i] = x;
+    s->size++;
+}
+
+static void erase(Side *s, long long x) {
+    long long i = lower(s, x);
+    while (i < s->size && s->ids[i] != x)
+        i++;
+    if (i == s->size)
+        return;
+    memmove(s->ids + i, s->ids + i + 1, (size_t)(s->size - i - 1) * sizeof(long long));
+    s->size--;
+}
+
+typedef struct {
+    double *price, *amount, *ts;
+    long long *buy, *sell;
+    long long count, cap;
+} Tape;
+
+static int match(Side *bids, Side *asks, double *amount, unsigned char *alive, double ts, Tape *t) {
+    while (bids->size && asks->size) {
+        long long b = bids->ids[bids->size - 1], a = asks->ids[asks->size - 1];
+        if (g_price[b] < g_price[a])
+            break;
+        if (t->count == t->cap)
+            return -1;
+        double traded = amount[b] < amount[a] ? amount[b] : amount[a];
+        double price = (g_price[b] + g_price[a]) / 2.0;
+        t->price[t->count] = price;
+        t->amount[t->count] = traded;
+        t->ts[t->count] = ts;
+        t->buy[t->count] = b;
+        t->sell[t->count] = a;
+        t->count++;
+        amount[b] -= traded;
+        amount[a] -= traded;
+        if (amount[b] <= FILLED) {
+            bids->size--;
+            alive[b] = 0;
+        }
+        if (amount[a] <= FILLED) {
+            asks->size--;
+            alive[a] = 0;
+        }
+    }
+    return 0;
+}
+
+/*
+ * kind: 0 order, 1 cancel; side: 0 buy, 1 sell; oid: order number (for a
+ * cancel, of the order it names, or -1). price/ts must hold n_ids + 2
+ * entries indexed by order number; the last two are the maker's quotes.
+ * Returns the number of trades, or -1 if the trade arrays (cap) overflow.
+ */
+long long ogle_replay(long long n, const unsigned char *kind, const unsigned char *side, const long long *oid,
+                      const double *amount_in, long long n_ids, double *price, double *ts,
+                      double half_spread, double quote_size,
+                      double *t_price, double *t_amount, double *t_ts, long long *t_buy, long long *t_sell,
+                      long long cap) {
+    long long total = n_ids + 2, maker_bid = n_ids, maker_ask = n_ids + 1;
+    double *amount = malloc((size_t)total * sizeof(double));
+    unsigned char *alive = calloc((size_t)total, 1);
+    unsigned char *sides = calloc((size_t)total, 1);
+    Side bids = {malloc((size_t)total * sizeof(long long)), 0, 1};
+    Side asks = {malloc((size_t)total * sizeof(long long)), 0, 0};
+    Tape t = {t_price, t_amount, t_ts, t_buy, t_sell, 0, cap};
+    long long result = 0;
+    g_price = price;
+    g_ts = ts;
+    if (!amount || !alive || !sides || !bids.ids || !asks.ids) {
+        result = -2;
+        goto done;
+    }
+    sides[maker_ask] = 1;
+    for (long long e = 0; e < n; e++) {
+        long long x = oid[e];
+        if (kind[e] == 1) {
+            if (x >= 0 && alive[x]) {
+                erase(sides[x] ? &asks : &bids, x);
+                alive[x] = 0;
+            }
+            continue;
+        }
+        if (quote_size > 0 && t.count) {
+            double last = t.price[t.count - 1];
+            for (int q = 0; q < 2; q++) {
+                long long m = q ? maker_ask : maker_bid;
+                Side *book = q ? &asks : &bids;
+                if (alive[m])
+                    erase(book, m);
+                price[m] = last * (q ? 1.0 + half_spread : 1.0 - half_spread);
+                ts[m] = ts[x];
+                amount[m] = quote_size;
+                alive[m] = 1;
+                insert(book, m);
+                if (match(&bids, &asks, amount, alive, ts[x], &t) < 0) {
+                    result = -1;
+                    goto done;
+                }
+            }
+        }
+        sides[x] = side[e];
+        amount[x] = amount_in[e];
+        alive[x] = 1;
+        insert(side[e] ? &asks : &bids, x);
+        if (match(&bids, &asks, amount, alive, ts[x], &t) < 0) {
+            result = -1;
+            goto done;
+        }
+    }
+    result = t.count;
+done:
+    free(amount);
+    free(alive);
+    free(sides);
+    free(bids.ids);
+    free(asks.ids);
+    return result;
+}
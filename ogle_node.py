@@ -1,12 +1,82 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from fastapi import FastAPI, HTTPException
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 import uvicorn
 from ogle_market import Market
 
-app = FastAPI(title="OGLE NODE", version="0.1.0")
 market = Market()
+# Requests are served from a thread pool; the market itself is not thread-safe
+market_lock = threading.Lock()
+# GTT orders are refunded by a sweep at most this long after expires_at, even if no request arrives
+EXPIRY_SWEEP_SECONDS = 1.0
+
+
+def _sweep_expired(stop: threading.Event):
+    """Expire GTT orders as they come due until stop is set."""
+    while True:
+        with market_lock:
+            market.expire_orders()
+            due = market.orderbook.next_expiry()
+        wait = EXPIRY_SWEEP_SECONDS if due is None else min(EXPIRY_SWEEP_SECONDS, max(0.0, due - time.time()))
+        if stop.wait(wait):
+            return
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    stop = threading.Event()
+    sweeper = threading.Thread(target=_sweep_expired, args=(stop,), name="gtt-expiry", daemon=True)
+    sweeper.start()
+    yield
+    stop.set()
+    sweeper.join()
+
+
+app = FastAPI(title="OGLE NODE", version="0.1.0", lifespan=lifespan)
+
+IDEMPOTENCY_CACHE_SIZE = 10000
+# (endpoint, Idempotency-Key) -> (request body hash, response)
+_idempotent_responses: "OrderedDict[Tuple[str, str], Tuple[str, Dict]]" = OrderedDict()
+
+
+def _body_hash(req: BaseModel) -> str:
+    return hashlib.sha256(json.dumps(jsonable_encoder(req), sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _idempotent(key: Optional[str], endpoint: str, req: BaseModel, fn):
+    """Replay the stored response for a repeated Idempotency-Key instead of re-executing.
+
+    Keys are scoped to the endpoint, and a key reused with a different
+    request body is rejected with 422 instead of replaying an unrelated
+    response.
+    """
+    with market_lock:
+        cache_key = (endpoint, key)
+        body = _body_hash(req) if key is not None else None
+        if key is not None and cache_key in _idempotent_responses:
+            stored_body, result = _idempotent_responses[cache_key]
+            if stored_body != body:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+            _idempotent_responses.move_to_end(cache_key)
+            return result
+        try:
+            result = fn()
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if key is not None:
+            _idempotent_responses[cache_key] = (body, result)
+            if len(_idempotent_responses) > IDEMPOTENCY_CACHE_SIZE:
+                _idempotent_responses.popitem(last=False)
+        return result
 
 class RegisterReq(BaseModel):
     username: str
@@ -20,29 +90,80 @@ class OrderReq(BaseModel):
     side: str
     price: float
     amount: float
+    tif: str = "GTC"  # GTC, GTT, IOC, FOK
+    expires_at: Optional[float] = None  # unix time, GTT only
+
+class BatchOrderReq(BaseModel):
+    orders: List[OrderReq]
+
+class StopOrderReq(BaseModel):
+    username: str
+    side: str
+    stop_price: float
+    price: float
+    amount: float
+    order_type: str = "stop_limit"  # stop, stop_limit
 
 @app.post("/register")
 def register(req: RegisterReq):
-    return market.register(req.username)
+    with market_lock:
+        return market.register(req.username)
 
 @app.get("/balances/{username}")
 def balances(username: str):
-    return market.balances(username)
+    with market_lock:
+        return market.balances(username)
 
 @app.post("/mint_gcr")
-def mint_gcr(req: MintReq):
-    return market.mint_gcr(req.username, req.amount)
+def mint_gcr(req: MintReq, idempotency_key: Optional[str] = Header(None)):
+    return _idempotent(idempotency_key, "/mint_gcr", req, lambda: market.mint_gcr(req.username, req.amount))
 
 @app.post("/order")
-def place_order(req: OrderReq):
-    try:
-        return market.place_order(req.username, req.side, req.price, req.amount)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+def place_order(req: OrderReq, idempotency_key: Optional[str] = Header(None)):
+    return _idempotent(
+        idempotency_key, "/order", req,
+        lambda: market.place_order(req.username, req.side, req.price, req.amount, req.tif, req.expires_at),
+    )
+
+@app.post("/orders/batch")
+def place_orders(req: BatchOrderReq, idempotency_key: Optional[str] = Header(None)):
+    """Place several orders in one round trip; each order succeeds or fails on its own."""
+    def run():
+        results = []
+        for o in req.orders:
+            try:
+                results.append(market.place_order(o.username, o.side, o.price, o.amount, o.tif, o.expires_at))
+            except ValueError as e:
+                results.append({"ok": False, "error": str(e)})
+        return {"results": results}
+    return _idempotent(idempotency_key, "/orders/batch", req, run)
+
+@app.post("/stop_order")
+def place_stop_order(req: StopOrderReq, idempotency_key: Optional[str] = Header(None)):
+    return _idempotent(
+        idempotency_key, "/stop_order", req,
+        lambda: market.place_stop_order(req.username, req.side, req.stop_price, req.price, req.amount, req.order_type),
+    )
+
+@app.get("/stops")
+def stops():
+    with market_lock:
+        return market.triggers.list_stops()
+
+@app.get("/orders/{username}")
+def open_orders(username: str):
+    with market_lock:
+        return market.open_orders(username)
+
+@app.delete("/orders/{username}")
+def cancel_all(username: str):
+    with market_lock:
+        return market.cancel_all(username)
 
 @app.get("/orderbook")
 def orderbook():
-    return market.orderbook_snapshot()
+    with market_lock:
+        return market.orderbook_snapshot()
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8080)
@@ -9,13 +9,14 @@ import os
 import time
 import random
 from cosmic_demiurge import CosmicDemiurge, CelestialType
+from demiurge_store import DemiurgeStore
 
 
 class RussianSoulInterface:
     """Интерфейс с широтой русской души"""
     
     def __init__(self):
-        self.demiurge = CosmicDemiurge()
+        self.demiurge = CosmicDemiurge(store=DemiurgeStore())
         self.current_customer = None
         self.is_robot_customer = False
         
@@ -60,7 +61,8 @@ class RussianSoulInterface:
         print("7. 🤖 Проверка на робота (скидка 15%!)")
         print("8. ⚖️ Статистика добычи гравитации")
         print("9. 👥 Список покупателей и продаж")
-        print("10. 🚪 Откланяться и уйти")
+        print("10. 🔭 Поиск по небу")
+        print("11. 🚪 Откланяться и уйти")
         print("═" * 50)
         
     def display_catalog_beautifully(self, bodies=None):
@@ -105,6 +107,62 @@ class RussianSoulInterface:
         except ValueError:
             print("❌ Цифру надо вводить, а не буквы!")
     
+    def search_sky(self):
+        """Поиск по небу: вокруг точки, соседи своего владения или слой расстояний"""
+        print("\n🔭 Как искать на небе?")
+        print("═" * 40)
+        print("1. Вокруг точки RA/Dec")
+        print("2. Соседи моего владения")
+        print("3. По расстоянию от Земли")
+        
+        try:
+            choice = input("\nВведите номер: ")
+            if choice == '1':
+                ra = float(input("Прямое восхождение, °: "))
+                dec = float(input("Склонение, °: "))
+                radius = float(input("Радиус поиска, °: "))
+                found = self.demiurge.sky_cone(ra, dec, radius, limit=10, available_only=True)
+            elif choice == '2':
+                if not self.current_customer:
+                    print("😔 Сначала представьтесь, а потом спрашивайте о владениях...")
+                    return
+                my_bodies = self.demiurge.bodies_of(self.current_customer)
+                if not my_bodies:
+                    print(f"😔 У {self.current_customer} пока нет космических владений...")
+                    return
+                home = my_bodies[-1]
+                print(f"✨ Соседи {home.name}:")
+                found = self.demiurge.sky_nearest(home.id, 10, available_only=True)
+            elif choice == '3':
+                min_ly = float(input("От, световых лет: "))
+                max_ly = float(input("До, световых лет: "))
+                found = [(body, None) for body in self.demiurge.sky_distance(min_ly, max_ly, limit=10,
+                                                                               available_only=True)]
+            else:
+                print("❌ Нет такого номера, батюшка!")
+                return
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+        
+        if not found:
+            print("\n😔 В той стороне неба свободных тел не видно...")
+            return
+        for body, separation in found:
+            where = f"{separation:.2f}° отсюда" if separation is not None else f"{body.coordinates[2]:,.2f} св. лет"
+            print(f"🌟 {body.name} ({body.type.value}) - {where}, {body.price_universe_coins:,.0f} монет")
+    
+    def find_body(self, body_choice: str):
+        """Лучшее совпадение по имени; остальные похожие - подсказкой"""
+        found = self.demiurge.search_bodies(body_choice, limit=4)
+        if not found:
+            return None
+        if len(found) > 1:
+            print("🔎 Похожие имена: " + ", ".join(body.name for body, _ in found[1:]))
+        best = found[0][0]
+        print(f"✨ Выбрано: {best.name}")
+        return best
+    
     def reserve_body(self):
         """Резервирование космического тела"""
         if not self.current_customer:
@@ -117,12 +175,7 @@ class RussianSoulInterface:
         
         body_choice = input("\nКакое тело желаете зарезервировать? (введите название): ")
         
-        # Ищем тело по названию
-        found_body = None
-        for body in self.demiurge.catalog.values():
-            if body_choice.lower() in body.name.lower():
-                found_body = body
-                break
+        found_body = self.find_body(body_choice)
         
         if not found_body:
             print("❌ Не найдено такого тела в каталоге...")
@@ -138,7 +191,11 @@ class RussianSoulInterface:
         except ValueError:
             hours = 24
         
-        success = self.demiurge.reserve_celestial_body(found_body.id, self.current_customer, hours)
+        try:
+            success = self.demiurge.reserve_celestial_body(found_body.id, self.current_customer, hours)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
         
         if success:
             print(f"✅ Ура! '{found_body.name}' зарезервировано на {hours} часов!")
@@ -158,12 +215,7 @@ class RussianSoulInterface:
         
         body_choice = input("\nКакое тело покупаем? (введите название): ")
         
-        # Ищем тело по названию
-        found_body = None
-        for body in self.demiurge.catalog.values():
-            if body_choice.lower() in body.name.lower():
-                found_body = body
-                break
+        found_body = self.find_body(body_choice)
         
         if not found_body:
             print("❌ Не найдено такого тела в каталоге...")
@@ -204,13 +256,15 @@ class RussianSoulInterface:
             print("😔 Сначала представьтесь, а потом спрашивайте о владениях...")
             return
         
-        my_bodies = [body for body in self.demiurge.catalog.values() 
-                    if body.owner == self.current_customer]
+        my_bodies = self.demiurge.bodies_of(self.current_customer)
         
         if not my_bodies:
             print(f"😔 У {self.current_customer} пока нет космических владений...")
             return
         
+        # Открытия проверяем один раз на все владения
+        discovered = {body.id for body in self.demiurge.discovered_today(self.current_customer)}
+        
         print(f"\n🏰 Владения {self.current_customer}:")
         print("═" * 50)
         
@@ -219,11 +273,8 @@ class RussianSoulInterface:
             print(f"   {body.type.value}")
             print(f"   Шанс открытия сегодня: {body.discovery_chance_today*100:.1f}%")
             
-            # Проверяем уведомления об открытиях
-            alerts = self.demiurge.check_discovery_alerts()
-            for alert in alerts:
-                if body.name in alert:
-                    print(f"   🎉 {alert}")
+            if body.id in discovered:
+                print(f"   {self.demiurge.discovery_alert(body)}")
     
     def robot_check(self):
         """Проверка на принадлежность к роботам"""
@@ -272,12 +323,21 @@ class RussianSoulInterface:
         
         print(f"💎 Резервы гравитации: {self.demiurge.gravity_reserves:.1f} Г-единиц")
         print(f"⚖️ Доля демиурга: {self.demiurge.gravity_mining_rate*100:.0f}% от добытой гравитации")
-        print(f"📱 Собрано данных нутации: {len(self.demiurge.collected_nutation_data)} сеансов")
-        
-        if self.demiurge.collected_nutation_data:
+        samples = self.demiurge.collected_nutation_data
+        print(f"📱 Собрано данных нутации: {samples.total} сеансов")
+        if samples:
+            stats = samples.stats()
+            print(f"📈 Добыча за сеанс: в среднем {stats['mean']:.3f} ± {stats['std']:.3f} Г-единиц, "
+                  f"медиана {stats['p50']:.2f}, 90% не больше {stats['p90']:.2f}")
+        clock = self.demiurge.nutation_clock.stats()
+        print(f"🕰️ Часы нутации: квант {clock['quantum_seconds']:g} с, "
+              f"попаданий {clock['hit_rate']*100:.0f}% ({clock['hits']}/{clock['hits'] + clock['misses']}), "
+              f"сэкономлено {clock['saved_seconds']*1000:.2f} мс")
+        
+        if samples:
             print("\n📊 ПОСЛЕДНИЕ СБОРЫ НУТАЦИИ:")
             print("-" * 40)
-            for i, data in enumerate(self.demiurge.collected_nutation_data[-5:], 1):
+            for i, data in enumerate(samples.last(5), 1):
                 customer_nut = data['customer_nutation']
                 earth_nut = data['earth_nutation']
                 print(f"{i}. {data['customer']}")
@@ -302,9 +362,10 @@ class RussianSoulInterface:
         print("\n👥 СПИСОК ПОКУПАТЕЛЕЙ И СТАТИСТИКА ПРОДАЖ")
         print("═" * 60)
         
-        # Статистика каталога
+        # Статистика каталога - из итогов продаж, без обхода каталога
+        sales = self.demiurge.sales
         total_bodies = len(self.demiurge.catalog)
-        sold_bodies = len([body for body in self.demiurge.catalog.values() if body.owner])
+        sold_bodies = sales.sold
         available_bodies = total_bodies - sold_bodies
         
         print(f"📊 ОБЩАЯ СТАТИСТИКА КАТАЛОГА:")
@@ -317,10 +378,7 @@ class RussianSoulInterface:
             print(f"\n🎉 НАШИ СЧАСТЛИВЫЕ ПОКУПАТЕЛИ:")
             print("=" * 50)
             
-            total_revenue = 0
-            total_gravity_applied = 0
-            
-            for i, body in enumerate([b for b in self.demiurge.catalog.values() if b.owner], 1):
+            for i, body in enumerate(self.demiurge.owned_bodies(), 1):
                 print(f"\n{i}. 👤 Владелец: {body.owner}")
                 print(f"   🌌 Космическое тело: {body.name}")
                 print(f"   🏷️ Тип: {body.type.value}")
@@ -339,28 +397,21 @@ class RussianSoulInterface:
                 
                 print(f"   📍 Координаты: RA {body.coordinates[0]}°, Dec {body.coordinates[1]}°, {body.coordinates[2]} ly")
                 print(f"   🎯 Шанс открытия: {body.discovery_chance_today*100:.1f}%")
-                
-                total_revenue += body.price_universe_coins
                 print("   " + "─" * 45)
             
             print(f"\n💰 ФИНАНСОВЫЕ ИТОГИ:")
-            print(f"   Общая выручка: {total_revenue:,.0f} вселенских монет")
-            print(f"   В рублях: {total_revenue * self.demiurge.universe_coins_rate:,.0f} ₽")
-            print(f"   Средняя цена тела: {total_revenue/sold_bodies:,.0f} монет")
+            print(f"   Общая выручка: {sales.revenue:,.0f} вселенских монет")
+            print(f"   В рублях: {sales.revenue * self.demiurge.universe_coins_rate:,.0f} ₽")
+            print(f"   Средняя цена тела: {sales.average_price:,.0f} монет")
+            print(f"   Гравитации придано телам: {sales.gravity_applied:.3f} Г-единиц")
             
-            # Статистика по типам проданных тел
-            sold_types = {}
-            for body in [b for b in self.demiurge.catalog.values() if b.owner]:
-                body_type = body.type.value
-                if body_type in sold_types:
-                    sold_types[body_type] += 1
-                else:
-                    sold_types[body_type] = 1
+            print(f"\n🏷️ ПОПУЛЯРНЫЕ ТИПЫ КОСМИЧЕСКИХ ТЕЛ:")
+            for body_type, count in sales.popular_types():
+                print(f"   {body_type.value}: {count} шт.")
             
-            if sold_types:
-                print(f"\n🏷️ ПОПУЛЯРНЫЕ ТИПЫ КОСМИЧЕСКИХ ТЕЛ:")
-                for body_type, count in sorted(sold_types.items(), key=lambda x: x[1], reverse=True):
-                    print(f"   {body_type}: {count} шт.")
+            print(f"\n🏆 САМЫЕ ЩЕДРЫЕ ПОКУПАТЕЛИ:")
+            for place, buyer in enumerate(sales.top_buyers(), 1):
+                print(f"   {place}. {buyer['customer']}: {buyer['spent']:,.0f} монет за {buyer['bodies']} шт.")
         
         else:
             print(f"\n😔 ПОКА НЕТ ПОКУПАТЕЛЕЙ")
@@ -385,6 +436,7 @@ class RussianSoulInterface:
     
     def run(self):
         """Главный цикл приложения"""
+        self.demiurge.start_background()  # об открытиях владельцы узнают прямо во время сеанса
         self.clear_screen()
         
         while True:
@@ -399,7 +451,7 @@ class RussianSoulInterface:
             
             self.display_main_menu()
             
-            choice = input("\n🎯 Ваш выбор (1-10): ")
+            choice = input("\n🎯 Ваш выбор (1-11): ")
             
             if choice == '1':
                 self.display_catalog_beautifully()
@@ -438,6 +490,10 @@ class RussianSoulInterface:
                 input("\n👥 Нажмите Enter, чтобы продолжить...")
                 
             elif choice == '10':
+                self.search_sky()
+                input("\n🔭 Нажмите Enter, чтобы продолжить...")
+                
+            elif choice == '11':
                 print("\n🌟 Счастливого пути, путник звёздный!")
                 print("До свидания! Возвращайтесь за новыми чудесами! ✨")
                 if self.is_robot_customer:
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Сводка продаж демиурга: штуки по родам, выручка, гравитация и лучшие покупатели
+Обновляется при каждой покупке, поэтому читается за постоянное время
+"""
+
+import threading
+from typing import Dict, List, Tuple
+
+
+class SalesStats:
+    """Накопительные итоги продаж
+
+    Каждая продажа увеличивает счётчик её рода, выручку и траты
+    покупателя. Таблица лучших покупателей - не больше top_k строк: траты
+    покупателя только растут, поэтому он попадает в таблицу, обогнав
+    последнего в ней, и никогда не должен возвращаться из-за её пределов.
+    Итоги не зависят ни от размера каталога, ни от числа проданных тел.
+    """
+
+    def __init__(self, top_k: int = 10):
+        self.top_k = top_k
+        self.sold = 0
+        self.revenue = 0.0
+        self.gravity_applied = 0.0  # Г-единиц, ушедших на улучшение тел
+        self.by_type: Dict = {}  # CelestialType -> штук
+        self._buyers: Dict[str, Tuple[float, int]] = {}  # покупатель -> (потрачено, тел)
+        self._top: List[Tuple[float, str]] = []  # (потрачено, покупатель), щедрые первыми
+        self._lock = threading.Lock()
+
+    def record_sale(self, body, gravity_applied: float = 0.0):
+        """Учитывает проданное тело: его род, цену, владельца и приданную гравитацию"""
+        price = body.price_universe_coins
+        with self._lock:
+            self.sold += 1
+            self.revenue += price
+            self.gravity_applied += gravity_applied
+            self.by_type[body.type] = self.by_type.get(body.type, 0) + 1
+            spent, count = self._buyers.get(body.owner, (0.0, 0))
+            spent += price
+            self._buyers[body.owner] = (spent, count + 1)
+            self._promote(body.owner, spent)
+
+    def _promote(self, buyer: str, spent: float):
+        top = [entry for entry in self._top if entry[1] != buyer]
+        if len(top) < len(self._top) or len(top) < self.top_k or spent > top[-1][0]:
+            top.append((spent, buyer))
+            top.sort(key=lambda entry: (-entry[0], entry[1]))
+            del top[self.top_k:]
+        self._top = top
+
+    @property
+    def buyers(self) -> int:
+        return len(self._buyers)
+
+    @property
+    def average_price(self) -> float:
+        return self.revenue / self.sold if self.sold else 0.0
+
+    def top_buyers(self) -> List[Dict]:
+        with self._lock:
+            return [{'customer': buyer, 'spent': spent, 'bodies': self._buyers[buyer][1]}
+                    for spent, buyer in self._top]
+
+    def popular_types(self) -> List[Tuple]:
+        """(род, штук) по убыванию продаж"""
+        with self._lock:
+            return sorted(self.by_type.items(), key=lambda item: item[1], reverse=True)
+
+    def snapshot(self) -> Dict:
+        """Все итоги одним словарём (для API)"""
+        return {
+            'sold': self.sold,
+            'buyers': self.buyers,
+            'revenue': self.revenue,
+            'average_price': self.average_price,
+            'gravity_applied': self.gravity_applied,
+            'by_type': {body_type.value: count for body_type, count in self.popular_types()},
+            'top_buyers': self.top_buyers(),
+        }
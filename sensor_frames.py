@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Двоичные кадры сэмплов гироскопа: заголовок и упакованные записи фиксированного размера
+Разбор через memoryview и numpy.frombuffer - без объекта на сэмпл; тот же формат у записей сессий на диске
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+
+import numpy as np
+
+MAGIC = b"OGLF"
+VERSION = 1
+
+CALIBRATE = 1  # флаг кадра: сдвинуть базу калибровки перед сэмплами
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'),
+    ('version', 'u1'),
+    ('flags', 'u1'),
+    ('count', '<u2'),  # записей в кадре
+    ('base_ts', '<f8'),  # unix-время первой записи
+    ('device', 'S32'),  # UTF-8, дополняется нулями
+    ('customer', 'S48'),
+])
+
+RECORD_DTYPE = np.dtype([
+    ('dt_us', '<u4'),  # микросекунд от base_ts
+    ('x', '<f4'),  # угловые скорости, рад/с
+    ('y', '<f4'),
+    ('z', '<f4'),
+])
+
+DEFAULT_RECORDING = os.path.join(os.path.dirname(__file__), "data", "gyro_session.oglf")
+
+MAX_DATAGRAM = 65507
+MAX_RECORDS = (MAX_DATAGRAM - HEADER_DTYPE.itemsize) // RECORD_DTYPE.itemsize  # чтобы кадр влез в UDP
+MAX_SPAN_US = np.iinfo(np.uint32).max  # dt_us - u32: кадр охватывает не больше ~4294 с
+
+
+class SensorFrame(NamedTuple):
+    """Разобранный кадр; timestamps и xyz - представления над исходным буфером или массивы без объектов на сэмпл"""
+    device: str
+    customer: Optional[str]
+    calibrate: bool
+    base_ts: float
+    dt_us: np.ndarray  # (n,) uint32, вид на буфер
+    xyz: np.ndarray  # (n × 3) float32, вид на буфер
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.base_ts + self.dt_us * 1e-6
+
+    def __len__(self) -> int:
+        return len(self.dt_us)
+
+
+def _field(text: Optional[str], size: int) -> bytes:
+    return (text or "").encode("utf-8")[:size].decode("utf-8", "ignore").encode("utf-8")
+
+
+def frame_size(count: int) -> int:
+    return HEADER_DTYPE.itemsize + count * RECORD_DTYPE.itemsize
+
+
+def encode_frame(device: str, timestamps, xyz, customer: Optional[str] = None, calibrate: bool = False) -> bytes:
+    """Упаковывает сэмплы одного устройства в кадр
+
+    Моменты должны быть конечными, идти не убывая и укладываться в
+    MAX_SPAN_US микросекунд от первого: иначе dt_us молча переполнится.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64).reshape(-1)
+    count = len(timestamps)
+    if not 0 < count <= MAX_RECORDS:
+        raise ValueError(f"в кадре от 1 до {MAX_RECORDS} записей, получено {count}")
+    if not np.isfinite(timestamps).all():
+        raise ValueError("моменты сэмплов должны быть конечными")
+    if np.any(timestamps[1:] < timestamps[:-1]):
+        raise ValueError("моменты сэмплов должны идти не убывая")
+    base_ts = float(timestamps[0])
+    span_us = round((timestamps[-1] - base_ts) * 1e6)
+    if span_us > MAX_SPAN_US:
+        raise ValueError(f"кадр охватывает {span_us / 1e6:.1f} с, не больше {MAX_SPAN_US / 1e6:.0f} с")
+    buffer = bytearray(frame_size(count))
+    header = np.frombuffer(buffer, dtype=HEADER_DTYPE, count=1)
+    header['magic'] = MAGIC
+    header['version'] = VERSION
+    header['flags'] = CALIBRATE if calibrate else 0
+    header['count'] = count
+    header['base_ts'] = base_ts
+    header['device'] = _field(device, 32)
+    header['customer'] = _field(customer, 48)
+    records = np.frombuffer(buffer, dtype=RECORD_DTYPE, count=count, offset=HEADER_DTYPE.itemsize)
+    records['dt_us'] = np.round((timestamps - base_ts) * 1e6)
+    xyz = np.asarray(xyz, dtype=np.float32).reshape(count, 3)
+    records['x'], records['y'], records['z'] = xyz[:, 0], xyz[:, 1], xyz[:, 2]
+    return bytes(buffer)
+
+
+def decode_frame(buffer, offset: int = 0) -> SensorFrame:
+    """Разбирает кадр, начинающийся с offset; данные не копируются"""
+    view = memoryview(buffer)
+    if len(view) - offset < HEADER_DTYPE.itemsize:
+        raise ValueError("кадр короче заголовка")
+    header = np.frombuffer(view, dtype=HEADER_DTYPE, count=1, offset=offset)[0]
+    if bytes(header['magic']) != MAGIC:
+        raise ValueError("это не кадр сэмплов гироскопа")
+    if int(header['version']) != VERSION:
+        raise ValueError(f"кадр версии {int(header['version'])}, ожидается {VERSION}")
+    count = int(header['count'])
+    if len(view) - offset < frame_size(count):
+        raise ValueError(f"кадр обрезан: заявлено {count} записей")
+    start = offset + HEADER_DTYPE.itemsize
+    words = np.frombuffer(view, dtype='<u4', count=count * 4, offset=start).reshape(count, 4)
+    customer = bytes(header['customer']).decode("utf-8")
+    return SensorFrame(
+        device=bytes(header['device']).decode("utf-8"),
+        customer=customer or None,
+        calibrate=bool(header['flags'] & CALIBRATE),
+        base_ts=float(header['base_ts']),
+        dt_us=words[:, 0],
+        xyz=words[:, 1:].view('<f4'),
+    )
+
+
+def is_frame(payload) -> bool:
+    return bytes(payload[:4]) == MAGIC
+
+
+# Записи сессий: кадры подряд, без разделителей
+
+def write_frame(f: BinaryIO, frame: bytes):
+    f.write(frame)
+
+
+def iter_frames(buffer) -> Iterator[SensorFrame]:
+    """Все кадры буфера по порядку"""
+    offset = 0
+    size = len(buffer)
+    while offset < size:
+        frame = decode_frame(buffer, offset)
+        yield frame
+        offset += frame_size(len(frame))
+
+
+def read_recording(path: str) -> Iterator[SensorFrame]:
+    """Кадры файла записи через отображение в память: файл не читается целиком"""
+    if not os.path.getsize(path):
+        return iter(())
+    return iter_frames(np.memmap(path, dtype=np.uint8, mode="r"))
+
+
+def replay(path: str, hub) -> int:
+    """Прогоняет запись сессии через GyroHub; возвращает число сэмплов"""
+    samples = 0
+    for frame in read_recording(path):
+        hub.ingest(frame.device, frame.timestamps, frame.xyz, frame.customer, frame.calibrate)
+        samples += len(frame)
+    return samples
+
+
+# Сравнение с JSON
+
+def _synthetic(devices: int, per_frame: int, frames: int, seed: int = 6798):
+    rng = np.random.default_rng(seed)
+    start = time.time()
+    for k in range(frames):
+        device = k % devices
+        timestamps = start + (k // devices * per_frame + np.arange(per_frame)) / 200.0
+        yield f"устройство_{device}", f"покупатель_{device}", timestamps, rng.normal(0, 3e-5, (per_frame, 3))
+
+
+def benchmark(samples: int = 1_000_000, per_frame: int = 250, devices: int = 100) -> dict:
+    """Разбор и приём samples сэмплов из JSON-пакетов и из двоичных кадров"""
+    from gyro_ingest import GyroHub
+
+    frames = max(1, samples // per_frame)
+    binary, text = [], []
+    for device, customer, timestamps, xyz in _synthetic(devices, per_frame, frames):
+        binary.append(encode_frame(device, timestamps, xyz, customer))
+        text.append(json.dumps({"device": device, "customer": customer,
+                                "samples": np.column_stack([timestamps, xyz]).tolist()}).encode("utf-8"))
+    total = frames * per_frame
+
+    results = {'samples': total}
+    for label, payloads, ingest in (("json", text, lambda hub, p: hub.ingest_json(p)),
+                                    ("binary", binary, lambda hub, p: hub.ingest_frame(p))):
+        hub = GyroHub()
+        started = time.perf_counter()
+        for payload in payloads:
+            ingest(hub, payload)
+        elapsed = time.perf_counter() - started
+        decode_started = time.perf_counter()
+        if label == "json":
+            for payload in payloads:
+                np.asarray(json.loads(payload)["samples"], dtype=np.float64)
+        else:
+            for payload in payloads:
+                decode_frame(payload)
+        results[label] = {
+            'bytes': sum(map(len, payloads)),
+            'decode_per_s': total / (time.perf_counter() - decode_started),
+            'ingest_per_s': total / elapsed,
+            'samples': hub.samples,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Двоичные кадры гироскопа: сравнение с JSON и проигрывание записей")
+    parser.add_argument("mode", choices=["bench", "record", "replay"])
+    parser.add_argument("path", nargs="?", default=DEFAULT_RECORDING)
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--per-frame", type=int, default=250, help="сэмплов в кадре")
+    parser.add_argument("--devices", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.mode == "bench":
+        result = benchmark(args.samples, args.per_frame, args.devices)
+        print(f"📦 {result['samples']:,} сэмплов, по {args.per_frame} в пакете")
+        for label in ("json", "binary"):
+            r = result[label]
+            verdict = "✅" if r['ingest_per_s'] >= 1_000_000 else "⚠️"
+            print(f"   {label:<7} {r['bytes'] / 1e6:>8.1f} МБ  разбор {r['decode_per_s']:>13,.0f}/с  "
+                  f"приём {r['ingest_per_s']:>13,.0f}/с {verdict}")
+        print(f"   двоичный приём быстрее в ×{result['binary']['ingest_per_s'] / result['json']['ingest_per_s']:.1f}, "
+              f"компактнее в ×{result['json']['bytes'] / result['binary']['bytes']:.1f}")
+    elif args.mode == "record":
+        directory = os.path.dirname(args.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        frames = max(1, args.samples // args.per_frame)
+        with open(args.path, "wb") as f:
+            for device, customer, timestamps, xyz in _synthetic(args.devices, args.per_frame, frames):
+                write_frame(f, encode_frame(device, timestamps, xyz, customer))
+        print(f"💾 Записано {frames * args.per_frame:,} сэмплов → {args.path} ({os.path.getsize(args.path) / 1e6:.1f} МБ)")
+    else:
+        from gyro_ingest import GyroHub
+        hub = GyroHub()
+        started = time.perf_counter()
+        samples = replay(args.path, hub)
+        elapsed = time.perf_counter() - started
+        print(f"▶️ {samples:,} сэмплов из {args.path} за {elapsed:.2f} с ({samples / elapsed:,.0f}/с), "
+              f"устройств: {len(hub.devices)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Небесный индекс: поиск тел по положению на небе и по расстоянию
+Конусы вокруг RA/Dec, ближайшие соседи и слои расстояний без обхода каталога
+"""
+
+import math
+from typing import Optional
+
+import numpy as np
+
+
+def _unit_vectors(ra_deg: np.ndarray, dec_deg: np.ndarray) -> np.ndarray:
+    ra = np.radians(ra_deg)
+    dec = np.radians(dec_deg)
+    cos_dec = np.cos(dec)
+    return np.stack([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)], axis=-1)
+
+
+class SkyIndex:
+    """Ячейки неба почти равной площади, как в HEALPix
+
+    Небо нарезано на полосы склонения шириной cell_deg, каждая полоса - на
+    ячейки по прямому восхождению, число которых пропорционально cos(Dec).
+    Тела отсортированы по номеру ячейки, и ячейки одной полосы идут подряд:
+    конус превращается в несколько непрерывных срезов, которые затем
+    точно отфильтровываются по угловому расстоянию. Расстояния хранятся
+    отдельно отсортированными, слой расстояний - два бинарных поиска.
+    """
+
+    def __init__(self, ra_deg: np.ndarray, dec_deg: np.ndarray, distance_ly: np.ndarray,
+                 cell_deg: float = 1.0):
+        ra_deg = np.mod(np.asarray(ra_deg, dtype=np.float64), 360.0)
+        dec_deg = np.clip(np.asarray(dec_deg, dtype=np.float64), -90.0, 90.0)
+        self.size = len(ra_deg)
+        self.cell_deg = cell_deg
+        self.n_bands = int(math.ceil(180.0 / cell_deg))
+        centers = -90.0 + (np.arange(self.n_bands) + 0.5) * cell_deg
+        self.band_cells = np.maximum(1, np.ceil(360.0 * np.cos(np.radians(centers)) / cell_deg)).astype(np.int64)
+        self.band_offset = np.concatenate([[0], np.cumsum(self.band_cells)])
+
+        band = np.minimum(((dec_deg + 90.0) / cell_deg).astype(np.int64), self.n_bands - 1)
+        cells_in_band = self.band_cells[band]
+        column = np.minimum((ra_deg / 360.0 * cells_in_band).astype(np.int64), cells_in_band - 1)
+        cell = self.band_offset[band] + column
+
+        self.order = np.argsort(cell, kind="stable")
+        self.position = np.empty(self.size, dtype=np.int64)  # номер тела -> место в order
+        self.position[self.order] = np.arange(self.size)
+        self.cell_start = np.searchsorted(cell[self.order], np.arange(self.band_offset[-1] + 1))
+        self.xyz = _unit_vectors(ra_deg, dec_deg)[self.order]
+
+        self.distance_order = np.argsort(distance_ly, kind="stable")
+        self.distance_sorted = np.asarray(distance_ly, dtype=np.float64)[self.distance_order]
+
+    def _candidate_slices(self, ra: float, dec: float, radius_deg: float):
+        """Срезы отсортированного массива, покрывающие конус"""
+        first = max(0, int((dec - radius_deg + 90.0) // self.cell_deg))
+        last = min(self.n_bands - 1, int((dec + radius_deg + 90.0) // self.cell_deg))
+        r = math.radians(radius_deg)
+        cos_dec = math.cos(math.radians(dec))
+        # полуширина конуса по RA; если конус накрывает полюс - вся полоса
+        if radius_deg >= 90.0 or cos_dec <= math.sin(r):
+            half_width = 180.0
+        else:
+            half_width = math.degrees(math.asin(math.sin(r) / cos_dec))
+        for b in range(first, last + 1):
+            n = int(self.band_cells[b])
+            offset = int(self.band_offset[b])
+            if half_width >= 180.0:
+                yield self.cell_start[offset], self.cell_start[offset + n]
+                continue
+            lo = int(math.floor((ra - half_width) / 360.0 * n))
+            hi = int(math.floor((ra + half_width) / 360.0 * n))
+            if hi - lo + 1 >= n:
+                yield self.cell_start[offset], self.cell_start[offset + n]
+                continue
+            lo %= n
+            hi %= n
+            if lo <= hi:
+                yield self.cell_start[offset + lo], self.cell_start[offset + hi + 1]
+            else:  # переход через RA = 0
+                yield self.cell_start[offset + lo], self.cell_start[offset + n]
+                yield self.cell_start[offset], self.cell_start[offset + hi + 1]
+
+    def _candidates(self, ra: float, dec: float, radius_deg: float) -> np.ndarray:
+        slices = [np.arange(a, b) for a, b in self._candidate_slices(ra, dec, radius_deg) if b > a]
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.int64)
+
+    def cone(self, ra: float, dec: float, radius_deg: float, sort: bool = True) -> np.ndarray:
+        """Номера тел в пределах radius_deg от точки (ra, dec), ближние первыми"""
+        positions = self._candidates(ra, dec, radius_deg)
+        center = _unit_vectors(np.array(ra), np.array(dec))
+        dots = self.xyz[positions] @ center
+        inside = dots >= math.cos(math.radians(radius_deg))
+        positions, dots = positions[inside], dots[inside]
+        if sort:
+            by_separation = np.argsort(-dots, kind="stable")
+            positions = positions[by_separation]
+        return self.order[positions]
+
+    def separation_deg(self, rows: np.ndarray, ra: float, dec: float) -> np.ndarray:
+        """Угловое расстояние от точки до тел, в градусах"""
+        center = _unit_vectors(np.array(ra), np.array(dec))
+        xyz = self.xyz[self.position[rows]]
+        return np.degrees(np.arccos(np.clip(xyz @ center, -1.0, 1.0)))
+
+    def nearest(self, ra: float, dec: float, n: int, exclude: Optional[int] = None) -> np.ndarray:
+        """n ближайших на небе тел к точке (ra, dec)"""
+        wanted = n + (exclude is not None)
+        if self.size == 0 or wanted == 0:
+            return np.empty(0, dtype=np.int64)
+        # начальный радиус - круг, где в среднем окажется wanted тел
+        radius = max(self.cell_deg, math.degrees(math.sqrt(4.0 * wanted / self.size)))
+        while True:
+            rows = self.cone(ra, dec, radius)
+            if len(rows) >= wanted or radius >= 180.0:
+                break
+            radius = min(180.0, radius * 2.0)
+        if exclude is not None:
+            rows = rows[rows != exclude]
+        return rows[:n]
+
+    def nearest_to(self, row: int, n: int) -> np.ndarray:
+        """n ближайших на небе тел к телу с номером row"""
+        x, y, z = self.xyz[self.position[row]]
+        ra = math.degrees(math.atan2(y, x)) % 360.0
+        dec = math.degrees(math.asin(max(-1.0, min(1.0, z))))
+        return self.nearest(ra, dec, n, exclude=row)
+
+    def distance_range(self, min_ly: float, max_ly: float) -> np.ndarray:
+        """Номера тел на расстоянии от min_ly до max_ly, по возрастанию расстояния"""
+        lo = np.searchsorted(self.distance_sorted, min_ly, side="left")
+        hi = np.searchsorted(self.distance_sorted, max_ly, side="right")
+        return self.distance_order[lo:hi]
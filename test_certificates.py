@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Сертификаты: кэш по владельцу и эпохе выдачи, форматы и выгрузка пачкой
+"""
+
+import json
+import os
+import zipfile
+
+import pytest
+
+from celestial_generator import ProceduralCatalog
+from certificates import CertificateRenderer, export_certificates
+
+EPOCH = 1_760_000_000.0
+
+
+class CountingNutation:
+    def __init__(self):
+        self.epochs = []
+
+    def at(self, unix_time):
+        self.epochs.append(unix_time)
+        return 1.25, -0.5
+
+
+def _body(index=7, owner="Аксинья"):
+    body = ProceduralCatalog(size=100).materialize(index)
+    body.owner = owner
+    body.purchased_at = EPOCH
+    return body
+
+
+def test_repeated_render_is_cached():
+    nutation = CountingNutation()
+    renderer = CertificateRenderer(nutation)
+    body = _body()
+    first = renderer.render(body)
+    assert renderer.render(body) is first
+    assert (renderer.hits, renderer.misses) == (1, 1)
+    assert nutation.epochs == [EPOCH]  # нутация на эпоху выдачи, а не на «сейчас»
+    assert "Аксинья" in first and body.id in first
+
+
+def test_owner_change_invalidates():
+    renderer = CertificateRenderer(CountingNutation())
+    body = _body()
+    before = renderer.render(body)
+    body.owner = "Фрол"
+    after = renderer.render(body)
+    assert "Фрол" in after and "Аксинья" not in after
+    body.purchased_at = EPOCH + 86400  # перевыдача
+    reissued = renderer.render(body)
+    assert reissued != after and "Фрол" in reissued
+    assert (renderer.hits, renderer.misses) == (0, 3)
+    body.owner, body.purchased_at = "Аксинья", EPOCH
+    assert renderer.render(body) is before
+
+
+def test_formats_and_lru_bound():
+    renderer = CertificateRenderer(CountingNutation(), maxsize=2)
+    body = _body(owner="<script>Фрол</script>")
+    assert "&lt;script&gt;" in renderer.render(body, "html")
+    fields = json.loads(renderer.render(body, "json"))
+    assert (fields["owner"], fields["issued_at"], fields["nutation_longitude"]) == (body.owner, EPOCH, 1.25)
+    renderer.render(body, "text")  # вытесняет html
+    renderer.render(body, "html")
+    assert (renderer.hits, renderer.misses) == (0, 4)
+    with pytest.raises(ValueError):
+        renderer.render(body, "pdf")
+
+
+@pytest.mark.parametrize("archive", [False, True])
+def test_export(tmp_path, archive):
+    bodies = [_body(i, f"покупатель_{i}") for i in range(5)]
+    destination = str(tmp_path / ("certs.zip" if archive else "certs"))
+    assert export_certificates(CertificateRenderer(CountingNutation()), bodies, destination,
+                               fmt="json", workers=1, chunk_size=2) == 5
+    if archive:
+        with zipfile.ZipFile(destination) as zf:
+            names = sorted(zf.namelist())
+            owner = json.loads(zf.read(bodies[3].id + ".json"))["owner"]
+    else:
+        names = sorted(os.listdir(destination))
+        with open(os.path.join(destination, bodies[3].id + ".json"), encoding="utf-8") as f:
+            owner = json.load(f)["owner"]
+    assert names == sorted(body.id + ".json" for body in bodies)
+    assert owner == "покупатель_3"
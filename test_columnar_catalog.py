@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Колоночный каталог: фильтры и производная физика совпадают с CelestialBody,
+а как бэкенд демиурга он видит те же брони и продажи, что и CatalogIndex
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from celestial_generator import ProceduralCatalog
+from columnar_catalog import ColumnarCatalog
+from cosmic_demiurge import CelestialType, CosmicDemiurge
+from demiurge_events import NullSink
+
+
+def _demiurge(backend: str) -> CosmicDemiurge:
+    return CosmicDemiurge(procedural=ProceduralCatalog(size=1000), events=NullSink(), catalog_backend=backend)
+
+
+def _catalogs():
+    procedural = ProceduralCatalog(size=500)
+    bodies = list(_demiurge("index").catalog.values()) + [procedural.materialize(i) for i in range(500)]
+    return [(ColumnarCatalog.from_bodies(bodies), bodies),
+            (ColumnarCatalog.from_procedural(procedural), [procedural.materialize(i) for i in range(500)])]
+
+
+@pytest.mark.parametrize("cat, bodies", _catalogs())
+def test_derived_physics_matches_bodies(cat, bodies, monkeypatch):
+    now = 1.7e9
+    monkeypatch.setattr(time, "time", lambda: now)
+    params = [body.gravitational_params for body in bodies]
+    assert np.allclose(cat.gravitational_parameter(), [gp.gravitational_parameter for gp in params], rtol=1e-12)
+    assert np.allclose(cat.schwarzschild_radius(), [gp.schwarzschild_radius for gp in params], rtol=1e-12)
+    assert np.allclose(cat.discovery_chance_today(now), [body.discovery_chance_today for body in bodies],
+                       rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("cat, bodies", _catalogs())
+def test_filters_match_bodies(cat, bodies):
+    for celestial_type in (None, CelestialType.COMET, CelestialType.BLACK_HOLE):
+        for max_price in (None, 100000):
+            rows = cat.browse(celestial_type, max_price)
+            expected = {body.id for body in bodies
+                        if body.is_available
+                        and (celestial_type is None or body.type == celestial_type)
+                        and (max_price is None or body.price_universe_coins <= max_price)}
+            assert {cat.body(int(row)).id for row in rows} == expected
+            prices = cat.price[rows]
+            assert np.all(prices[:-1] <= prices[1:])
+
+
+def test_append_grows_columns():
+    cat = ColumnarCatalog.from_bodies(())
+    procedural = ProceduralCatalog(size=100)
+    for i in range(40):
+        assert cat.append(procedural.materialize(i)) == i
+    assert len(cat) == len(cat.price) == 40
+    assert cat["PG_00000039"].id == "PG_00000039"
+    assert cat.price[39] == procedural.materialize(39).price_universe_coins
+
+
+def test_columnar_backend_matches_index():
+    index, columnar = _demiurge("index"), _demiurge("columnar")
+    for demiurge in (index, columnar):
+        assert demiurge.reserve_celestial_body("PG_00000003", "Аксинья")
+        assert demiurge.reserve_celestial_body("BH_001", "Аксинья")
+        assert demiurge.purchase_celestial_body("PG_00000005", "Фрол")
+        assert demiurge.purchase_celestial_body("CM_002", "Фрол")
+        for i in range(10, 60):  # процедурные тела попадают в каталог при первом касании
+            demiurge._claim_body(f"PG_{i:08d}")
+
+    for celestial_type in (None, CelestialType.COMET, CelestialType.ASTEROID):
+        for max_price in (None, 150000):
+            expected = index.browse_catalog(celestial_type, max_price)
+            found = columnar.browse_catalog(celestial_type, max_price)
+            assert {body.id for body in found} == {body.id for body in expected}
+            assert [body.price_universe_coins for body in found] == [body.price_universe_coins for body in expected]
+    assert len(columnar.browse_catalog(offset=5, limit=7)) == 7
+
+    cat = columnar.columns
+    assert len(cat) == len(columnar.catalog)
+    for body_id, body in columnar.catalog.items():
+        row = cat.row_of(body_id)
+        assert cat.owned[row] == bool(body.owner)
+        assert bool(cat.reserved_until[row]) == bool(body.reserved_until)
+        assert cat.surface_gravity[row] == body.gravitational_params.surface_gravity
+
+
+def test_columnar_backend_sees_reservation_expiry():
+    demiurge = _demiurge("columnar")
+    assert demiurge.reserve_celestial_body("PG_00000007", "Аксинья", hours=1e-6)
+    row = demiurge.columns.row_of("PG_00000007")
+    assert demiurge.columns.reserved_until[row] > 0
+    time.sleep(0.01)
+    assert "PG_00000007" in {body.id for body in demiurge.browse_catalog()}
+    assert demiurge.columns.reserved_until[row] == 0
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        CosmicDemiurge(events=NullSink(), catalog_backend="sql")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Гонки покупателей: под замками полос каждое тело достаётся ровно одному, сколько бы потоков его ни брали
+"""
+
+import sys
+import threading
+
+import pytest
+
+from celestial_generator import ProceduralCatalog
+from cosmic_demiurge import CosmicDemiurge
+from demiurge_events import NullSink
+
+THREADS = 8
+BODIES = ["BH_001", "CM_001", "CM_002", "AS_001"] + [f"PG_{i:08d}" for i in range(60)]
+
+
+@pytest.fixture(autouse=True)
+def frequent_switches():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # потоки чаще прерывают друг друга посреди покупки
+    yield
+    sys.setswitchinterval(interval)
+
+
+def _race(work):
+    """work(k) в THREADS потоках, стартующих разом; результаты по номеру потока"""
+    demiurge = CosmicDemiurge(procedural=ProceduralCatalog(size=1000), events=NullSink())
+    barrier = threading.Barrier(THREADS)
+    results = [None] * THREADS
+
+    def run(k):
+        barrier.wait()
+        results[k] = work(demiurge, k)
+
+    threads = [threading.Thread(target=run, args=(k,)) for k in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return demiurge, results
+
+
+def test_each_body_sold_once():
+    def buy(demiurge, k):
+        order = BODIES[k * 7 % len(BODIES):] + BODIES[:k * 7 % len(BODIES)]
+        return [body_id for body_id in order if demiurge.purchase_celestial_body(body_id, f"покупатель_{k}")]
+
+    demiurge, won = _race(buy)
+    assert sorted(sum(won, [])) == sorted(BODIES)
+    assert demiurge.sales.sold == len(BODIES)
+    for k, body_ids in enumerate(won):
+        assert {body.id for body in demiurge.bodies_of(f"покупатель_{k}")} == set(body_ids)
+    assert not set(BODIES) & {body.id for body in demiurge.browse_catalog()}
+
+
+def test_batches_and_single_purchases_race():
+    def buy(demiurge, k):
+        if k % 2:
+            results = demiurge.purchase_batch([(body_id, f"покупатель_{k}", (1.0, 2.0)) for body_id in BODIES])
+            return [r['body_id'] for r in results if r['success']]
+        return [body_id for body_id in BODIES if demiurge.purchase_celestial_body(body_id, f"покупатель_{k}")]
+
+    demiurge, won = _race(buy)
+    assert sorted(sum(won, [])) == sorted(BODIES)
+    assert demiurge.sales.sold == len(BODIES)
+
+
+def test_one_reservation_wins():
+    def reserve(demiurge, k):
+        return [body_id for body_id in BODIES[:16] if demiurge.reserve_celestial_body(body_id, f"покупатель_{k}")]
+
+    demiurge, won = _race(reserve)
+    assert sorted(sum(won, [])) == sorted(BODIES[:16])
+    for body_id in BODIES[:16]:
+        assert not demiurge.purchase_celestial_body(body_id, "опоздавший")
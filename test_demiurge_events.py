@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+События демиурга: покупка сообщает о шагах приёмнику, консоль печатает их прежним текстом, API молчит
+"""
+
+import io
+import json
+
+from celestial_generator import ProceduralCatalog
+from cosmic_demiurge import CosmicDemiurge
+from demiurge_events import RENDERERS, ConsoleSink, DemiurgeEvent, FanoutSink, JsonlSink, MemorySink, NullSink
+
+BODY = "PG_00000003"
+PURCHASE = ['purchase_started', 'nutation_collected', 'gravity_mined', 'coins_converted', 'gravity_applied',
+            'purchase_completed']
+
+
+def _demiurge(events):
+    return CosmicDemiurge(procedural=ProceduralCatalog(size=100), events=events)
+
+
+def test_purchase_emits_each_step():
+    sink = MemorySink()
+    demiurge = _demiurge(sink)
+    assert demiurge.purchase_celestial_body(BODY, "Аксинья")
+    assert [event.kind for event in sink.events] == PURCHASE
+    (completed,) = sink.of_kind('purchase_completed')
+    assert completed.data['gravity_reserves'] == demiurge.gravity_reserves
+    assert sink.of_kind('gravity_applied')[0].data['body_id'] == BODY
+
+
+def test_null_sink_is_silent(capsys):
+    demiurge = _demiurge(NullSink())
+    assert demiurge.purchase_celestial_body(BODY, "Аксинья")
+    demiurge.apply_robot_discount(1000, True)
+    assert capsys.readouterr().out == ""
+
+
+def test_console_sink_renders_purchase():
+    stream = io.StringIO()
+    demiurge = _demiurge(ConsoleSink(stream))
+    assert demiurge.purchase_celestial_body(BODY, "Аксинья")
+    text = stream.getvalue()
+    assert text.startswith("\n🎯 ПРОЦЕСС ПОКУПКИ КОСМИЧЕСКОГО ТЕЛА\n")
+    assert "💎 Добыто гравитации:" in text and "💫 ИТОГИ ПОКУПКИ:" in text
+    assert f"УЛУЧШЕНИЕ ГРАВИТАЦИИ ТЕЛА '{demiurge.catalog[BODY].name}'" in text
+
+
+def test_console_sink_skips_unrendered_kinds():
+    stream = io.StringIO()
+    ConsoleSink(stream).emit(DemiurgeEvent('body_discovered', {'body_id': BODY}))
+    assert 'body_discovered' not in RENDERERS and stream.getvalue() == ""
+
+
+def test_jsonl_and_fanout(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    memory = MemorySink()
+    sink = FanoutSink(memory, JsonlSink(path))
+    demiurge = _demiurge(sink)
+    assert demiurge.purchase_celestial_body(BODY, "Аксинья")
+    sink.close()
+    with open(path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert [line['kind'] for line in lines] == [event.kind for event in memory.events] == PURCHASE
+    assert lines[0]['data'] == {'body_id': BODY, 'customer': "Аксинья"}
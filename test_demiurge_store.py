@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Хранилище демиурга: открытия переживают перезапуск, старые версии обновляются,
+несколько процессов делят одно хранилище
+"""
+
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+
+import demiurge_store
+from celestial_generator import ProceduralCatalog
+from cosmic_demiurge import CosmicDemiurge
+from demiurge_events import NullSink
+from demiurge_store import (DEFAULT_STORE_PATH, HEADER_DTYPE, LEGACY_SLOT_DTYPES, MAGIC, OWNED, TOUCHED, VERSION,
+                            DemiurgeStore)
+from sensor_frames import DEFAULT_RECORDING
+
+BODY = "PG_00000007"
+
+
+def _demiurge(path):
+    return CosmicDemiurge(procedural=ProceduralCatalog(size=1000), events=NullSink(), store=DemiurgeStore(str(path)))
+
+
+def test_discovery_due_survives_restart(tmp_path):
+    path = tmp_path / "demiurge.store"
+    first = _demiurge(path)
+    assert first.purchase_celestial_body(BODY, "alice")
+    due = first.catalog[BODY].discovery_due
+    assert due is not None
+    first.store.close()
+
+    second = _demiurge(path)
+    assert second.catalog[BODY].discovery_due == due
+    assert second.discoveries.next_due() == due
+    discovered = second.discoveries.poll(now=due)
+    assert [body_id for body_id, _, _ in discovered] == [BODY]
+    second.store.close()
+
+    third = _demiurge(path)
+    assert third.catalog[BODY].discovered
+    assert len(third.discoveries) == 0
+    assert third.discovered_today() == []
+
+
+def test_all_owners_view_does_not_consume(tmp_path):
+    demiurge = _demiurge(tmp_path / "demiurge.store")
+    assert demiurge.purchase_celestial_body(BODY, "alice")
+    demiurge.discoveries.poll(now=demiurge.catalog[BODY].discovery_due)
+    assert [body.id for body in demiurge.discovered_today()] == [BODY]
+    assert [body.id for body in demiurge.discovered_today()] == [BODY]
+    assert [body.id for body in demiurge.discovered_today("alice")] == [BODY]
+    assert demiurge.discovered_today("alice") == []
+
+
+def _write_legacy(path, version, slot, fields):
+    legacy = LEGACY_SLOT_DTYPES[version]
+    capacity = slot + 8
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header['magic'], header['version'], header['capacity'] = MAGIC, version, capacity
+    header['gravity_reserves'], header['has_reserves'] = 1234.5, 1
+    slots = np.zeros(capacity, dtype=legacy)
+    for name, value in fields.items():
+        slots[slot][name] = value
+    with open(path, "wb") as f:
+        f.write(header.tobytes() + slots.tobytes())
+    np.array([slot], dtype="<u8").tofile(str(path) + ".touched")
+
+
+def test_v2_store_is_upgraded(tmp_path):
+    path = tmp_path / "demiurge.store"
+    _write_legacy(path, 2, 4096 + 7, {'flags': TOUCHED | OWNED, 'id': BODY.encode(), 'owner': "боб".encode(),
+                                      'surface_gravity': 9.5, 'purchased_at': 1.75e9})
+    store = DemiurgeStore(str(path))
+    store.bind([], ProceduralCatalog(size=1000))
+    assert store.gravity_reserves == 1234.5
+    (record,) = list(store.records())
+    assert (record.id, record.owner, record.surface_gravity, record.purchased_at) == (BODY, "боб", 9.5, 1.75e9)
+    assert record.discovery_due is None and not record.discovered
+    store.close()
+    assert int(np.fromfile(path, dtype=HEADER_DTYPE, count=1)['version'][0]) == VERSION
+
+
+def test_v1_store_is_upgraded(tmp_path):
+    path = tmp_path / "demiurge.store"
+    _write_legacy(path, 1, 4096 + 7, {'flags': TOUCHED | OWNED, 'id': BODY.encode(), 'owner': b"alice",
+                                      'surface_gravity': 3.25})
+    demiurge = _demiurge(path)  # прежде падало с «хранилище версии 1, ожидается ...»
+    body = demiurge.catalog[BODY]
+    assert (body.owner, body.gravitational_params.surface_gravity, body.purchased_at) == ("alice", 3.25, None)
+    assert demiurge.gravity_reserves == 1234.5
+    assert body.discovery_due is not None  # разыгран заново и сохранён
+    demiurge.store.close()
+    store = DemiurgeStore(str(path))
+    (record,) = list(store.records())
+    assert record.discovery_due == body.discovery_due
+    store.close()
+
+
+def test_default_paths_do_not_depend_on_cwd():
+    here = os.path.dirname(os.path.abspath(__file__))
+    assert os.path.abspath(DEFAULT_STORE_PATH) == os.path.join(here, "data", "demiurge.store")
+    assert os.path.abspath(DEFAULT_RECORDING) == os.path.join(here, "data", "gyro_session.oglf")
+
+
+def _buy(path, bodies, name, barrier, won):
+    demiurge = _demiurge(path)
+    barrier.wait()
+    won.put((name, [body_id for body_id in bodies if demiurge.purchase_celestial_body(body_id, name)]))
+    demiurge.store.close()
+
+
+def test_processes_sell_each_body_once(tmp_path):
+    path = tmp_path / "demiurge.store"
+    bodies = ["CM_001", "BH_001"] + [f"PG_{i:08d}" for i in range(60)]
+    context = multiprocessing.get_context("fork")
+    barrier, won = context.Barrier(3), context.Queue()
+    workers = [context.Process(target=_buy, args=(path, bodies[k:] + bodies[:k], name, barrier, won))
+               for k, name in enumerate(["alice", "bob", "carol"])]
+    for worker in workers:
+        worker.start()
+    winners = dict(won.get(timeout=60) for _ in workers)
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+    assert sorted(sum(winners.values(), [])) == sorted(bodies)
+
+    demiurge = _demiurge(path)
+    for name, body_ids in winners.items():
+        assert {body.id for body in demiurge.bodies_of(name)} == set(body_ids)
+    assert demiurge.sales.sold == len(bodies)
+    demiurge.store.close()
+
+
+def _reserve_and_buy(path):
+    demiurge = _demiurge(path)
+    assert demiurge.reserve_celestial_body("CM_001", "bob")
+    assert demiurge.purchase_celestial_body(BODY, "bob")
+    demiurge.store.close()
+
+
+def test_open_demiurge_sees_other_process(tmp_path):
+    path = tmp_path / "demiurge.store"
+    demiurge = _demiurge(path)
+    reserves = demiurge.gravity_reserves
+    worker = multiprocessing.get_context("fork").Process(target=_reserve_and_buy, args=(path,))
+    worker.start()
+    worker.join(timeout=60)
+    assert worker.exitcode == 0
+
+    assert not demiurge.purchase_celestial_body(BODY, "alice")  # ячейка перечитана под замком
+    assert not demiurge.reserve_celestial_body("CM_001", "alice")
+    assert "CM_001" not in {body.id for body in demiurge.browse_catalog()}
+    assert [body.id for body in demiurge.bodies_of("bob")] == [BODY]
+    assert demiurge.catalog[BODY].discovery_due is not None
+    assert demiurge.gravity_reserves > reserves  # добытое другим процессом
+    demiurge.store.close()
+
+
+def _add_reserves(path):
+    store = DemiurgeStore(str(path))
+    for _ in range(500):
+        store.add_gravity_reserves(1.0, 0.0)
+    store.close()
+
+
+def test_reserves_are_shared_between_processes(tmp_path):
+    path = tmp_path / "demiurge.store"
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_add_reserves, args=(path,)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    _add_reserves(path)
+    for worker in workers:
+        worker.join(timeout=60)
+    store = DemiurgeStore(str(path))
+    assert store.gravity_reserves == 1500.0
+    store.close()
+
+
+def test_interrupted_upgrade_leaves_old_store(tmp_path, monkeypatch):
+    path = tmp_path / "demiurge.store"
+    _write_legacy(path, 2, 4096 + 7, {'flags': TOUCHED | OWNED, 'id': BODY.encode(), 'owner': b"alice",
+                                      'surface_gravity': 9.5})
+    original = path.read_bytes()
+
+    def crash(src, dst):
+        raise OSError("питание пропало")
+
+    monkeypatch.setattr(demiurge_store.os, "replace", crash)
+    with pytest.raises(OSError):
+        DemiurgeStore(str(path))
+    assert path.read_bytes() == original
+    monkeypatch.undo()
+
+    demiurge = _demiurge(path)
+    assert demiurge.catalog[BODY].owner == "alice"
+    demiurge.store.close()
+    assert not os.path.exists(str(path) + ".upgrade")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тесты планировщика открытий: фоновая выдача в срок и постановка в очередь из потоков
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+from discovery_scheduler import DiscoveryScheduler
+
+
+def _body(body_id: str = "body-1", owner: str = "Аксинья", chance: float = 0.5):
+    return SimpleNamespace(id=body_id, owner=owner, discovery_chance_today=chance)
+
+
+def test_background_thread_delivers_discovery_when_due():
+    scheduler = DiscoveryScheduler(seed=1)
+    delivered = threading.Event()
+    seen = []
+    scheduler.subscribe(lambda body_id, owner, when: (seen.append((body_id, owner)), delivered.set()))
+    scheduler.start_background()
+    try:
+        scheduler.schedule(_body("late"), due=time.time() + 3600)
+        scheduler.schedule(_body("soon"), due=time.time() + 0.05)  # раньше текущей вершины - поток должен проснуться
+        assert delivered.wait(5)
+        assert seen == [("soon", "Аксинья")]
+        assert len(scheduler) == 1
+    finally:
+        scheduler.stop(timeout=5)
+    assert not scheduler._thread.is_alive()
+
+
+def test_start_background_is_idempotent():
+    scheduler = DiscoveryScheduler()
+    try:
+        assert scheduler.start_background() is scheduler.start_background()
+    finally:
+        scheduler.stop(timeout=5)
+
+
+def test_concurrent_schedule_queues_body_once():
+    scheduler = DiscoveryScheduler(seed=7)
+    body = _body()
+    results = []
+    start = threading.Barrier(16)
+
+    def worker():
+        start.wait()
+        results.append(scheduler.schedule(body, now=0.0))
+
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(results)) == 1
+    assert len(scheduler._heap) == 1
+    assert scheduler.poll(now=results[0]) == [("body-1", "Аксинья", results[0])]
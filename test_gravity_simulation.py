@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Монте-Карло экономики: совпадение со скалярными формулами и воспроизводимость по зерну
+"""
+
+import numpy as np
+
+from gravity_simulation import DEFAULT_START, simulate, verify_against_scalar
+
+
+def test_vector_formulas_match_scalar():
+    errors = verify_against_scalar(n=200)
+    assert errors['gravity_yield'] <= 1e-12
+    assert errors['mined_coins'] <= 1e-12
+    assert errors['enhancement_factor'] <= 1e-9
+
+
+def test_result_depends_only_on_seed():
+    first = simulate(customers=3000, trials=3, workers=1, batch=1000)
+    second = simulate(customers=3000, trials=3, workers=2, batch=1000, start=DEFAULT_START)
+    assert np.array_equal(first.trial_yield, second.trial_yield)
+    assert np.array_equal(first.histogram, second.histogram)
+    other = simulate(customers=3000, trials=3, workers=1, batch=1000, seed=1)
+    assert not np.array_equal(first.trial_yield, other.trial_yield)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Регрессия: нечисловые сэмплы гироскопа отклоняются и не ломают покупку
+"""
+
+import json
+import time
+
+import numpy as np
+
+from celestial_generator import ProceduralCatalog
+from cosmic_demiurge import CosmicDemiurge
+from demiurge_events import NullSink
+from gyro_ingest import GyroHub
+from nutation_buffer import NutationRingBuffer
+from sensor_frames import encode_frame
+
+
+def _json(samples, customer="alice"):
+    return json.dumps({"device": "phone", "customer": customer, "samples": samples}).encode("utf-8")
+
+
+def test_json_nan_and_overflow_are_rejected():
+    hub = GyroHub()
+    now = time.time()
+    assert hub.ingest_json(_json([[now, 1e-5, 2e-5, 3e-5]]))
+    rotation = hub.devices["phone"].rotation.copy()
+    assert not hub.ingest_json(b'{"device": "phone", "samples": [[1.0, NaN, 0, 0]]}')
+    assert not hub.ingest_json(b'{"device": "phone", "samples": [[1.0, Infinity, 0, 0]]}')
+    assert not hub.ingest_json(_json([[now, 1e300, 0.0, 0.0]]))  # переполнение float32
+    assert hub.stats()['rejected'] == 3
+    assert hub.stats()['samples'] == 1
+    assert np.array_equal(hub.devices["phone"].rotation, rotation)
+
+
+def test_binary_frame_with_inf_is_rejected():
+    hub = GyroHub()
+    now = time.time()
+    assert not hub.ingest_frame(encode_frame("phone", [now, now + 0.005], [[0, 0, 0], [np.inf, 0, 0]], "alice"))
+    big = np.float32(3e38)  # конечные сэмплы, но сумма углов уходит в бесконечность
+    assert not hub.ingest_frame(encode_frame("phone", [now] * 30, np.full((30, 3), big), "alice"))
+    assert hub.stats()['rejected'] == 2
+    assert hub.latest("alice") is None
+
+
+def test_purchase_after_rejected_packet():
+    hub = GyroHub()
+    now = time.time()
+    hub.ingest_json(_json([[now, 1e-5, 0.0, 0.0]]))
+    assert not hub.ingest_json(_json([[now, float("nan"), 0.0, 0.0]]))
+    demiurge = CosmicDemiurge(procedural=ProceduralCatalog(size=1000), events=NullSink(), customer_nutation=hub)
+    assert demiurge.purchase_celestial_body("PG_00000001", "alice")
+    assert np.isfinite(demiurge.collected_nutation_data.stats()['mean'])
+
+
+def test_ring_buffer_skips_non_finite():
+    ring = NutationRingBuffer(capacity=8)
+    ring.append("alice", (float("nan"), 0.0), (1.0, 1.0), 0.0)
+    ring.extend(["a", "b", "c"], [[1.0, 2.0], [np.inf, 0.0], [3.0, 4.0]], (0.0, 0.0), 0.0)
+    assert len(ring) == 2
+    assert [record['customer'] for record in ring] == ["a", "c"]
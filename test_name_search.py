@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Поиск по именам: короткие запросы идут через начало имени, длинные - через триграммы
+"""
+
+from name_search import NameIndex
+
+
+def _index():
+    index = NameIndex()
+    for body_id, name in [("a", "Колыбель Ёжика"), ("b", "Комета Галлея"), ("c", "Старый кот"), ("d", "Пульсар")]:
+        index.add(body_id, name)
+    return index
+
+
+def test_short_query_uses_name_prefix(monkeypatch):
+    index = _index()
+    calls = []
+    prefix = index.prefix
+    monkeypatch.setattr(index, "prefix", lambda query, limit=10: calls.append(query) or prefix(query, limit))
+    assert sorted(body_id for _, body_id in index.search("КО")) == ["a", "b"]
+    assert calls == ["ко"]
+    assert [body_id for _, body_id in index.search("к", limit=1)] == ["a"]
+
+
+def test_longer_query_still_uses_trigrams():
+    index = _index()
+    assert index.search("кот")[0][1] == "c"
+    assert index.search("ежик")[0][1] == "a"
+    index.add("b", "Пульсар Вела")  # переименование убирает старое имя и из списка для начала имени
+    assert [body_id for _, body_id in index.search("ко")] == ["a"]
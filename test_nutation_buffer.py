@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Кольцевой буфер нутации: вытеснение старых сборов, скользящие среднее, дисперсия и перцентили
+"""
+
+import numpy as np
+import pytest
+
+from nutation_buffer import NutationRingBuffer
+
+EARTH = (0.0, 0.0)
+
+
+def _fill(ring, yields, start=0):
+    for k, value in enumerate(yields):
+        ring.append(f"покупатель_{(start + k) % 3}", (value * 10, 0.0), EARTH, float(start + k))
+
+
+def test_oldest_records_are_evicted():
+    ring = NutationRingBuffer(capacity=5)
+    _fill(ring, [0.1 * k for k in range(8)])
+    assert len(ring) == 5 and ring.total == 8
+    assert [record['timestamp'] for record in ring] == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert [record['timestamp'] for record in ring.last(2)] == [6.0, 7.0]
+    assert ring.last(2)[-1]['customer'] == "покупатель_1"
+    assert ring.array()['gravity_yield'] == pytest.approx([0.3, 0.4, 0.5, 0.6, 0.7])
+    assert ring.stats()['mean'] == pytest.approx(0.5)
+
+
+@pytest.mark.parametrize("batches", [[3, 4, 6], [12], [1, 1, 9, 2], [5, 5]])
+def test_extend_matches_append(batches):
+    rng = np.random.default_rng(sum(batches))
+    one_by_one, batched = NutationRingBuffer(capacity=5), NutationRingBuffer(capacity=5)
+    for n in batches:
+        nutation = rng.uniform(-3, 3, (n, 2))
+        names = [f"покупатель_{k}" for k in range(n)]
+        batched.extend(names, nutation, EARTH, 1.0)
+        for name, pair in zip(names, nutation):
+            one_by_one.append(name, pair, EARTH, 1.0)
+    assert list(batched) == list(one_by_one)
+    assert batched.total == one_by_one.total == sum(batches)
+    assert batched.stats() == pytest.approx(one_by_one.stats())
+
+
+def test_window_stats_match_numpy():
+    rng = np.random.default_rng(39)
+    ring = NutationRingBuffer(capacity=1000, bins=1000, max_yield=10.0)
+    yields = rng.gamma(2.0, 0.8, 3500)
+    _fill(ring, yields)
+    window = yields[-1000:]
+    stats = ring.stats()
+    assert (stats['count'], stats['total']) == (1000, 3500)
+    assert stats['mean'] == pytest.approx(window.mean(), rel=1e-9)
+    assert stats['variance'] == pytest.approx(window.var(), rel=1e-9)
+    for q in (50, 90, 99):
+        assert abs(stats[f'p{q}'] - np.percentile(window, q)) <= 2 * ring.bin_width
+
+
+def test_percentile_edges():
+    ring = NutationRingBuffer(capacity=4, bins=10, max_yield=1.0)
+    assert ring.percentile(50) == 0.0 and ring.stats()['count'] == 0
+    _fill(ring, [0.05, 0.25, 0.25, 5.0])  # выше max_yield - в последнюю корзину
+    assert ring.percentile(0) == pytest.approx(0.05)
+    assert ring.percentile(50) == pytest.approx(0.25)
+    assert ring.percentile(100) == pytest.approx(0.95)
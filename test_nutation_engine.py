@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Часы нутации: квант, попадания и промахи LRU, общие часы на каждый квант
+"""
+
+import pytest
+
+from nutation_engine import NutationClock, shared_clock
+
+
+class CountingSource:
+    """Источник нутации, считающий вычисления"""
+
+    def __init__(self):
+        self.calls = []
+
+    def at(self, unix_time):
+        self.calls.append(unix_time)
+        return unix_time * 1e-9, -unix_time * 1e-9
+
+
+def test_quantum_floors_time():
+    source = CountingSource()
+    clock = NutationClock(source, quantum_seconds=10)
+    first = clock.read(1_700_000_003.5)
+    assert first.epoch == 1_700_000_000.0
+    assert clock.read(1_700_000_009.99) is first
+    assert clock.read(1_700_000_010.0).epoch == 1_700_000_010.0
+    assert source.calls == [1_700_000_000.0, 1_700_000_010.0]
+    assert NutationClock(source, quantum_seconds=0.25).read(100.3).epoch == 100.25
+
+
+@pytest.mark.parametrize("quantum", [0, -1.0])
+def test_quantum_must_be_positive(quantum):
+    with pytest.raises(ValueError):
+        NutationClock(CountingSource(), quantum_seconds=quantum)
+
+
+def test_lru_hits_and_misses():
+    source = CountingSource()
+    clock = NutationClock(source, quantum_seconds=1, capacity=2)
+    for t in (0, 1, 0.5, 2, 1):  # 1 вытеснена квантом 2: 0 читали позже неё
+        clock.read(t)
+    stats = clock.stats()
+    assert (stats['hits'], stats['misses']) == (1, 4)
+    assert stats['hit_rate'] == pytest.approx(0.2)
+    assert source.calls == [0, 1, 2, 1]
+    clock.read(2)
+    clock.read(0)  # вытеснен, когда перечитали квант 1
+    assert (clock.hits, clock.misses) == (2, 5)
+
+
+def test_shared_clock_per_quantum():
+    assert shared_clock() is shared_clock(1)
+    coarse = shared_clock(60)
+    assert coarse is shared_clock(60.0) and coarse is not shared_clock()
+    assert coarse.quantum_seconds == 60 and shared_clock().quantum_seconds == 1
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Replay of recorded order flow through the shared matcher."""
+import bisect
+import copy
+import time
+
+import numpy as np
+import pytest
+
+from ogle_backtest import (MAKER_ASK, MAKER_BID, backtest_market_maker, columns, has_fast_path, replay,
+                           replay_columns, synthetic_events, trade_columns)
+from ogle_market import _ask_key, _bid_key, match_books
+
+
+def _order(order_id, side, price, amount, ts):
+    return {"kind": "order", "id": order_id, "username": side, "side": side, "price": price,
+            "amount": amount, "ts": ts, "tif": "GTC", "expires_at": None}
+
+
+def test_replay_crosses_and_cancels():
+    events = [
+        _order("a1", "sell", 2.0, 1.0, 1.0),
+        _order("a2", "sell", 2.2, 1.0, 2.0),
+        {"kind": "cancel", "ts": 3.0, "id": "a1"},
+        _order("b1", "buy", 2.4, 1.5, 4.0),
+    ]
+    original = copy.deepcopy(events)
+    trades = replay(events)
+    assert [(t["sell_order"], t["price"], t["amount"]) for t in trades] == [("a2", 2.3, 1.0)]
+    assert events == original
+
+
+def test_replay_matches_unconditional_matching():
+    events = synthetic_events(5000, seed=3)
+    bids, asks, expected = [], [], []
+    resting = {}
+    for e in events:  # every event through match_books, as the node does
+        if e["kind"] == "order":
+            entry = {k: v for k, v in e.items() if k != "kind"}
+            book, key = (bids, _bid_key) if entry["side"] == "buy" else (asks, _ask_key)
+            bisect.insort(book, entry, key=key)
+            resting[entry["id"]] = entry
+            expected.extend(match_books(bids, asks, ts=e["ts"], on_filled=lambda o: resting.pop(o["id"], None)))
+        else:
+            entry = resting.pop(e["id"], None)
+            if entry is not None:
+                book = bids if entry["side"] == "buy" else asks
+                book.remove(entry)
+    assert expected and replay(events) == expected
+
+
+@pytest.mark.parametrize("half_spread, quote_size", [(0.0, 0.0), (0.001, 1.0), (0.0005, 0.25)])
+def test_fast_path_fills_agree_with_replay(half_spread, quote_size):
+    events = synthetic_events(20000, seed=11)
+    cols = columns(events)
+    fast = replay_columns(cols, half_spread, quote_size)
+    slow = trade_columns(replay(events, half_spread, quote_size), cols)
+    assert len(fast) == len(slow) > 0
+    for name, a, b in zip(fast._fields, fast, slow):
+        assert np.array_equal(a, b), name
+    if quote_size:
+        maker = {cols.ids.index(MAKER_BID), cols.ids.index(MAKER_ASK)}
+        assert maker & set(fast.buy.tolist()) and maker & set(fast.sell.tolist())
+
+
+def test_maker_fills_queue_behind_resting_orders():
+    events = [
+        _order("a1", "sell", 2.0, 1.0, 1.0),
+        _order("b1", "buy", 2.0, 1.0, 2.0),  # trade at 2.0; the maker quotes from now on
+        _order("b2", "buy", 1.9, 5.0, 3.0),  # rests at the maker's bid price, ahead of its next quote
+        _order("a2", "sell", 1.9, 2.0, 4.0),
+    ]
+    cols = columns(events)
+    result = backtest_market_maker(cols, half_spread=0.05, quote_size=1.0)
+    trades = replay(events, half_spread=0.05, quote_size=1.0)
+    assert [t["buy_order"] for t in trades] == ["b1", "b2"]  # b2 was first in the queue at 1.9
+    assert result["fills"] == 0
+
+
+def test_fast_path_is_compiled():
+    if not has_fast_path():
+        pytest.skip("no C compiler")
+    events = synthetic_events(200_000, seed=1)
+    cols = columns(events)
+    started = time.perf_counter()
+    replay_columns(cols)
+    assert len(events) / (time.perf_counter() - started) >= 1_000_000
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Time in force, expiry, stop orders and the order book journal of the OGLE market."""
+import json
+import os
+import sys
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import ogle_market
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Point the market's files at tmp_path instead of data/."""
+    monkeypatch.setattr(ogle_market, "STORE_DIR", str(tmp_path))
+    for name in ("BALANCES_FILE", "ORDERS_FILE", "USERS_FILE", "STOPS_FILE", "EVENTS_FILE"):
+        monkeypatch.setattr(ogle_market, name, os.path.join(str(tmp_path), os.path.basename(getattr(ogle_market, name))))
+    monkeypatch.setattr(ogle_market.EventLog.__init__, "__defaults__", (ogle_market.EVENTS_FILE,))
+    return tmp_path
+
+
+@pytest.fixture
+def market(store):
+    market = ogle_market.Market()
+    for user in ("ivan", "marya"):
+        market.register(user)
+        market.mint_gcr(user, 100)
+        market.ledger.credit(user, "OGLEC", 1000)
+    return market
+
+
+def _events(kind):
+    with open(ogle_market.EVENTS_FILE, encoding="utf-8") as f:
+        return [e for e in map(json.loads, f) if e["kind"] == kind]
+
+
+def test_fok_is_all_or_nothing(market):
+    market.place_order("marya", "sell", 2.0, 1)
+    killed = market.place_order("ivan", "buy", 2.0, 2, tif="FOK")
+    assert killed["status"] == "killed" and killed["trades"] == []
+    assert market.balances("ivan") == {"GCR": 100, "OGLEC": 1000}  # nothing reserved
+    assert len(market.orderbook_snapshot()["asks"]) == 1
+
+    filled = market.place_order("ivan", "buy", 2.0, 1, tif="FOK")
+    assert filled["status"] == "filled"
+    assert market.balances("ivan") == {"GCR": 101, "OGLEC": 998}
+    assert market.orderbook_snapshot() == {"bids": [], "asks": []}
+
+
+def test_ioc_refunds_unfilled_remainder(market):
+    market.place_order("marya", "sell", 2.0, 1)
+    result = market.place_order("ivan", "buy", 2.5, 3, tif="IOC")
+    assert result["status"] == "cancelled"
+    assert [t["amount"] for t in result["trades"]] == [1]
+    # 3 * 2.5 reserved, the unfilled 2 * 2.5 comes back
+    assert market.balances("ivan") == {"GCR": 101, "OGLEC": 1000 - 2.5}
+    assert market.orderbook_snapshot() == {"bids": [], "asks": []}
+    assert [e["id"] for e in _events("cancel")] == [result["order"]["id"]]
+
+
+def test_gtt_refunded_at_expiry(market):
+    expires_at = time.time() + 60
+    order = market.place_order("marya", "sell", 3.0, 2, tif="GTT", expires_at=expires_at)["order"]
+    assert market.balances("marya")["GCR"] == 98
+    assert market.expire_orders(now=expires_at - 1) == []
+    expired = market.expire_orders(now=expires_at)
+    assert [o["id"] for o in expired] == [order["id"]]
+    assert market.balances("marya")["GCR"] == 100
+    assert market.open_orders("marya")["orders"] == []
+    assert [e["id"] for e in _events("cancel")] == [order["id"]]
+
+
+def test_stale_expiry_entries_are_compacted(market):
+    expires_at = time.time() + 60
+    for i in range(200):
+        market.place_order("marya", "sell", 3.0 + i, 0.1, tif="GTT", expires_at=expires_at)
+    market.cancel_all("marya")
+    book = market.orderbook
+    assert len(book._expiry_heap) < 100
+    assert book.next_expiry() is None and book._stale == 0
+    assert market.balances("marya")["GCR"] == pytest.approx(100)
+
+
+def test_book_operations_append_to_the_journal(market):
+    snapshot = open(ogle_market.ORDERS_FILE, encoding="utf-8").read()
+    market.place_order("marya", "sell", 2.0, 5)
+    market.place_order("marya", "sell", 2.2, 1, tif="GTT", expires_at=time.time() + 60)
+    market.place_order("ivan", "buy", 2.0, 2)  # partial fill of the first ask
+    market.place_order("ivan", "buy", 1.5, 1)
+    assert open(ogle_market.ORDERS_FILE, encoding="utf-8").read() == snapshot
+    books = json.loads(json.dumps(market.orderbook_snapshot()))
+    assert books["asks"][0]["amount"] == 3
+
+    reloaded = ogle_market.OrderBook()
+    assert reloaded.list_books() == books
+    assert reloaded.next_expiry() == books["asks"][1]["expires_at"]
+    assert [o["id"] for o in reloaded.open_orders("ivan")] == [books["bids"][0]["id"]]
+
+
+def test_journal_is_folded_into_the_snapshot(market, monkeypatch):
+    monkeypatch.setattr(ogle_market, "JOURNAL_MIN", 4)
+    for i in range(10):
+        market.place_order("marya", "sell", 2.0 + i, 1)
+    market.cancel_all("marya")  # the journal now outgrows the (empty) book
+    for i in range(3):
+        market.place_order("marya", "sell", 2.0 + i, 1)
+    assert market.orderbook.journal.length == 3
+    with open(ogle_market.ORDERS_FILE, encoding="utf-8") as f:
+        assert json.load(f)["seq"] > 0
+    books = json.loads(json.dumps(market.orderbook_snapshot()))
+
+    with open(market.orderbook.journal.path, "a", encoding="utf-8") as f:
+        f.write('{"op": "remove", "side": "sell"')  # torn by a crash mid-append
+    reloaded = ogle_market.OrderBook()
+    assert reloaded.list_books() == books
+    reloaded.place(ogle_market.Order("ord_x", "ivan", "buy", 1.0, 1.0, time.time()))
+    assert len(ogle_market.OrderBook().list_books()["bids"]) == 1
+
+
+def test_stops_reserve_funds_up_front(market):
+    market.place_stop_order("ivan", "buy", 2.5, 2.6, 2)
+    market.place_stop_order("marya", "sell", 1.5, 1.4, 3, order_type="stop")
+    assert market.balances("ivan") == {"GCR": 100, "OGLEC": 1000 - 2.6 * 2}
+    assert market.balances("marya") == {"GCR": 97, "OGLEC": 1000}
+    assert [o["stop_price"] for o in market.open_orders("ivan")["stops"]] == [2.5]
+    with pytest.raises(ValueError):
+        market.place_stop_order("ivan", "buy", 2.5, 1000, 2)  # 2000 OGLEC is more than ivan has
+
+
+def test_stop_limit_rests_once_triggered(market):
+    market.place_stop_order("ivan", "buy", 2.5, 2.6, 2)
+    market.place_order("marya", "sell", 2.5, 1)
+    result = market.place_order("marya", "buy", 2.5, 1)
+    assert [t["price"] for t in result["trades"]] == [2.5]
+    [activated] = result["triggered"]
+    assert activated["status"] == "resting" and activated["order"]["tif"] == "GTC"
+    orders = market.open_orders("ivan")
+    assert orders["stops"] == [] and [o["price"] for o in orders["orders"]] == [2.6]
+    assert market.balances("ivan")["OGLEC"] == 1000 - 2.6 * 2  # still reserved by the resting order
+
+
+def test_stop_market_refunds_unfilled_part(market):
+    market.place_stop_order("ivan", "sell", 1.5, 1.0, 3, order_type="stop")
+    market.place_order("marya", "buy", 1.2, 1)
+    market.place_order("ivan", "sell", 1.5, 1)
+    result = market.place_order("marya", "buy", 1.5, 1)
+    [activated] = result["triggered"]
+    assert activated["status"] == "cancelled"
+    assert [t["amount"] for t in activated["trades"]] == [1]
+    # 3 GCR reserved for the stop, 1 sold at (1.2 + 1.0) / 2, 2 refunded
+    assert market.balances("ivan") == {"GCR": 100 - 1 - 1, "OGLEC": 1000 + 1.5 + 1.1}
+    assert market.open_orders("ivan") == {"username": "ivan", "orders": [], "stops": []}
+
+
+def test_stops_cascade(market):
+    market.register("petr")
+    market.mint_gcr("petr", 10)
+    market.place_order("marya", "buy", 1.9, 1)
+    market.place_order("marya", "buy", 1.5, 1)
+    first = market.place_stop_order("ivan", "sell", 2.0, 1.9, 1, order_type="stop")["stop"]
+    second = market.place_stop_order("ivan", "sell", 1.9, 1.5, 1, order_type="stop")["stop"]
+    untouched = market.place_stop_order("ivan", "sell", 1.0, 0.5, 1, order_type="stop")["stop"]
+
+    market.place_order("petr", "sell", 2.0, 1)
+    result = market.place_order("marya", "buy", 2.0, 1)
+    # the trade at 2.0 fires the first stop, its fill at 1.9 fires the second
+    assert [a["order"]["id"] for a in result["triggered"]] == [first["id"], second["id"]]
+    assert [a["trades"][0]["price"] for a in result["triggered"]] == [1.9, 1.5]
+    assert market.last_price == 1.5
+    assert [o["id"] for o in market.open_orders("ivan")["stops"]] == [untouched["id"]]
+    assert market.balances("ivan") == {"GCR": 97, "OGLEC": 1000 + 1.9 + 1.5}
+
+
+def test_cancel_all_refunds_unindexes_and_logs(market):
+    orders = [market.place_order("ivan", "buy", 1.0, 5)["order"],
+              market.place_order("ivan", "sell", 9.0, 2, tif="GTT", expires_at=time.time() + 60)["order"]]
+    stops = [market.place_stop_order("ivan", "buy", 5.0, 5.5, 1)["stop"],
+             market.place_stop_order("ivan", "sell", 0.5, 0.4, 3, order_type="stop")["stop"]]
+    other = market.place_order("marya", "sell", 9.5, 1)["order"]
+    assert market.balances("ivan") == {"GCR": 95, "OGLEC": 1000 - 5 - 5.5}
+
+    result = market.cancel_all("ivan")
+    assert set(result["cancelled"]) == {o["id"] for o in orders + stops}
+    assert market.balances("ivan") == {"GCR": 100, "OGLEC": 1000}
+    assert "ivan" not in market.orderbook._by_user and "ivan" not in market.triggers._by_user
+    assert market.open_orders("ivan") == {"username": "ivan", "orders": [], "stops": []}
+    assert market.triggers.list_stops() == {"buy": [], "sell": []}
+    assert [o["id"] for o in market.open_orders("marya")["orders"]] == [other["id"]]
+    assert {e["id"] for e in _events("cancel")} == {o["id"] for o in orders + stops}
+    assert market.cancel_all("ivan")["cancelled"] == []
+
+
+def test_node_sweeps_expired_orders_without_requests(store, monkeypatch):
+    monkeypatch.delitem(sys.modules, "ogle_node", raising=False)
+    import ogle_node
+    with TestClient(ogle_node.app) as node:
+        node.post("/register", json={"username": "marya"})
+        node.post("/mint_gcr", json={"username": "marya", "amount": 5})
+        order = {"username": "marya", "side": "sell", "price": 2.0, "amount": 5, "tif": "GTT",
+                 "expires_at": time.time() + 0.3}
+        assert node.post("/order", json=order).json()["status"] == "resting"
+        assert node.get("/balances/marya").json()["GCR"] == 0
+        deadline = time.time() + 5
+        while node.get("/balances/marya").json()["GCR"] == 0 and time.time() < deadline:
+            time.sleep(0.05)
+        assert node.get("/balances/marya").json()["GCR"] == 5
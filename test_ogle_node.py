@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Idempotency-Key handling of the OGLE node."""
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+import ogle_market
+
+
+@pytest.fixture
+def node(tmp_path, monkeypatch):
+    """ogle_node with its market state in tmp_path instead of data/."""
+    monkeypatch.setattr(ogle_market, "STORE_DIR", str(tmp_path))
+    for name in ("BALANCES_FILE", "ORDERS_FILE", "USERS_FILE", "STOPS_FILE", "EVENTS_FILE"):
+        monkeypatch.setattr(ogle_market, name, os.path.join(str(tmp_path), os.path.basename(getattr(ogle_market, name))))
+    monkeypatch.setattr(ogle_market.EventLog.__init__, "__defaults__", (ogle_market.EVENTS_FILE,))
+    monkeypatch.delitem(sys.modules, "ogle_node", raising=False)
+    import ogle_node
+    return TestClient(ogle_node.app)
+
+
+def _balance(node, username):
+    return node.get(f"/balances/{username}").json()["GCR"]
+
+
+def test_key_replays_only_the_same_request(node):
+    node.post("/register", json={"username": "ivan"})
+    headers = {"Idempotency-Key": "k1"}
+    first = node.post("/mint_gcr", json={"username": "ivan", "amount": 5}, headers=headers)
+    again = node.post("/mint_gcr", json={"username": "ivan", "amount": 5}, headers=headers)
+    assert first.status_code == again.status_code == 200
+    assert first.json() == again.json()
+    assert _balance(node, "ivan") == 5
+
+    other = node.post("/mint_gcr", json={"username": "ivan", "amount": 50}, headers=headers)
+    assert other.status_code == 422
+    assert _balance(node, "ivan") == 5
+
+
+def test_key_is_scoped_to_the_endpoint(node):
+    node.post("/register", json={"username": "ivan"})
+    headers = {"Idempotency-Key": "shared"}
+    assert node.post("/mint_gcr", json={"username": "ivan", "amount": 5}, headers=headers).status_code == 200
+    order = node.post("/order", json={"username": "ivan", "side": "sell", "price": 2.5, "amount": 1}, headers=headers)
+    assert order.status_code == 200
+    assert "delta" not in order.json()  # used to replay the /mint_gcr response
+    assert node.get("/orders/ivan").json()
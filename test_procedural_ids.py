@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Регрессия: неканонический id процедурного тела не должен давать второго владельца
+"""
+
+from celestial_generator import ProceduralCatalog
+from cosmic_demiurge import CosmicDemiurge
+from demiurge_events import NullSink
+
+
+def test_index_of_accepts_only_canonical_ids():
+    catalog = ProceduralCatalog(size=1000)
+    assert catalog.index_of("PG_00000001") == 1
+    assert catalog.index_of("PG_1") is None
+    assert catalog.index_of("PG_000000001") is None
+    assert "PG_1" not in catalog
+
+
+def test_alias_cannot_buy_owned_body():
+    demiurge = CosmicDemiurge(procedural=ProceduralCatalog(size=1000), events=NullSink())
+    assert demiurge.purchase_celestial_body("PG_00000001", "alice")
+    assert not demiurge.purchase_celestial_body("PG_1", "mallory")
+    assert demiurge.catalog["PG_00000001"].owner == "alice"
+    assert "PG_1" not in demiurge.catalog
+    assert demiurge.sales.sold == 1
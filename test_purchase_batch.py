@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Регрессия: заказ с негодной нутацией отклоняется, не захватывая тело
+"""
+
+import math
+
+from celestial_generator import ProceduralCatalog
+from cosmic_demiurge import CosmicDemiurge
+from demiurge_events import NullSink
+
+
+def test_bad_nutation_does_not_claim_body():
+    demiurge = CosmicDemiurge(procedural=ProceduralCatalog(size=1000), events=NullSink())
+    bad = [[1, 2, 3], "ab", ["1", "2"], [math.nan, 0.0], [True, 0.0], 5]
+    orders = [(demiurge.procedural.body_id(i), "mallory", nutation) for i, nutation in enumerate(bad)]
+    orders.append((demiurge.procedural.body_id(100), "alice", [1.5, -2.0]))
+    results = demiurge.purchase_batch(orders)
+    assert [r['success'] for r in results] == [False] * len(bad) + [True]
+    for body_id, _, _ in orders[:-1]:
+        assert body_id not in demiurge.catalog or demiurge.catalog[body_id].owner is None
+    assert demiurge.sales.sold == 1
+    assert math.isfinite(results[-1]['gravity_yield'])
+    # после отказа тело можно купить с правильной нутацией
+    retry = demiurge.purchase_batch([(demiurge.procedural.body_id(0), "alice", (0.0, 0.0))])
+    assert retry[0]['success']
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Брони: куча сроков ReservationTimer и возврат тела в доступные, когда срок вышел
+"""
+
+import datetime
+import time
+
+import pytest
+
+from celestial_generator import ProceduralCatalog
+from cosmic_demiurge import CosmicDemiurge, ReservationTimer
+from demiurge_events import MemorySink
+
+T0 = datetime.datetime(2026, 1, 1, 12, 0)
+
+
+def _at(seconds):
+    return T0 + datetime.timedelta(seconds=seconds)
+
+
+def test_timer_pops_due_reservations_in_order():
+    timer = ReservationTimer()
+    timer.add("b", _at(20))
+    timer.add("a", _at(10))
+    timer.add("c", _at(30))
+    assert timer.next_expiry() == _at(10)
+    assert timer.expired(_at(5)) == []
+    assert timer.expired(_at(20)) == [("a", _at(10)), ("b", _at(20))]
+    assert len(timer) == 1 and timer.next_expiry() == _at(30)
+
+
+def test_timer_skips_superseded_entries():
+    timer = ReservationTimer()
+    timer.add("a", _at(10))
+    timer.add("a", _at(50))  # продление
+    timer.add("b", _at(15))
+    timer.cancel("b")
+    assert timer.next_expiry() == _at(50)
+    assert timer.expired(_at(40)) == []
+    assert timer.expired(_at(50)) == [("a", _at(50))]
+    assert len(timer) == 0 and timer.next_expiry() is None
+
+
+def _demiurge():
+    events = MemorySink()
+    return CosmicDemiurge(procedural=ProceduralCatalog(size=100), events=events), events
+
+
+def test_expired_reservation_returns_to_catalog():
+    demiurge, events = _demiurge()
+    assert demiurge.reserve_celestial_body("CM_001", "Аксинья", hours=1e-6)
+    assert demiurge.reserve_celestial_body("CM_002", "Аксинья", hours=1)
+    assert not demiurge.reserve_celestial_body("CM_001", "Фрол")  # бронь ещё действует
+    time.sleep(0.01)
+
+    available = {body.id for body in demiurge.browse_catalog()}
+    assert "CM_001" in available and "CM_002" not in available
+    assert demiurge.catalog["CM_001"].reserved_until is None
+    [expired] = events.of_kind('reservation_expired')
+    assert expired.data['body_id'] == "CM_001"
+    demiurge.browse_catalog()
+    assert len(events.of_kind('reservation_expired')) == 1
+    assert demiurge.purchase_celestial_body("CM_001", "Фрол")
+
+
+def test_reservation_hours_are_validated():
+    demiurge, _ = _demiurge()
+    for hours in (0, -1, True, "24", 10 ** 9):
+        with pytest.raises(ValueError):
+            demiurge.reserve_celestial_body("CM_001", "Аксинья", hours=hours)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Итоги продаж: накопленные по ходу покупок совпадают с подсчётом по проданным телам
+"""
+
+import random
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+
+import pytest
+
+from celestial_generator import ProceduralCatalog
+from cosmic_demiurge import CelestialType, CosmicDemiurge
+from demiurge_events import NullSink
+from sales_stats import SalesStats
+
+
+def _sale(owner, price, body_type=CelestialType.COMET):
+    return SimpleNamespace(owner=owner, price_universe_coins=price, type=body_type)
+
+
+def test_top_buyers_promote_and_stay_bounded():
+    stats = SalesStats(top_k=2)
+    for owner, price in (("a", 100), ("b", 50), ("c", 70), ("b", 40), ("c", 10)):
+        stats.record_sale(_sale(owner, price))
+    # b, набрав 90, вернулся в таблицу и вытеснил c; c с 80 до b не дотянул
+    assert [(row['customer'], row['spent'], row['bodies']) for row in stats.top_buyers()] == [
+        ("a", 100, 1), ("b", 90, 2)]
+    stats.record_sale(_sale("c", 25))
+    assert [row['customer'] for row in stats.top_buyers()] == ["c", "a"]
+    assert (stats.sold, stats.buyers, stats.revenue) == (6, 3, 295)
+    assert stats.average_price == pytest.approx(295 / 6)
+
+
+def test_random_sales_match_brute_force():
+    rng = random.Random(47)
+    stats = SalesStats(top_k=5)
+    sales = [_sale(f"покупатель_{rng.randrange(20)}", rng.randrange(1, 1000), rng.choice(list(CelestialType)))
+             for _ in range(500)]
+    spent = defaultdict(float)
+    for sale in sales:
+        stats.record_sale(sale, gravity_applied=0.5)
+        spent[sale.owner] += sale.price_universe_coins
+    best = sorted(spent.items(), key=lambda item: (-item[1], item[0]))[:5]
+    assert [(row['customer'], row['spent']) for row in stats.top_buyers()] == best
+    assert dict(stats.popular_types()) == Counter(sale.type for sale in sales)
+    assert stats.revenue == sum(sale.price_universe_coins for sale in sales)
+    assert stats.gravity_applied == pytest.approx(250)
+
+
+def test_demiurge_keeps_totals_while_selling():
+    demiurge = CosmicDemiurge(procedural=ProceduralCatalog(size=200), events=NullSink())
+    assert demiurge.purchase_celestial_body("CM_001", "Аксинья")
+    assert demiurge.purchase_celestial_body("PG_00000010", "Фрол")
+    demiurge.purchase_batch([(f"PG_{i:08d}", "Аксинья", (1.0, 1.0)) for i in range(20, 25)])
+    owned = demiurge.owned_bodies()
+    snapshot = demiurge.sales.snapshot()
+    assert snapshot['sold'] == len(owned) == 7
+    assert snapshot['revenue'] == sum(body.price_universe_coins for body in owned)
+    assert snapshot['by_type'] == dict(Counter(body.type.value for body in owned))
+    assert snapshot['top_buyers'][0]['customer'] == max(
+        ("Аксинья", "Фрол"), key=lambda name: sum(b.price_universe_coins for b in demiurge.bodies_of(name)))
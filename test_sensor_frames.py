@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Двоичные кадры гироскопа: упаковка и разбор, отказ на битых кадрах, проигрывание записи с диска
+"""
+
+import numpy as np
+import pytest
+
+from gyro_ingest import GyroHub
+from sensor_frames import (HEADER_DTYPE, MAX_RECORDS, MAX_SPAN_US, VERSION, decode_frame, encode_frame, frame_size,
+                           iter_frames, read_recording, replay, write_frame)
+
+NOW = 1_760_000_000.0
+
+
+def _samples(count, start=NOW, rate_hz=200.0, seed=1):
+    rng = np.random.default_rng(seed)
+    return start + np.arange(count) / rate_hz, rng.normal(0, 3e-5, (count, 3))
+
+
+def test_round_trip():
+    timestamps, xyz = _samples(250)
+    frame = decode_frame(encode_frame("телефон", timestamps, xyz, "Аксинья", calibrate=True))
+    assert (frame.device, frame.customer, frame.calibrate, len(frame)) == ("телефон", "Аксинья", True, 250)
+    assert frame.base_ts == timestamps[0]
+    assert np.allclose(frame.timestamps, timestamps, rtol=0, atol=1e-6)
+    assert np.array_equal(frame.xyz, xyz.astype(np.float32))
+
+    anonymous = decode_frame(encode_frame("я" * 40, timestamps[:1], xyz[:1]))
+    assert anonymous.customer is None and not anonymous.calibrate
+    assert anonymous.device == "я" * 16  # 32 байта UTF-8, обрезано по границе символа
+
+
+def test_frame_may_span_up_to_u32_microseconds():
+    span = MAX_SPAN_US / 1e6
+    frame = decode_frame(encode_frame("phone", [NOW, NOW + span], np.zeros((2, 3))))
+    assert int(frame.dt_us[-1]) == MAX_SPAN_US
+
+
+@pytest.mark.parametrize("timestamps", [
+    [], [NOW, NOW + 4295.0], [NOW, NOW + 0.01, NOW + 0.005], [NOW, np.nan], [np.inf],
+    np.full(MAX_RECORDS + 1, NOW),
+])
+def test_encode_rejects_bad_timestamps(timestamps):
+    with pytest.raises(ValueError):
+        encode_frame("phone", timestamps, np.zeros((len(timestamps), 3)))
+
+
+def test_encode_accepts_repeated_timestamps():
+    assert len(decode_frame(encode_frame("phone", [NOW, NOW, NOW + 0.005], np.zeros((3, 3))))) == 3
+
+
+def test_decode_rejects_damaged_frames():
+    frame = encode_frame("phone", *_samples(10))
+    with pytest.raises(ValueError, match="короче заголовка"):
+        decode_frame(frame[:HEADER_DTYPE.itemsize - 1])
+    with pytest.raises(ValueError, match="обрезан"):
+        decode_frame(frame[:-1])
+    with pytest.raises(ValueError, match="не кадр"):
+        decode_frame(b"JSON" + frame[4:])
+    with pytest.raises(ValueError, match="версии"):
+        decode_frame(frame[:4] + bytes([VERSION + 1]) + frame[5:])
+    assert not GyroHub().ingest_frame(frame[:-1])
+
+
+def test_iter_frames_walks_concatenated_frames():
+    frames = [encode_frame(f"phone_{k}", *_samples(5 + k, seed=k)) for k in range(4)]
+    buffer = b"".join(frames)
+    assert [(frame.device, len(frame)) for frame in iter_frames(buffer)] == [(f"phone_{k}", 5 + k) for k in range(4)]
+    assert sum(map(len, frames)) == sum(frame_size(5 + k) for k in range(4))
+
+
+def test_replay_from_memmapped_recording(tmp_path):
+    path = str(tmp_path / "session.oglf")
+    expected = []
+    with open(path, "wb") as f:
+        for k in range(6):
+            timestamps, xyz = _samples(100, start=NOW + k, seed=k)
+            write_frame(f, encode_frame(f"phone_{k % 2}", timestamps, xyz, f"buyer_{k % 2}"))
+            expected.append(xyz.astype(np.float32))
+    frames = list(read_recording(path))
+    assert not frames[0].xyz.flags.owndata  # вид на отображённый файл, а не копия
+    assert np.array_equal(np.concatenate([frame.xyz for frame in frames]), np.concatenate(expected))
+
+    hub = GyroHub()
+    assert replay(path, hub) == 600
+    assert hub.samples == 600 and set(hub.devices) == {"phone_0", "phone_1"}
+
+
+def test_empty_recording(tmp_path):
+    path = tmp_path / "empty.oglf"
+    path.write_bytes(b"")
+    assert list(read_recording(str(path))) == []
+    assert replay(str(path), GyroHub()) == 0
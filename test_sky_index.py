@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Небесный индекс против полного перебора на случайном каталоге, и поиск по
+небу демиурга, который видит смену владельцев
+"""
+
+import numpy as np
+import pytest
+
+from celestial_generator import ProceduralCatalog
+from columnar_catalog import SkyCatalog, procedural_coordinates
+from cosmic_demiurge import CosmicDemiurge
+from demiurge_events import NullSink
+from sky_index import SkyIndex, _unit_vectors
+
+RNG = np.random.default_rng(42)
+N = 20000
+RA = RNG.uniform(0, 360, N)
+DEC = np.degrees(np.arcsin(RNG.uniform(-1, 1, N)))
+DIST = 10 ** RNG.uniform(0, 4, N)
+XYZ = _unit_vectors(RA, DEC)
+
+
+def _separations(ra, dec):
+    center = _unit_vectors(np.array(ra), np.array(dec))
+    return np.degrees(np.arccos(np.clip(XYZ @ center, -1, 1)))
+
+
+@pytest.fixture(scope="module")
+def sky():
+    return SkyIndex(RA, DEC, DIST)
+
+
+@pytest.mark.parametrize("ra, dec, radius", [
+    (10.0, 20.0, 5.0), (359.5, 0.0, 3.0), (0.2, -45.0, 7.0),  # переход через RA = 0
+    (123.0, 89.0, 4.0), (250.0, -88.5, 6.0),  # конус накрывает полюс
+    (42.0, 10.0, 0.3), (200.0, 30.0, 60.0), (77.0, -5.0, 180.0),
+])
+def test_cone_matches_brute_force(sky, ra, dec, radius):
+    separations = _separations(ra, dec)
+    rows = set(sky.cone(ra, dec, radius).tolist())
+    # на самой границе решает округление - там допускается любой ответ
+    assert set(np.flatnonzero(separations <= radius - 1e-9).tolist()) <= rows
+    assert rows <= set(np.flatnonzero(separations <= radius + 1e-9).tolist())
+    assert np.all(np.diff(separations[sky.cone(ra, dec, radius)]) >= -1e-9)
+
+
+@pytest.mark.parametrize("row, n", [(0, 1), (17, 10), (5000, 50), (N - 1, 200)])
+def test_nearest_matches_brute_force(sky, row, n):
+    separations = _separations(RA[row], DEC[row])
+    separations[row] = np.inf
+    found = sky.nearest_to(row, n)
+    assert len(found) == n and row not in found
+    expected = np.sort(separations)[:n]
+    assert np.allclose(np.sort(separations[found]), expected, atol=1e-9)
+
+
+@pytest.mark.parametrize("lo, hi", [(0, 1), (10, 20), (99.5, 100.5), (5000, 1e9), (30, 10)])
+def test_distance_range_matches_brute_force(sky, lo, hi):
+    rows = sky.distance_range(lo, hi)
+    assert set(rows.tolist()) == set(np.flatnonzero((DIST >= lo) & (DIST <= hi)).tolist())
+    assert np.all(np.diff(DIST[rows]) >= 0)
+
+
+def test_procedural_coordinates_match_materialize():
+    procedural = ProceduralCatalog(size=2000)
+    ra, dec, distance = procedural_coordinates(procedural, 500, 1500)
+    for k in range(0, 1000, 37):
+        assert (ra[k], dec[k], distance[k]) == procedural.materialize(500 + k).coordinates
+
+
+def _demiurge():
+    return CosmicDemiurge(procedural=ProceduralCatalog(size=5000), events=NullSink())
+
+
+def test_sky_catalog_covers_curated_and_procedural():
+    demiurge = _demiurge()
+    sky = SkyCatalog(demiurge.catalog.values(), demiurge.procedural)
+    assert len(sky) == 12 + 5000
+    assert sky.body_id(sky.row_of("BH_001")) == "BH_001"
+    assert sky.body_id(sky.row_of("PG_00000042")) == "PG_00000042"
+    assert sky.row_of("PG_42") is None
+
+
+def test_demiurge_cone_tracks_owners():
+    demiurge = _demiurge()
+    target = demiurge.procedural.materialize(123)
+    ra, dec, _ = target.coordinates
+    found = demiurge.sky_cone(ra, dec, 3.0, limit=100, available_only=True)
+    assert found[0][0].id == target.id and found[0][1] < 1e-6
+
+    curated = list(demiurge.catalog.values())
+    coordinates = np.array([body.coordinates for body in curated]).T
+    all_ra = np.concatenate([coordinates[0], procedural_coordinates(demiurge.procedural)[0]])
+    all_dec = np.concatenate([coordinates[1], procedural_coordinates(demiurge.procedural)[1]])
+    center = _unit_vectors(np.array(ra), np.array(dec))
+    separations = np.degrees(np.arccos(np.clip(_unit_vectors(all_ra, all_dec) @ center, -1, 1)))
+    ids = [body.id for body in curated] + list(demiurge.procedural)
+    assert [body.id for body, _ in found] == [ids[i] for i in np.argsort(separations, kind="stable")
+                                              if separations[i] <= 3.0][:100]
+
+    assert demiurge.purchase_celestial_body(target.id, "Аксинья")
+    found = demiurge.sky_cone(ra, dec, 3.0, limit=5, available_only=True)
+    assert target.id not in {body.id for body, _ in found}
+    assert target.id in {body.id for body, _ in demiurge.sky_cone(ra, dec, 3.0, limit=5)}
+
+
+def test_demiurge_nearest_to_owned_body():
+    demiurge = _demiurge()
+    assert demiurge.purchase_celestial_body("PG_00000007", "Фрол")
+    neighbours = demiurge.sky_nearest("PG_00000007", 8)
+    assert len(neighbours) == 8 and "PG_00000007" not in {body.id for body, _ in neighbours}
+    separations = [separation for _, separation in neighbours]
+    assert separations == sorted(separations)
+    nearest = neighbours[0][0].id
+    assert demiurge.reserve_celestial_body(nearest, "Аксинья")
+    available = demiurge.sky_nearest("PG_00000007", 8, available_only=True)
+    assert len(available) == 8 and nearest not in {body.id for body, _ in available}
+    with pytest.raises(KeyError):
+        demiurge.sky_nearest("PG_99999999")
+
+
+def test_demiurge_distance_range_and_validation():
+    demiurge = _demiurge()
+    bodies = demiurge.sky_distance(10, 100, limit=50)
+    distances = [body.coordinates[2] for body in bodies]
+    assert distances == sorted(distances) and all(10 <= d <= 100 for d in distances)
+    with pytest.raises(ValueError):
+        demiurge.sky_distance(100, 10)
+    with pytest.raises(ValueError):
+        demiurge.sky_cone(0, 95, 1)
+    with pytest.raises(ValueError):
+        demiurge.sky_cone(0, 0, float("nan"))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Консоль: «мои владения» берутся из индекса владельцев, а открытия проверяются один раз на все тела
+"""
+
+import os
+
+import pytest
+
+from demiurge_store import DemiurgeStore
+from russian_soul_interface import RussianSoulInterface
+
+
+class NoScanCatalog(dict):
+    """Каталог, который нельзя обойти целиком - только взять тело по id"""
+
+    def __iter__(self):
+        raise AssertionError("каталог обходится целиком")
+
+    values = items = keys = __iter__
+
+
+@pytest.fixture
+def interface(tmp_path, monkeypatch):
+    path = os.path.join(str(tmp_path), "demiurge.store")
+    monkeypatch.setattr(DemiurgeStore.__init__, "__defaults__", (path,) + DemiurgeStore.__init__.__defaults__[1:])
+    interface = RussianSoulInterface()
+    demiurge = interface.demiurge
+    for body_id, owner in (("CM_001", "Аксинья"), ("BH_001", "Фрол"), ("AS_001", "Аксинья")):
+        assert demiurge.purchase_celestial_body(body_id, owner)
+    yield interface
+    demiurge.store.close()
+
+
+def test_my_properties_from_owner_index(interface, capsys, monkeypatch):
+    demiurge = interface.demiurge
+    first = min((demiurge.catalog[body_id] for body_id in ("CM_001", "AS_001")), key=lambda body: body.discovery_due)
+    demiurge.discoveries.poll(now=first.discovery_due)
+    calls = []
+    discovered_today = demiurge.discovered_today
+    monkeypatch.setattr(demiurge, "discovered_today", lambda owner=None: calls.append(owner) or discovered_today(owner))
+    monkeypatch.setattr(demiurge, "catalog", NoScanCatalog(demiurge.catalog))
+    capsys.readouterr()
+
+    interface.current_customer = "Аксинья"
+    interface.check_my_properties()
+    out = capsys.readouterr().out
+    names = [demiurge.catalog[body_id].name for body_id in ("CM_001", "AS_001")]
+    assert [line[2:] for line in out.splitlines() if line.startswith("✨ ")] == names
+    assert demiurge.catalog["BH_001"].name not in out
+    assert out.count("DÉCOUVERTE") == 1 and demiurge.discovery_alert(first) in out
+    assert calls == ["Аксинья"]
+
+    interface.check_my_properties()  # уведомление прочитано
+    assert "DÉCOUVERTE" not in capsys.readouterr().out
+
+
+def test_no_properties(interface, capsys):
+    interface.current_customer = "Пелагея"
+    interface.check_my_properties()
+    assert "пока нет космических владений" in capsys.readouterr().out
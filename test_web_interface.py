@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API веб-интерфейса: разбор параметров и ответы 400 на плохие запросы
+"""
+
+import dataclasses
+import os
+import sys
+
+import pytest
+
+from demiurge_store import DemiurgeStore
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Свежий cosmic_web_interface с хранилищем в tmp_path вместо data/"""
+    path = os.path.join(str(tmp_path), "demiurge.store")
+    monkeypatch.setattr(DemiurgeStore.__init__, "__defaults__", (path,) + DemiurgeStore.__init__.__defaults__[1:])
+    monkeypatch.delitem(sys.modules, "cosmic_web_interface", raising=False)
+    import cosmic_web_interface
+    yield cosmic_web_interface.app.test_client()
+    cosmic_web_interface.demiurge.store.close()
+
+
+def _catalog_ids(client, query=""):
+    return [body["id"] for body in client.get("/api/catalog" + query).get_json()]
+
+
+def test_catalog_page_is_clamped(client):
+    everything = _catalog_ids(client)
+    assert len(everything) == 12
+    assert _catalog_ids(client, "?offset=-5&limit=3") == everything[:3]
+    assert _catalog_ids(client, "?limit=0") == everything[:1]
+    assert _catalog_ids(client, "?offset=10&limit=-1") == everything[10:11]
+
+
+def test_catalog_limit_is_capped(client):
+    import cosmic_web_interface
+    demiurge = cosmic_web_interface.demiurge
+    comet = demiurge.catalog["CM_001"]
+    for i in range(150):
+        demiurge.add_body(dataclasses.replace(comet, id=f"CM_{i + 100:03d}"))
+    assert len(_catalog_ids(client, "?limit=1000")) == 100
+    assert len(_catalog_ids(client, "?offset=100&limit=1000")) == 62
+
+
+def test_stats_follow_purchases(client):
+    assert client.get("/api/stats").get_json()["sold"] == 0
+    client.post("/api/purchase", json={"body_id": "CM_001", "customer_name": "Аксинья"})
+    orders = [{"body_id": "AS_001", "customer_name": "Фрол"}, {"body_id": "CM_001", "customer_name": "Фрол"}]
+    client.post("/api/purchase/batch", json={"orders": orders})
+    stats = client.get("/api/stats").get_json()
+    assert (stats["sold"], stats["buyers"], stats["catalog_size"]) == (2, 2, 12)
+    assert stats["revenue"] == 75000 + 45000
+    assert stats["by_type"] == {"Небесная странница с огненной косой": 1, "Каменный странник": 1}
+    assert [row["customer"] for row in stats["top_buyers"]] == ["Аксинья", "Фрол"]
+    assert stats["gravity_reserves"] > 1000
+
+
+def test_sky_cone(client):
+    found = client.get("/api/sky/cone?ra=12.5&dec=45.2&radius=1").get_json()
+    assert found[0]["id"] == "BH_001" and found[0]["separation_deg"] == 0
+    assert len(client.get("/api/sky/cone?ra=0&dec=0&radius=180&limit=5").get_json()) == 5
+    assert client.get("/api/sky/cone?ra=0&dec=0").status_code == 400
+    assert client.get("/api/sky/cone?ra=0&dec=100&radius=1").status_code == 400
+
+
+def test_sky_nearest_follows_owner(client):
+    client.post("/api/purchase", json={"body_id": "BH_001", "customer_name": "Аксинья"})
+    neighbours = client.get("/api/sky/nearest/BH_001?n=3").get_json()
+    assert len(neighbours) == 3 and "BH_001" not in [body["id"] for body in neighbours]
+    near = [body["id"] for body in client.get("/api/sky/nearest/CM_002?n=11").get_json()]
+    assert "BH_001" in near
+    assert "BH_001" not in [body["id"] for body in client.get("/api/sky/nearest/CM_002?n=11&available=1").get_json()]
+    assert client.get("/api/sky/nearest/XX_404").status_code == 404
+
+
+def test_sky_distance(client):
+    bodies = client.get("/api/sky/distance?min_ly=0&max_ly=100").get_json()
+    distances = [body["coordinates"][2] for body in bodies]
+    assert distances and distances == sorted(distances) and max(distances) <= 100
+    assert client.get("/api/sky/distance?min_ly=5").status_code == 400
+    assert client.get("/api/sky/distance?min_ly=50&max_ly=5").status_code == 400
+
+
+@pytest.mark.parametrize("payload", [
+    None, "orders", [], {"orders": "BH_001"}, {"orders": [["BH_001", "Аксинья"]]},
+    {"orders": [{"body_id": "BH_001"}]}, {"orders": [{"body_id": 1, "customer_name": "Аксинья"}]},
+])
+def test_purchase_batch_rejects_malformed_body(client, payload):
+    response = client.post("/api/purchase/batch", json=payload)
+    assert response.status_code == 400 and "error" in response.get_json()
+
+
+def test_purchase_batch_rejects_non_json(client):
+    response = client.post("/api/purchase/batch", data="не JSON", content_type="text/plain")
+    assert response.status_code == 400
+
+
+def test_purchase_batch(client):
+    orders = [{"body_id": "BH_001", "customer_name": "Аксинья", "nutation": [3.1, -2.4]},
+              {"body_id": "BH_001", "customer_name": "Фрол", "nutation": None}]
+    results = client.post("/api/purchase/batch", json={"orders": orders}).get_json()["results"]
+    assert [r["success"] for r in results] == [True, False]